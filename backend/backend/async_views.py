@@ -0,0 +1,52 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+
+def json_response(data, status=200):
+    # Dùng renderer JSON mặc định của DRF (xem backend.renderers) để giống hệt view đồng bộ
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+def _authenticate(request):
+    """
+    Chạy các lớp DEFAULT_AUTHENTICATION_CLASSES của DRF trên HttpRequest, giống api_view.
+    Trả về (user, header WWW-Authenticate của lớp đầu tiên).
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    header = authenticators[0].authenticate_header(request) if authenticators else None
+    for authenticator in authenticators:
+        result = authenticator.authenticate(request)
+        if result is not None:
+            return result[0], header
+    return None, header
+
+
+def async_api_view(view):
+    """
+    Decorator cho view async chỉ đọc (GET): xác thực bằng cùng các lớp JWT của DRF
+    (chạy qua sync_to_async vì có thể đọc cache/database), yêu cầu đăng nhập như
+    IsAuthenticated, lỗi trả về dạng {"detail": ...} như DRF. View tự trả JsonResponse.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            user, header = await sync_to_async(_authenticate)(request)
+        except exceptions.AuthenticationFailed as exc:
+            data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+            response = json_response(data, status=401)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+        if user is None or not user.is_authenticated:
+            response = json_response({'detail': str(exceptions.NotAuthenticated.default_detail)}, status=401)
+            if header:
+                response['WWW-Authenticate'] = header
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
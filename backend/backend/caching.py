@@ -0,0 +1,170 @@
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+from .routers import read_from_replica
+
+# Thời gian giữ response của các view đã cache (giây); phiên bản namespace đổi thì key đổi theo
+VIEW_CACHE_TIMEOUT = getattr(settings, 'VIEW_CACHE_TIMEOUT', 300)
+
+# Backend cache riêng của từng process: phiên bản namespace tăng ở process này không được
+# process khác thấy, nên response đã cache ở đó sẽ cũ tới hết VIEW_CACHE_TIMEOUT
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Namespace dùng chung toàn hệ thống và namespace tách theo family
+GLOBAL_NAMESPACES = ('recipes', 'categories', 'fridge', 'meal_plans')
+FAMILY_NAMESPACES = ('shopping',)
+
+
+def shared_cache_enabled():
+    """
+    Cache mặc định có dùng chung giữa các process không (Redis, Memcached, database...).
+    Dữ liệu chỉ đúng khi mọi worker cùng thấy lần xóa hoặc tăng phiên bản (tập quyền, user đã
+    xác thực, đồ thị family, response của view...) chỉ được cache khi điều này đúng.
+    """
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def view_cache_enabled():
+    """
+    Cache response chỉ bật khi VIEW_CACHE_ENABLED và cache mặc định dùng chung giữa các process,
+    để một lần tăng phiên bản có hiệu lực với mọi worker.
+    """
+    if not getattr(settings, 'VIEW_CACHE_ENABLED', True):
+        return False
+    return shared_cache_enabled()
+
+
+def namespace_key(namespace, family_id=None):
+    if namespace in FAMILY_NAMESPACES:
+        return f'ns:{namespace}:family:{family_id if family_id is not None else "none"}'
+    return f'ns:{namespace}'
+
+
+def _initial_version():
+    # Key phiên bản bị đẩy khỏi cache thì tạo lại bằng giá trị mới theo thời gian,
+    # không quay về giá trị cũ nên không đọc nhầm response đã cache trước đó
+    return int(time.time() * 1000)
+
+
+def namespace_versions(scopes):
+    """
+    {(namespace, family_id): phiên bản} cho các scope, đọc bằng một lần get_many.
+    """
+    keys = {namespace_key(namespace, family_id): (namespace, family_id) for namespace, family_id in scopes}
+    found = cache.get_many(list(keys))
+    missing = {key: _initial_version() for key in keys if key not in found}
+    for key, version in missing.items():
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        found[key] = version
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump_namespace(namespace, family_ids=(None,)):
+    """
+    Tăng phiên bản của namespace (với namespace theo family: của từng family trong family_ids)
+    sau khi transaction hiện tại commit. Mọi response đã cache theo phiên bản cũ không còn được đọc,
+    chi phí không phụ thuộc số key đã cache.
+    """
+    if namespace in FAMILY_NAMESPACES:
+        keys = [namespace_key(namespace, family_id) for family_id in set(family_ids)]
+    else:
+        keys = [namespace_key(namespace)]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def _cache_key(view_id, request, extra, versions):
+    parts = [
+        view_id,
+        repr(extra),
+        str(timezone.localdate()),  # Trạng thái hạn dùng (D-n) đổi theo ngày
+        request.build_absolute_uri(),  # Link phân trang (next/previous) chứa host
+        ','.join(f'{namespace}:{family_id}={version}' for (namespace, family_id), version in sorted(
+            versions.items(), key=lambda item: (item[0][0], str(item[0][1]))
+        )),
+    ]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return f'view:{view_id}:{digest}'
+
+
+def cached_view(*namespaces, families=None, vary=None, timeout=None):
+    """
+    Cache response GET 200 của một view đọc, key gắn với phiên bản các namespace.
+    namespaces: các namespace dữ liệu của view (GLOBAL_NAMESPACES hoặc FAMILY_NAMESPACES).
+    families(request): ID các family mà dữ liệu của request thuộc về, cho namespace theo family.
+    vary(request): giá trị thêm vào key, ví dụ user và tập quyền khi dữ liệu lọc theo quyền của user.
+
+    Đặt bên trong @api_view (hoặc dùng method_decorator cho action của ViewSet) để request
+    đã xác thực; với view async đặt bên trong @async_api_view.
+
+    Không làm gì khi view_cache_enabled() sai. Response đọc từ bản sao (xem backend.routers)
+    không được cache: bản sao có thể chưa có dữ liệu của phiên bản hiện tại.
+    """
+    timeout = VIEW_CACHE_TIMEOUT if timeout is None else timeout
+
+    def scopes_for(request):
+        family_ids = list(families(request)) if families else [None]
+        scopes = []
+        for namespace in namespaces:
+            if namespace in FAMILY_NAMESPACES:
+                scopes.extend((namespace, family_id) for family_id in family_ids)
+            else:
+                scopes.append((namespace, None))
+        return scopes
+
+    def key_for(view_id, request):
+        versions = namespace_versions(scopes_for(request))
+        return _cache_key(view_id, request, vary(request) if vary else None, versions)
+
+    def decorator(view):
+        view_id = f'{view.__module__}.{view.__qualname__}'
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != 'GET' or not view_cache_enabled():
+                    return await view(request, *args, **kwargs)
+                key = await sync_to_async(key_for)(view_id, request)
+                cached = await cache.aget(key)
+                if cached is not None:
+                    content, content_type = cached
+                    return HttpResponse(content, content_type=content_type)
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200 and not read_from_replica():
+                    await cache.aset(key, (response.content, response['Content-Type']), timeout)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not view_cache_enabled():
+                return view(request, *args, **kwargs)
+            key = key_for(view_id, request)
+            cached = cache.get(key)
+            if cached is not None:
+                return Response(cached)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response) and not read_from_replica():
+                # ReturnDict/ReturnList của serializer được pickle thành dict/list thường
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,154 @@
+import gzip
+import io
+import secrets
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn, thiếu thì chỉ nén gzip
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """
+    {encoding: q} từ header Accept-Encoding, ví dụ 'br;q=1.0, gzip' -> {'br': 1.0, 'gzip': 1.0}.
+    """
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+    return weights
+
+
+def choose_encoding(header, available):
+    """
+    Encoding trong available (theo thứ tự ưu tiên) mà client chấp nhận với q > 0, hoặc None.
+    """
+    weights = parse_accept_encoding(header)
+    for encoding in available:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def _random_filename(max_random_bytes):
+    return b'a' * secrets.randbelow(max_random_bytes) if max_random_bytes else b''
+
+
+def _gzip_string(content, max_random_bytes):
+    # Như django.utils.text.compress_string (Django >= 4.2): tên file ngẫu nhiên trong header
+    # gzip làm độ dài response thay đổi giữa các lần, chống đoán nội dung qua độ dài (BREACH)
+    buf = io.BytesIO()
+    with gzip.GzipFile(filename=_random_filename(max_random_bytes), mode='wb', compresslevel=6, fileobj=buf, mtime=0) as file:
+        file.write(content)
+    return buf.getvalue()
+
+
+def _gzip_sequence(sequence, max_random_bytes):
+    # Như _gzip_string cho response stream, flush sau mỗi chunk như compress_sequence
+    buf = io.BytesIO()
+    with gzip.GzipFile(filename=_random_filename(max_random_bytes), mode='wb', compresslevel=6, fileobj=buf, mtime=0) as file:
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        for chunk in sequence:
+            file.write(chunk)
+            file.flush()
+            data = buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            if data:
+                yield data
+    yield buf.getvalue()
+
+
+def reflects_secrets(request, response):
+    """
+    Response có thể chứa bí mật trong nội dung: dùng CSRF token, hoặc đặt cookie
+    (login/refresh trả access token trong body cùng lúc đặt cookie token).
+    """
+    return bool(request.META.get('CSRF_COOKIE_USED') or response.cookies)
+
+
+def _brotli_sequence(sequence, quality):
+    # Giống compress_sequence: flush sau mỗi chunk để client nhận dữ liệu ngay khi stream
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Nén response bằng brotli (nếu có thư viện brotli) hoặc gzip theo Accept-Encoding.
+    Chỉ nén response từ COMPRESSION_MIN_SIZE byte trở lên; response stream (CSV, NDJSON)
+    được nén từng chunk, file tải về (FileResponse, ví dụ XLSX vốn đã nén) giữ nguyên.
+    gzip thêm tên file ngẫu nhiên tới COMPRESSION_MAX_RANDOM_BYTES byte như GZipMiddleware;
+    brotli không có chỗ để đệm, nên response chứa bí mật (xem reflects_secrets) không được
+    nén để tránh BREACH. Tắt bằng COMPRESSION_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'COMPRESSION_ENABLED', True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+        self.max_random_bytes = getattr(settings, 'COMPRESSION_MAX_RANDOM_BYTES', 100)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or isinstance(response, FileResponse):
+            return response
+        if getattr(response, 'is_async', False):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if reflects_secrets(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(response.streaming_content, self.brotli_quality)
+            else:
+                response.streaming_content = _gzip_sequence(response.streaming_content, self.max_random_bytes)
+            # Không biết trước độ dài sau khi nén
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = _gzip_string(response.content, self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        # Nội dung đã đổi nên ETag mạnh không còn đúng
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import math
+import re
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, URLPattern, URLResolver, NoReverseMatch, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import add_token_version
+from users.models import User
+
+# Giá trị mặc định cho tham số trong URL, ghi đè bằng --param name=value
+DEFAULT_PARAMS = {
+    'compartment': 'cooler',
+    'dataset': 'inventory',
+}
+# Các nhóm URL không đo (trang admin, hậu tố định dạng của router)
+SKIP_PREFIXES = ('admin/',)
+
+
+def default_queries():
+    # Query string cho các endpoint bắt buộc tham số (khoảng ngày, kích thước trang)
+    today = timezone.localdate()
+    date_range = f'start={today - timedelta(days=30)}&end={today + timedelta(days=30)}'
+    return {
+        'recipe-list': 'page_size=20',
+        'meal-plan-export': date_range,
+        'daily_rollups': date_range,
+    }
+
+
+def percentile(values, fraction):
+    # Nearest-rank
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def iter_patterns(patterns, prefix='', namespace=None):
+    """
+    Duyệt cây URL của backend/urls.py, trả về (route, name, tên tham số).
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            child_namespace = ':'.join(filter(None, [namespace, pattern.namespace]))
+            yield from iter_patterns(pattern.url_patterns, route, child_namespace or None)
+        elif isinstance(pattern, URLPattern):
+            name = f'{namespace}:{pattern.name}' if namespace and pattern.name else pattern.name
+            yield route, name, list(pattern.pattern.regex.groupindex)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gọi lần lượt mọi endpoint GET trong backend/urls.py qua Django test client và in ra JSON "
+        "độ trễ p50/p95/p99 (ms), thời gian CPU, số byte gửi đi và số truy vấn, để so sánh giữa các lần chạy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username dùng để xác thực (mặc định: user synthetic đầu tiên)")
+        parser.add_argument(
+            '--bearer', action='store_true',
+            help="Gửi access token thật trong header Authorization thay vì force_authenticate, "
+                 "để số liệu gồm cả chi phí xác thực JWT"
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--param', action='append', default=[], help="Giá trị tham số URL, ví dụ pk=1")
+        parser.add_argument('--only', help="Chỉ đo các route khớp regex này")
+        parser.add_argument('--host', default='localhost', help="Host gửi kèm request (phải nằm trong ALLOWED_HOSTS)")
+        parser.add_argument(
+            '--accept-encoding', default='',
+            help="Header Accept-Encoding gửi kèm, ví dụ 'br, gzip' để đo kích thước sau khi nén"
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help="Đo thêm thông lượng khi gửi đồng thời số request này tới một worker ASGI chạy trong process "
+                 "(iterations × concurrency request mỗi endpoint); so sánh giữa ASYNC_READ_VIEWS=False và True"
+        )
+        parser.add_argument('--output', help="Ghi JSON ra file thay vì stdout")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        params = dict(DEFAULT_PARAMS)
+        for item in options['param']:
+            name, _, value = item.partition('=')
+            params[name] = value
+        only = re.compile(options['only']) if options['only'] else None
+
+        client = APIClient(HTTP_HOST=options['host'], HTTP_ACCEPT_ENCODING=options['accept_encoding'])
+        # force_authenticate chỉ có tác dụng với view DRF, không tới được view async (ASYNC_READ_VIEWS)
+        bearer = options['bearer'] or getattr(settings, 'ASYNC_READ_VIEWS', False)
+        if bearer:
+            # Token cấp giống LoginSerializer; phải còn hạn trong suốt lần đo (ACCESS_TOKEN_LIFETIME)
+            access = add_token_version(RefreshToken.for_user(user), user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        else:
+            client.force_authenticate(user)
+        # ASGI không có force_authenticate: phép đo đồng thời luôn dùng access token thật
+        concurrent_access = (
+            str(add_token_version(RefreshToken.for_user(user), user).access_token) if options['concurrency'] > 0 else None
+        )
+        queries = default_queries()
+        results, skipped = [], []
+        for route, name, arg_names in iter_patterns(get_resolver().url_patterns):
+            if route.startswith(SKIP_PREFIXES) or 'format' in arg_names:
+                continue
+            if only and not only.search(route):
+                continue
+            path = self.build_path(name, arg_names, params)
+            if path is None:
+                skipped.append({'route': route, 'reason': 'thiếu tham số hoặc không có tên URL'})
+                continue
+            if name in queries:
+                path = f'{path}?{queries[name]}'
+            if client.get(path).status_code == 405:
+                skipped.append({'route': route, 'reason': 'không hỗ trợ GET'})
+                continue
+            result = self.measure(client, route, path, options['iterations'], options['warmup'])
+            if options['concurrency'] > 0:
+                result['concurrent'] = asyncio.run(self.measure_concurrent(
+                    path, concurrent_access, options['host'], options['iterations'] * options['concurrency'], options['concurrency']
+                ))
+            results.append(result)
+
+        report = {
+            'user': user.username,
+            'auth': 'bearer' if bearer else 'force_authenticate',
+            'iterations': options['iterations'],
+            'accept_encoding': options['accept_encoding'],
+            'concurrency': options['concurrency'],
+            'async_read_views': getattr(settings, 'ASYNC_READ_VIEWS', False),
+            'endpoints': results,
+            'skipped': skipped,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi kết quả {len(results)} endpoint vào {options['output']}"))
+        else:
+            self.stdout.write(text)
+
+    def get_user(self, username):
+        users = User.objects.all()
+        user = users.filter(username=username).first() if username else (
+            users.filter(username__startswith='synthetic_').order_by('id').first() or users.order_by('id').first()
+        )
+        if user is None:
+            raise CommandError("Không có user để xác thực; chạy seed_synthetic_data hoặc truyền --user.")
+        return user
+
+    def build_path(self, name, arg_names, params):
+        """
+        Dựng URL bằng reverse(); tham số id (pk, *_id) mặc định lấy --param pk (hoặc 1),
+        tham số khác phải có trong params, nếu không route bị bỏ qua.
+        """
+        if not name:
+            return None
+        kwargs = {}
+        for arg in arg_names:
+            value = params.get(arg)
+            if value is None and (arg == 'pk' or arg.endswith('_id')):
+                value = params.get('pk', '1')
+            if value is None:
+                return None
+            kwargs[arg] = value
+        try:
+            return reverse(name, kwargs=kwargs)
+        except NoReverseMatch:
+            return None
+
+    def measure(self, client, route, path, iterations, warmup):
+        for _ in range(warmup):
+            client.get(path)
+        timings, cpu_times, sizes, queries, statuses = [], [], [], [], set()
+        for _ in range(iterations):
+            contexts = [CaptureQueriesContext(connection) for connection in connections.all()]
+            for context in contexts:
+                context.__enter__()
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            response = client.get(path)
+            if getattr(response, 'streaming', False):
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            cpu_times.append((time.process_time() - cpu_start) * 1000)
+            elapsed = (time.perf_counter() - start) * 1000
+            for context in contexts:
+                context.__exit__(None, None, None)
+            timings.append(elapsed)
+            sizes.append(size)
+            queries.append(sum(len(context) for context in contexts))
+            statuses.add(response.status_code)
+        return {
+            'route': route,
+            'path': path,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'cpu_p50_ms': round(percentile(cpu_times, 0.50), 2),
+            'bytes': max(sizes),
+            'content_encoding': response.get('Content-Encoding', ''),
+            'queries': max(queries),
+        }
+
+    async def measure_concurrent(self, path, access, host, total, concurrency):
+        """
+        Gửi total request GET tới ASGIHandler của Django (một worker ASGI, không qua mạng),
+        tối đa concurrency request cùng lúc. Trả về thông lượng (request/giây) và độ trễ dưới tải.
+        """
+        handler = ASGIHandler()
+        route, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': route, 'raw_path': route.encode(), 'query_string': query.encode(),
+            'root_path': '', 'server': (host, 80), 'client': ('127.0.0.1', 0),
+            'headers': [(b'host', host.encode()), (b'authorization', f'Bearer {access}'.encode())],
+        }
+        semaphore = asyncio.Semaphore(concurrency)
+        timings, statuses = [], set()
+
+        async def one():
+            sent = False
+            disconnected = asyncio.Event()
+
+            async def receive():
+                nonlocal sent
+                if not sent:
+                    sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Client giữ kết nối tới khi nhận xong response
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.add(message['status'])
+                elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                    disconnected.set()
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                timings.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': total,
+            'status': sorted(statuses),
+            'requests_per_second': round(total / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+        }
@@ -0,0 +1,210 @@
+import json
+import os
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from backend.caching import GLOBAL_NAMESPACES, bump_namespace
+from fridge.models import Category, Food
+from meal_plans.models import MealPlan, Recipes
+from reports.models import StockEvent
+from reports.stock import record_stock_changes
+from shopping.items import recount
+from shopping.models import ShoppingList, ShoppingListItem
+from shopping.normalization import normalize_item_name, default_unit_for
+from users.access import rebuild_family_access
+from users.models import User, Family, FamilyMember
+
+SAMPLE_RECIPES = os.path.join(settings.BASE_DIR, 'database', 'sample_recipes.json')
+# Đánh dấu dữ liệu sinh ra (tiền tố username/tên family, ghi chú Food, image_name của công thức)
+MARKER = 'synthetic'
+
+CATEGORY_FOODS = {
+    'Rau củ': ['Cà rốt', 'Bắp cải', 'Rau muống', 'Cà chua', 'Bí đỏ', 'Su hào'],
+    'Trái cây': ['Chuối', 'Táo', 'Cam', 'Xoài', 'Dưa hấu'],
+    'Thịt cá': ['Thịt ba chỉ', 'Thịt bò', 'Cá basa', 'Ức gà', 'Tôm'],
+    'Sữa': ['Sữa tươi', 'Sữa chua', 'Phô mai'],
+    'Trứng': ['Trứng gà', 'Trứng vịt'],
+    'Đồ uống': ['Nước cam', 'Trà xanh', 'Nước suối'],
+    'Đồ khô': ['Gạo', 'Mì gói', 'Đậu xanh'],
+    'Gia vị': ['Nước mắm', 'Muối', 'Tiêu', 'Đường'],
+}
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner']
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinh dữ liệu giả lập (user, family, thực phẩm, danh sách mua sắm, công thức, kế hoạch bữa ăn) "
+        "để tái hiện quy mô production ở máy local. Chỉ dùng cho database phát triển."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--families', type=int, default=10)
+        parser.add_argument('--foods', type=int, default=1000)
+        parser.add_argument('--lists', type=int, default=20)
+        parser.add_argument('--items-per-list', type=int, default=30)
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--meal-plans', type=int, default=200)
+        parser.add_argument('--password', default='synthetic123', help="Mật khẩu chung của các user sinh ra")
+        parser.add_argument('--seed', type=int, default=42, help="Seed của bộ sinh số ngẫu nhiên, để chạy lại cho cùng dữ liệu")
+        parser.add_argument('--clear', action='store_true', help="Xóa dữ liệu giả lập đã sinh trước đó")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['clear']:
+            self.clear()
+        with transaction.atomic():
+            users = self.seed_users(options['users'], options['password'])
+            families = self.seed_families(rng, users, options['families'])
+            categories = self.seed_categories()
+            self.seed_foods(rng, categories, options['foods'])
+            self.seed_shopping(rng, users, families, options['lists'], options['items_per_list'])
+            recipes = self.seed_recipes(options['recipes'])
+            self.seed_meal_plans(rng, recipes, options['meal_plans'])
+            # bulk_create không phát signal; namespace 'shopping' đã được tăng trong recount
+            for namespace in GLOBAL_NAMESPACES:
+                bump_namespace(namespace)
+        self.stdout.write(self.style.SUCCESS("Đã sinh dữ liệu giả lập."))
+
+    def clear(self):
+        Family.objects.filter(name__startswith=f'{MARKER} ').delete()
+        User.objects.filter(username__startswith=f'{MARKER}_').delete()
+        Food.objects.filter(note=MARKER).delete()
+        Recipes.objects.filter(image_name=MARKER).delete()
+        self.stdout.write("  đã xóa dữ liệu giả lập cũ")
+
+    def _next_index(self, queryset, field, prefix):
+        # Đánh số tiếp theo để chạy lại nhiều lần không trùng username/tên family
+        return queryset.filter(**{f'{field}__startswith': prefix}).count()
+
+    def seed_users(self, count, password):
+        start = self._next_index(User.objects, 'username', f'{MARKER}_')
+        hashed = make_password(password)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{MARKER}_{i}',
+                email=f'{MARKER}_{i}@example.com',
+                full_name=f'Người dùng {i}',
+                password=hashed,
+            )
+            for i in range(start, start + count)
+        ])
+        self.stdout.write(f"  {len(users)} user")
+        return users
+
+    def seed_families(self, rng, users, count):
+        if not users or not count:
+            return []
+        start = self._next_index(Family.objects, 'name', f'{MARKER} ')
+        families = Family.objects.bulk_create([
+            Family(name=f'{MARKER} {i}', created_by=users[(i - start) % len(users)])
+            for i in range(start, start + count)
+        ])
+        members = []
+        for index, user in enumerate(users):
+            family = families[index % len(families)]
+            if family.created_by_id == user.pk:
+                continue
+            members.append(FamilyMember(family=family, user=family.created_by, related_to=user,
+                                        relationship=rng.choice(['con', 'vợ', 'chồng', 'anh', 'chị', 'em'])))
+            members.append(FamilyMember(family=family, user=user, related_to=family.created_by, relationship='người quen'))
+        FamilyMember.objects.bulk_create(members)
+        # bulk_create không phát signal, dựng lại FamilyAccess cho từng family
+        for family in families:
+            rebuild_family_access(family.pk)
+        self.stdout.write(f"  {len(families)} family, {len(members)} quan hệ")
+        return families
+
+    def seed_categories(self):
+        categories = []
+        for name in CATEGORY_FOODS:
+            category, _ = Category.objects.get_or_create(name=name)
+            categories.append(category)
+        return categories
+
+    def seed_foods(self, rng, categories, count):
+        today = timezone.localdate()
+        foods = []
+        for _ in range(count):
+            category = rng.choice(categories)
+            foods.append(Food(
+                name=rng.choice(CATEGORY_FOODS[category.name]),
+                category=category,
+                compartment=rng.choice(['cooler', 'cooler', 'freezer']),
+                location=rng.choice(['Ngăn trên', 'Ngăn giữa', 'Ngăn dưới', 'Cánh cửa']),
+                quantity=rng.randint(1, 10),
+                expiry_date=today + timedelta(days=rng.randint(-10, 60)),
+                note=MARKER,
+            ))
+        Food.objects.bulk_create(foods, batch_size=1000)
+        record_stock_changes([(food, StockEvent.ADDED, food.quantity) for food in foods])
+        self.stdout.write(f"  {len(foods)} thực phẩm")
+
+    def seed_shopping(self, rng, users, families, count, items_per_list):
+        if not families or not count:
+            return
+        today = timezone.localdate()
+        lists = ShoppingList.objects.bulk_create([
+            ShoppingList(
+                family=family,
+                created_by=family.created_by,
+                name=f'Đi chợ {i + 1}',
+                date=today - timedelta(days=rng.randint(0, 60)),
+            )
+            for i, family in enumerate(rng.choice(families) for _ in range(count))
+        ])
+        items = []
+        for shopping_list in lists:
+            for _ in range(items_per_list):
+                category = rng.choice(list(CATEGORY_FOODS))
+                name = rng.choice(CATEGORY_FOODS[category])
+                items.append(ShoppingListItem(
+                    shopping_list=shopping_list,
+                    item=name,
+                    normalized_item=normalize_item_name(name),
+                    unit=default_unit_for(category),
+                    quantity=rng.randint(1, 5),
+                    category=category,
+                    status=rng.choice(['pending', 'bought']),
+                ))
+        ShoppingListItem.objects.bulk_create(items, batch_size=1000)
+        # bulk_create không phát signal, tính lại bộ đếm của các danh sách vừa tạo
+        recount(ShoppingList.objects.filter(pk__in=[shopping_list.pk for shopping_list in lists]))
+        self.stdout.write(f"  {len(lists)} danh sách mua sắm, {len(items)} item")
+
+    def seed_recipes(self, count):
+        with open(SAMPLE_RECIPES, encoding='utf-8') as handle:
+            samples = json.load(handle)
+        recipes = Recipes.objects.bulk_create([
+            Recipes(
+                title=samples[i % len(samples)]['title'] if i < len(samples) else f"{samples[i % len(samples)]['title']} #{i // len(samples) + 1}",
+                ingredients=samples[i % len(samples)]['ingredients'],
+                cleaned_ingredients=samples[i % len(samples)]['cleaned_ingredients'],
+                instructions=samples[i % len(samples)]['instructions'],
+                image_name=MARKER,
+                img_url='',
+            )
+            for i in range(count)
+        ])
+        self.stdout.write(f"  {len(recipes)} công thức")
+        return recipes
+
+    def seed_meal_plans(self, rng, recipes, count):
+        if not recipes or not count:
+            return
+        today = timezone.localdate()
+        plans = []
+        for _ in range(count):
+            day = today + timedelta(days=rng.randint(-30, 30))
+            plans.append(MealPlan(
+                date=day,
+                day_of_week=day.strftime('%A'),
+                meal_type=rng.choice(MEAL_TYPES),
+                recipe=rng.choice(recipes),
+            ))
+        MealPlan.objects.bulk_create(plans, batch_size=1000)
+        self.stdout.write(f"  {len(plans)} kế hoạch bữa ăn")
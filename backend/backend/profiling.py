@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('sql_profiling')
+
+# Một câu truy vấn lặp lại quá số lần này trong một request bị đánh dấu là N+1
+REPEAT_THRESHOLD = getattr(settings, 'SQL_PROFILING_REPEAT_THRESHOLD', 5)
+# Số mẫu truy vấn lặp lại nhiều nhất được ghi vào log
+TOP_FINGERPRINTS = 5
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\d.]+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Dạng chuẩn hóa của câu SQL: bỏ giá trị cụ thể và gộp danh sách IN (...) để các truy vấn
+    cùng hình dạng (ví dụ trong vòng lặp N+1) có cùng fingerprint.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint_id(shape):
+    return hashlib.md5(shape.encode('utf-8')).hexdigest()[:12]
+
+
+class QueryProfile:
+    """
+    Số truy vấn, tổng thời gian SQL và số lần lặp của từng fingerprint trong một request,
+    thu qua connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            shape = fingerprint(sql)
+            self.shapes[shape] += 1
+            self.samples.setdefault(shape, sql)
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        entries = [f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"']
+        repeated = self.repeated()
+        if repeated:
+            shape, count = repeated[0]
+            entries.append(f'db-repeat;desc="{count}x {fingerprint_id(shape)}"')
+        return ', '.join(entries)
+
+    def log_record(self, request, response):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': self.count,
+            'db_ms': round(self.duration * 1000, 2),
+            'repeated': [
+                {'fingerprint': fingerprint_id(shape), 'count': count, 'sql': self.samples[shape][:300]}
+                for shape, count in self.repeated()[:TOP_FINGERPRINTS]
+            ],
+        }
+
+
+class QueryProfilingMiddleware:
+    """
+    Ghi số truy vấn, tổng thời gian SQL và các truy vấn lặp lại của mỗi request vào header
+    Server-Timing và log 'sql_profiling' (một dòng JSON). Request có truy vấn lặp lại quá
+    SQL_PROFILING_REPEAT_THRESHOLD lần được log ở mức WARNING.
+
+    Chỉ bật khi SQL_PROFILING_ENABLED = True; khi tắt, Django bỏ middleware khỏi chuỗi xử lý
+    (MiddlewareNotUsed) nên không tốn gì. SQL_PROFILING_SAMPLE_RATE (0..1) để chỉ đo một phần request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SQL_PROFILING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = QueryProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+
+        existing = response.get('Server-Timing')
+        timing = profile.server_timing()
+        response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        record = profile.log_record(request, response)
+        level = logging.WARNING if record['repeated'] else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+        return response
@@ -0,0 +1,48 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn, thiếu thì dùng json của thư viện chuẩn như DRF
+    orjson = None
+
+# datetime/date/time đi qua encoder của DRF để giữ đúng định dạng (mili giây, hậu tố Z)
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer dùng orjson, nhanh hơn nhiều với các chuỗi dài như ingredients/instructions.
+    Kết quả giống hệt JSONRenderer: kiểu orjson không hỗ trợ (Decimal, lazy string, datetime...)
+    đi qua encoder của DRF. Khi client yêu cầu indent hoặc không có orjson thì dùng JSONRenderer gốc.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        # Giống JSONRenderer: escape U+2028/U+2029 để chuỗi JSON vẫn hợp lệ trong JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser dùng orjson cho body UTF-8; charset khác hoặc không có orjson thì dùng JSONParser gốc.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
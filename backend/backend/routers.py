@@ -0,0 +1,128 @@
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+# Alias của database bản sao (chỉ đọc) trong settings.DATABASES
+REPLICA_ALIAS = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+# Model được đọc từ bản sao: 'app_label' (cả app) hoặc 'app_label.model_name'
+REPLICA_MODELS = getattr(settings, 'DATABASE_REPLICA_MODELS', ('meal_plans.recipes', 'reports'))
+# Sau khi ghi, client đọc từ database chính trong số giây này (độ trễ đồng bộ của bản sao)
+REPLICA_PIN_SECONDS = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 15)
+REPLICA_PIN_COOKIE = 'db_pinned'
+
+# Trạng thái của request hiện tại: {'pinned': bool, 'written': bool, 'replica_read': bool}; None ngoài request
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _routed(model):
+    meta = model._meta
+    return meta.app_label in REPLICA_MODELS or meta.label_lower in REPLICA_MODELS
+
+
+class ReplicaRouter:
+    """
+    Đọc REPLICA_MODELS từ bản sao, mọi thao tác ghi vào database chính.
+    Đọc từ database chính khi đang trong transaction, hoặc khi request hiện tại
+    (hay một request trước đó của cùng client, xem ReplicaPinningMiddleware) vừa ghi,
+    để client luôn đọc lại được dữ liệu mình vừa ghi.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or not _routed(model):
+            return None
+        state = _request_state.get()
+        if state is not None and (state['pinned'] or state['written']):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state is not None:
+            state['replica_read'] = True
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['written'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Bản sao và database chính có cùng dữ liệu
+        databases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Bản sao nhận schema qua cơ chế đồng bộ của database, không migrate trực tiếp
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+def read_from_replica():
+    """
+    Request hiện tại đã đọc từ bản sao chưa (dữ liệu có thể trễ so với database chính).
+    """
+    state = _request_state.get()
+    return state is not None and state['replica_read']
+
+
+def _start(request):
+    return _request_state.set({
+        'pinned': REPLICA_PIN_COOKIE in request.COOKIES,
+        'written': False,
+        'replica_read': False,
+    })
+
+
+def _finish(token, response):
+    state = _request_state.get()
+    _request_state.reset(token)
+    if state['written']:
+        response.set_cookie(
+            REPLICA_PIN_COOKIE, '1',
+            max_age=REPLICA_PIN_SECONDS,
+            path='/',
+            secure=True,
+            httponly=True,
+            samesite='None',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaPinningMiddleware(get_response):
+    """
+    Theo dõi thao tác ghi trong từng request cho ReplicaRouter. Request có ghi đặt cookie
+    db_pinned trong REPLICA_PIN_SECONDS giây; các request mang cookie này đọc từ database chính.
+    Hỗ trợ cả view đồng bộ và async (xem backend.async_views). Không có bản sao thì bỏ qua.
+    """
+    if not replica_enabled():
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _start(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                _request_state.reset(token)
+                raise
+            return _finish(token, response)
+    else:
+        def middleware(request):
+            token = _start(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                _request_state.reset(token)
+                raise
+            return _finish(token, response)
+    return middleware
@@ -43,15 +43,19 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
+    'channels',
     'meal_plans',
     'users',
     'fridge',
     'reports',
-    'shopping'
+    'shopping',
+    'backend',  # Lệnh quản trị cấp project (seed_synthetic_data, benchmark_endpoints)
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    'backend.compression.CompressionMiddleware',  # Nén brotli/gzip, đặt trước middleware đọc/ghi nội dung
+    'backend.routers.ReplicaPinningMiddleware',  # Chỉ hoạt động khi có database replica
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -59,8 +63,20 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'corsheaders.middleware.CorsMiddleware',
+    'backend.profiling.QueryProfilingMiddleware',  # Chỉ hoạt động khi SQL_PROFILING_ENABLED
 ]
 
+# Đo truy vấn SQL theo request (Server-Timing + log 'sql_profiling'), tắt mặc định
+SQL_PROFILING_ENABLED = env.bool('SQL_PROFILING_ENABLED', default=False)
+SQL_PROFILING_SAMPLE_RATE = env.float('SQL_PROFILING_SAMPLE_RATE', default=1.0)
+SQL_PROFILING_REPEAT_THRESHOLD = env.int('SQL_PROFILING_REPEAT_THRESHOLD', default=5)
+
+# Nén response (xem backend.compression): brotli nếu đã cài thư viện brotli, không thì gzip
+COMPRESSION_ENABLED = env.bool('COMPRESSION_ENABLED', default=True)
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', default=1024)  # byte
+COMPRESSION_BROTLI_QUALITY = env.int('COMPRESSION_BROTLI_QUALITY', default=4)  # 0..11, cao hơn nén tốt hơn nhưng tốn CPU
+COMPRESSION_MAX_RANDOM_BYTES = env.int('COMPRESSION_MAX_RANDOM_BYTES', default=100)  # đệm gzip chống BREACH, 0 để tắt
+
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  
@@ -92,6 +108,42 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
+
+# Bật khi chạy bằng server ASGI (daphne/uvicorn): recipe_list, recipe_detail, meal_plan_list và food_list
+# dùng bản async (async ORM). Mọi middleware phải hỗ trợ async, riêng QueryProfilingMiddleware
+# khi bật sẽ đẩy các view này về chạy trong thread như view đồng bộ.
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=False)
+
+# Cache dùng chung (tập quyền, dashboard, response của các view đọc, xem backend.caching).
+# Mặc định dùng bộ nhớ trong process; khi đó tập quyền, user đã xác thực, đồ thị family và response
+# không được cache (lần xóa cache không tới được worker khác). Khi chạy nhiều worker đổi sang cache
+# dùng chung, ví dụ CACHE_BACKEND=django.core.cache.backends.redis.RedisCache và
+# CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default='smart-grocery'),
+        'KEY_PREFIX': env('CACHE_KEY_PREFIX', default='sgms'),
+        'TIMEOUT': env.int('CACHE_TIMEOUT', default=300),
+    }
+}
+# Cache response của các view đọc (backend.caching). Chỉ có tác dụng khi CACHE_BACKEND dùng chung
+# giữa các process; với cache mặc định trong process, view luôn đọc trực tiếp từ database.
+VIEW_CACHE_ENABLED = env.bool('VIEW_CACHE_ENABLED', default=True)
+# Thời gian giữ response của các view đọc; dữ liệu đổi thì phiên bản namespace đổi nên không cần chờ hết hạn
+VIEW_CACHE_TIMEOUT = env.int('VIEW_CACHE_TIMEOUT', default=300)
+
+# Channel layer cho WebSocket (danh sách mua sắm realtime).
+# Mặc định dùng bộ nhớ trong process; khi chạy nhiều worker đổi sang layer dùng chung, ví dụ
+# CHANNEL_LAYER_BACKEND=channels_redis.core.RedisChannelLayer và CHANNEL_LAYER_HOST=redis://localhost:6379
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': env('CHANNEL_LAYER_BACKEND', default='channels.layers.InMemoryChannelLayer'),
+    }
+}
+if env('CHANNEL_LAYER_HOST', default=''):
+    CHANNEL_LAYERS['default']['CONFIG'] = {'hosts': [env('CHANNEL_LAYER_HOST')]}
 
 
 # Database
@@ -110,6 +162,20 @@ DATABASES = {
     }
 }
 
+# Bản sao chỉ đọc (tùy chọn) cho Recipes và các model của reports, xem backend.routers.
+# Thử ở máy local bằng file SQLite thứ hai: sao chép db.sqlite3 thành replica.sqlite3 rồi đặt
+# DATABASE_REPLICA_NAME=replica.sqlite3 (file này không tự đồng bộ, sao chép lại khi cần).
+if env('DATABASE_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env('DATABASE_REPLICA_NAME'),
+        'HOST': env('REPLICA_SERVER_NAME', default=DATABASES['default']['HOST']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+# Sau khi ghi, client đọc từ database chính trong số giây này (cookie db_pinned)
+DATABASE_REPLICA_PIN_SECONDS = env.int('DATABASE_REPLICA_PIN_SECONDS', default=15)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -185,14 +251,27 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
 
+# Đặt API_FAST_JSON=False để quay về JSONRenderer/JSONParser mặc định của DRF
+API_FAST_JSON = env.bool('API_FAST_JSON', default=True)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',  # JWTAuthentication có cache user
         'users.authentication.CookieJWTAuthentication',  # Sử dụng CookieJWTAuthentication
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    # JSON bằng orjson khi API_FAST_JSON (mặc định), xem backend.renderers
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.FastJSONRenderer' if API_FAST_JSON else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backend.renderers.FastJSONParser' if API_FAST_JSON else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 AUTH_USER_MODEL = 'users.User'
@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import add_token_version, token_user_fields
+
+# Các cỡ dữ liệu mặc định dùng để đo số truy vấn của một endpoint
+QUERY_BUDGET_SIZES = (10, 100, 1000)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin cho TestCase: đo số truy vấn SQL của một endpoint ở nhiều cỡ dữ liệu.
+    Số truy vấn phải không vượt ngân sách và không được tăng theo số dòng (N+1).
+    """
+    data_sizes = QUERY_BUDGET_SIZES
+
+    def query_client(self, user, bearer=False):
+        """
+        Client đã xác thực. bearer=True gửi access token thật như client thật, request đi qua
+        CachedJWTAuthentication và request.user là user lấy từ cache xác thực (chỉ có AUTH_USER_FIELDS).
+        """
+        client = APIClient()
+        if bearer:
+            access = add_token_version(RefreshToken.for_user(user), user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+            client.bearer_user = user
+        else:
+            client.force_authenticate(user=user)
+        return client
+
+    def count_queries(self, client, path, data=None):
+        """
+        Gọi GET path và trả về (response, danh sách câu SQL). Cache được xóa trước
+        để luôn đo trường hợp cache nguội, riêng user của client bearer được nạp lại vào cache
+        xác thực như ở trạng thái ổn định; nội dung stream được đọc hết trong lúc đo.
+        """
+        cache.clear()
+        user = getattr(client, 'bearer_user', None)
+        if user is not None:
+            token_user_fields(user.pk, user.token_version)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path, data or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def assertQueryBudget(self, client, path, budget, grow, data=None, sizes=None):
+        """
+        Với mỗi cỡ trong sizes, gọi grow(n) để thêm n dòng (cộng dồn tới đúng cỡ đó) rồi đo path.
+        Lỗi nếu có lần đo vượt budget hoặc số truy vấn khác nhau giữa các cỡ dữ liệu.
+        """
+        counts = {}
+        seeded = 0
+        for size in sizes or self.data_sizes:
+            grow(size - seeded)
+            seeded = size
+            response, queries = self.count_queries(client, path, data)
+            self.assertLess(response.status_code, 400, f'{path} ({size} dòng) trả về {response.status_code}')
+            counts[size] = len(queries)
+            self.assertLessEqual(
+                len(queries), budget,
+                f'{path} ({size} dòng) dùng {len(queries)} truy vấn, ngân sách {budget}:\n' + '\n'.join(queries)
+            )
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Số truy vấn của {path} tăng theo số dòng: {counts}'
+        )
+        return counts
+
+
+class SharedCacheMixin:
+    """
+    Mixin cho TestCase: dùng cache dùng chung giữa các process (FileBasedCache trong thư mục tạm)
+    thay cho LocMemCache, để chạy các đường dẫn chỉ cache khi backend.caching.shared_cache_enabled().
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory,
+        }})
+        shared_cache.enable()
+        cls.addClassCleanup(shared_cache.disable)
+        super().setUpClass()
@@ -0,0 +1,33 @@
+import gzip
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from .compression import CompressionMiddleware
+
+CONTENT = b'{"name": "recipe"}' * 200
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_MAX_RANDOM_BYTES=100)
+class CompressionTests(SimpleTestCase):
+    def compress(self, response, encoding='gzip', **meta):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding, **meta)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip_length_varies_between_responses(self):
+        responses = [self.compress(HttpResponse(CONTENT)) for _ in range(20)]
+        for response in responses:
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), CONTENT)
+        self.assertGreater(len({len(response.content) for response in responses}), 1)
+
+    def test_gzip_streaming(self):
+        response = self.compress(StreamingHttpResponse(iter([CONTENT, CONTENT])))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), CONTENT * 2)
+
+    def test_response_with_secrets_is_not_compressed(self):
+        response = HttpResponse(CONTENT)
+        response.set_cookie('refresh_token', 'secret')
+        for encoding in ('br', 'gzip'):
+            with self.subTest(encoding=encoding):
+                self.assertFalse(self.compress(response, encoding).has_header('Content-Encoding'))
+                self.assertFalse(self.compress(HttpResponse(CONTENT), encoding, CSRF_COOKIE_USED=True).has_header('Content-Encoding'))
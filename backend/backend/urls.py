@@ -7,4 +7,5 @@ urlpatterns = [
     path('fridge/', include('fridge.urls')),
     path('shopping/', include('shopping.urls')),
     path('users/', include('users.urls')),
+    path('reports/', include('reports.urls')),
 ]
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FridgeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fridge"
+
+    def ready(self):
+        from . import signals  # noqa: F401
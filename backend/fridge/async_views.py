@@ -0,0 +1,18 @@
+from datetime import datetime
+from backend.async_views import async_api_view, json_response
+from backend.caching import cached_view
+from .queries import food_queryset, food_rows
+
+
+@async_api_view
+@cached_view('fridge', 'categories')
+async def food_list(request, compartment='cooler'):
+    """
+    Bản async của views.food_list (cùng tham số và dữ liệu trả về), đọc bằng async ORM
+    để worker ASGI không bị chặn trong lúc chờ database.
+    """
+    foods, error = food_queryset(compartment, request.GET)
+    if error:
+        return json_response({'status': 'error', 'message': error}, status=400)
+    foods = [food async for food in foods]
+    return json_response({'foods': food_rows(foods, datetime.now().date())})
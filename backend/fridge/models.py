@@ -22,9 +22,23 @@ class Food(models.Model):
     location = models.CharField(max_length=50)  # Vị trí cất
     quantity = models.PositiveIntegerField()  # Số lượng
     registered_date = models.DateField(auto_now_add=True)  # Thời gian đăng ký
-    expiry_date = models.DateField()  # Thời gian hết hạn
+    expiry_date = models.DateField(db_index=True)  # Thời gian hết hạn
     note = models.TextField(blank=True)  # Ghi chú, có thể để trống
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_saved_state()
+        return instance
+
+    def remember_saved_state(self):
+        # Ghi nhớ số lượng đã lưu để ghi nhận phần đã dùng khi số lượng giảm (xem reports.signals)
+        self._saved_quantity = self.__dict__.get('quantity')
+
+    @property
+    def saved_quantity(self):
+        return getattr(self, '_saved_quantity', None)
+
     def __str__(self):
         return f"{self.name} ({self.compartment})"
 
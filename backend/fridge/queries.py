@@ -0,0 +1,86 @@
+import logging
+from datetime import datetime
+from django.db.models import Q
+from .models import Food
+from .serializers import FoodSerializer
+from .shelf_life import expiry_status
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def food_queryset(compartment, params):
+    """
+    Thực phẩm của một ngăn theo các tham số của food_list (search, quantity, registered_date, expiry_date).
+    Trả về (queryset, None), hoặc (None, thông báo lỗi) khi tham số không hợp lệ.
+    Dùng chung cho view đồng bộ và view async (xem fridge.async_views).
+    """
+    foods = Food.objects.filter(compartment=compartment)
+
+    # Tìm kiếm theo nhiều trường
+    search_query = params.get('search', None)
+    if search_query:
+        # Chuyển đổi search_query thành chuỗi để tìm kiếm
+        search_number = str(search_query)
+
+        # Tìm kiếm trong các thành phần ngày
+        date_filter = (
+            Q(registered_date__day__contains=search_number) |
+            Q(registered_date__month__contains=search_number) |
+            Q(registered_date__year__contains=search_number) |
+            Q(expiry_date__day__contains=search_number) |
+            Q(expiry_date__month__contains=search_number) |
+            Q(expiry_date__year__contains=search_number)
+        )
+
+        # Tìm kiếm trong quantity bằng cách chuyển quantity thành chuỗi
+        quantity_filter = Q(quantity__contains=search_number)
+
+        # Tìm kiếm trên các trường văn bản, số lượng, và ngày
+        foods = foods.filter(
+            Q(name__icontains=search_query) |
+            Q(category__name__icontains=search_query) |
+            Q(location__icontains=search_query) |
+            Q(note__icontains=search_query) |
+            quantity_filter |
+            date_filter
+        )
+
+    # Lọc theo số lượng (quantity) nếu có
+    quantity = params.get('quantity', None)
+    if quantity:
+        try:
+            foods = foods.filter(quantity=int(quantity))  # Khớp chính xác với quantity
+        except ValueError:
+            logger.warning(f"Định dạng quantity không hợp lệ: {quantity}")
+            return None, 'Định dạng quantity không hợp lệ.'
+
+    # Lọc theo ngày đăng ký và ngày hết hạn nếu có (khớp chính xác)
+    for field in ('registered_date', 'expiry_date'):
+        value = params.get(field, None)
+        if value:
+            try:
+                foods = foods.filter(**{field: _parse_date(value)})
+            except ValueError:
+                logger.warning(f"Định dạng {field} không hợp lệ: {value}")
+                return None, f'Định dạng {field} không hợp lệ.'
+
+    return foods.select_related('category'), None
+
+
+def food_rows(foods, today):
+    """
+    Dữ liệu của FoodSerializer kèm trạng thái hết hạn (expiry_status, status_color) của từng thực phẩm.
+    """
+    rows = []
+    for food, item in zip(foods, FoodSerializer(foods, many=True).data):
+        expiry_label, status_color = expiry_status(food.expiry_date, today)
+        rows.append({
+            **item,
+            'expiry_status': expiry_label,
+            'status_color': status_color
+        })
+    return rows
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.conf import settings
+
+# Số ngày bảo quản mặc định theo danh mục (tên danh mục viết thường), dùng khi
+# thực phẩm được đưa vào tủ mà không có ngày hết hạn cụ thể.
+DEFAULT_SHELF_LIFE_DAYS = {
+    'cooler': {
+        'rau củ': 7,
+        'trái cây': 7,
+        'thịt cá': 3,
+        'thịt': 3,
+        'cá': 2,
+        'hải sản': 2,
+        'sữa': 7,
+        'trứng': 21,
+        'đồ uống': 30,
+        'đồ khô': 180,
+        'gia vị': 365,
+    },
+    'freezer': {
+        'thịt cá': 90,
+        'thịt': 90,
+        'cá': 60,
+        'hải sản': 60,
+        'rau củ': 60,
+    },
+}
+
+# Dùng khi danh mục không có trong bảng
+FALLBACK_SHELF_LIFE_DAYS = {
+    'cooler': 5,
+    'freezer': 30,
+}
+
+
+def shelf_life_days(category_name, compartment='cooler'):
+    table = getattr(settings, 'FRIDGE_SHELF_LIFE_DAYS', DEFAULT_SHELF_LIFE_DAYS)
+    key = (category_name or '').strip().lower()
+    days = table.get(compartment, {}).get(key)
+    if days is None:
+        days = FALLBACK_SHELF_LIFE_DAYS.get(compartment, FALLBACK_SHELF_LIFE_DAYS['cooler'])
+    return days
+
+
+def default_expiry_date(category_name, compartment, start):
+    return start + timedelta(days=shelf_life_days(category_name, compartment))
+
+
+def expiry_status(expiry_date, today):
+    """
+    Nhãn hạn dùng hiển thị trên giao diện: (D+n đã quá hạn | D-Day | D-n còn hạn, màu).
+    """
+    if expiry_date < today:
+        return f"D+{(today - expiry_date).days}", "red"
+    if expiry_date == today:
+        return "D-Day", "orange"
+    return f"D-{(expiry_date - today).days}", "green"
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.caching import bump_namespace
+from .models import Category, Food
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    bump_namespace('categories')
+
+
+@receiver([post_save, post_delete], sender=Food)
+def food_changed(sender, instance, **kwargs):
+    bump_namespace('fridge')
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from backend.testing import QueryBudgetMixin
+from users.models import User
+from .models import Food, Category
+
+
+class FoodQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        cls.categories = [Category.objects.create(name=f'Danh mục {i}') for i in range(5)]
+
+    def setUp(self):
+        self.client = self.query_client(self.user)
+
+    def add_foods(self, count, compartment='cooler'):
+        today = timezone.localdate()
+        Food.objects.bulk_create([
+            Food(
+                name=f'Thực phẩm {i}',
+                category=self.categories[i % len(self.categories)],
+                compartment=compartment,
+                location='Ngăn 1',
+                quantity=i % 7 + 1,
+                expiry_date=today + timedelta(days=i % 10 - 3),
+            )
+            for i in range(count)
+        ])
+
+    def test_food_list(self):
+        self.assertQueryBudget(self.client, reverse('food_list', args=['cooler']), 1, self.add_foods)
+
+    def test_food_list_search(self):
+        self.assertQueryBudget(
+            self.client, reverse('food_list', args=['freezer']), 1,
+            lambda count: self.add_foods(count, compartment='freezer'),
+            data={'search': 'Thực phẩm'}
+        )
@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Dưới ASGI (ASYNC_READ_VIEWS=True) food_list dùng bản async, xem fridge.async_views
+read_views = async_views if getattr(settings, 'ASYNC_READ_VIEWS', False) else views
 
 urlpatterns = [
     path('foods/add_food/', views.add_food, name='add_food'),
-    path('foods/compartment/<str:compartment>/', views.food_list, name='food_list'),
+    path('foods/compartment/<str:compartment>/', read_views.food_list, name='food_list'),
     path('foods/<int:food_id>/', views.update_food, name='update_food'),  
     path('foods/<int:food_id>/delete/', views.delete_food, name='delete_food'),
     path('categories/add/', views.add_category, name='add_category'),   
@@ -0,0 +1,95 @@
+from django.conf import settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from backend.async_views import async_api_view, json_response
+from backend.caching import cached_view
+from .models import Recipes
+from .queries import recipe_queryset, meal_plan_queryset
+from .serializers import RecipeSerializer, MealPlanSerializer
+
+# Số công thức mỗi trang khi không truyền page_size
+RECIPE_PAGE_SIZE = getattr(settings, 'RECIPE_PAGE_SIZE', 10)
+
+
+def _positive_int(value, default):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    return number if number > 0 else default
+
+
+def _page_link(request, page_number, num_pages):
+    if page_number < 1 or page_number > num_pages:
+        return None
+    url = request.build_absolute_uri()
+    if page_number == 1:
+        return remove_query_param(url, 'page')
+    return replace_query_param(url, 'page', page_number)
+
+
+@async_api_view
+@cached_view('recipes')
+async def recipe_list(request):
+    """
+    Bản async của views.recipe_list, cùng dạng phân trang {count, next, previous, results}.
+    Query: ?search=...&page=1&page_size=10
+    Truy vấn đếm và truy vấn lấy trang chạy lần lượt: async ORM của Django chạy mọi truy vấn
+    của một request trên cùng một thread và một kết nối. Lợi ích của bản async là worker ASGI
+    phục vụ request khác trong lúc request này chờ database (đo bằng benchmark_endpoints --concurrency).
+    """
+    try:
+        recipes = recipe_queryset(request.GET.get('search', None))
+        page_size = _positive_int(request.GET.get('page_size'), RECIPE_PAGE_SIZE)
+        page = request.GET.get('page', 1)
+        page_number = None if page == 'last' else _positive_int(page, 0)
+        if page_number == 0:
+            return json_response({'detail': 'Invalid page.'}, status=404)
+
+        count = await recipes.acount()
+        num_pages = max(1, -(-count // page_size))
+        if page_number is None:
+            page_number = num_pages
+        if page_number > num_pages:
+            return json_response({'detail': 'Invalid page.'}, status=404)
+        offset = (page_number - 1) * page_size
+        rows = [recipe async for recipe in recipes[offset:offset + page_size]]
+        return json_response({
+            'count': count,
+            'next': _page_link(request, page_number + 1, num_pages),
+            'previous': _page_link(request, page_number - 1, num_pages),
+            'results': RecipeSerializer(rows, many=True).data,
+        })
+    except Exception as e:
+        return json_response({"error": f"Không thể lấy danh sách công thức: {str(e)}"}, status=500)
+
+
+@async_api_view
+@cached_view('recipes')
+async def recipe_detail(request, pk):
+    """
+    Bản async của views.recipe_detail.
+    """
+    try:
+        recipe = await Recipes.objects.alive().aget(pk=pk)
+        return json_response(RecipeSerializer(recipe).data)
+    except Recipes.DoesNotExist:
+        return json_response({"error": "Công thức không tồn tại."}, status=404)
+    except Exception as e:
+        return json_response({"error": f"Không thể lấy chi tiết công thức: {str(e)}"}, status=500)
+
+
+@async_api_view
+@cached_view('meal_plans', 'recipes')
+async def meal_plan_list(request):
+    """
+    Bản async của views.meal_plan_list.
+    Query parameter: ?date=YYYY-MM-DD hoặc ?meal_type=<type>
+    """
+    try:
+        meal_plans, error = meal_plan_queryset(request.GET.get('date', None), request.GET.get('meal_type', None))
+        if error:
+            return json_response({"error": error}, status=400)
+        meal_plans = [meal_plan async for meal_plan in meal_plans]
+        return json_response(MealPlanSerializer(meal_plans, many=True).data)
+    except Exception as e:
+        return json_response({"error": f"Không thể lấy danh sách kế hoạch bữa ăn: {str(e)}"}, status=500)
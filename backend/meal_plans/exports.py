@@ -0,0 +1,137 @@
+from datetime import timezone as dt_timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .models import MealPlan, MealPlanDeletion
+
+# Số dòng lấy mỗi lần từ cursor của database khi xuất dữ liệu
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = ('id', 'date', 'day_of_week', 'meal_type', 'recipe_id', 'recipe__title', 'updated_at')
+
+
+def range_queryset(start, end):
+    """
+    Kế hoạch bữa ăn trong khoảng [start, end], bỏ qua các công thức đã xóa mềm.
+    """
+    return MealPlan.objects.filter(date__range=(start, end), recipe__deleted_at__isnull=True)
+
+
+def record_removals(dates):
+    """
+    Ghi lại thời điểm kế hoạch của các ngày bị xóa hoặc dời sang ngày khác, để Last-Modified của
+    mọi khoảng ngày chứa chúng tăng lên (bỏ bớt dòng không làm thời điểm sửa gần nhất thay đổi).
+    Mỗi ngày một dòng, chỉ giữ lần gần nhất. Gọi trong transaction của thao tác xóa.
+    """
+    dates = set(dates)
+    if not dates:
+        return
+    now = timezone.now()
+    MealPlanDeletion.objects.bulk_create(
+        [MealPlanDeletion(date=date, deleted_at=now) for date in dates], ignore_conflicts=True
+    )
+    MealPlanDeletion.objects.filter(date__in=dates).update(deleted_at=now)
+
+
+def export_state(start, end):
+    """
+    Số kế hoạch của khoảng [start, end] và thời điểm dữ liệu xuất thay đổi gần nhất: sửa kế hoạch,
+    sửa công thức (tên công thức nằm trong dữ liệu xuất), xóa mềm công thức, xóa hoặc dời kế hoạch.
+    Hai truy vấn: một aggregate trên kế hoạch và một trên MealPlanDeletion.
+    """
+    alive = Q(recipe__deleted_at__isnull=True)
+    state = MealPlan.objects.filter(date__range=(start, end)).aggregate(
+        total=Count('id', filter=alive),
+        plan_modified=Max('updated_at', filter=alive),
+        recipe_modified=Max('recipe__updated_at', filter=alive),
+        recipe_deleted=Max('recipe__deleted_at'),
+    )
+    removed = MealPlanDeletion.objects.filter(date__range=(start, end)).aggregate(removed=Max('deleted_at'))['removed']
+    moments = [
+        moment for moment in (state['plan_modified'], state['recipe_modified'], state['recipe_deleted'], removed)
+        if moment is not None
+    ]
+    return {'total': state['total'], 'last_modified': max(moments) if moments else None}
+
+
+def export_queryset(start, end):
+    """
+    Kế hoạch bữa ăn trong khoảng [start, end] kèm tên công thức, chỉ lấy các cột cần xuất.
+    """
+    return (
+        range_queryset(start, end)
+        .order_by('date', 'id')
+        .values(*EXPORT_FIELDS)
+    )
+
+
+def iter_ndjson(queryset):
+    """
+    Mỗi kế hoạch bữa ăn là một dòng JSON, đọc từ database theo từng chunk bằng .iterator().
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield encoder.encode({
+            'id': row['id'],
+            'date': row['date'],
+            'day_of_week': row['day_of_week'],
+            'meal_type': row['meal_type'],
+            'recipe_id': row['recipe_id'],
+            'recipe_title': row['recipe__title'],
+            'updated_at': row['updated_at'],
+        }) + '\n'
+
+
+def _ical_escape(value):
+    # RFC 5545 3.3.11: escape \ ; , và xuống dòng trong giá trị TEXT
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _ical_line(line):
+    # RFC 5545 3.1: mỗi dòng tối đa 75 octet, dòng tiếp theo bắt đầu bằng một dấu cách
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = b''
+    limit = 75
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current.decode('utf-8'))
+            current = b''
+            limit = 74  # Trừ dấu cách ở đầu dòng nối
+        current += char_bytes
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_ical(queryset, host='smart-grocery'):
+    """
+    Xuất kế hoạch bữa ăn dưới dạng iCalendar, mỗi kế hoạch là một VEVENT cả ngày.
+    """
+    dtstamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield _ical_line('BEGIN:VCALENDAR')
+    yield _ical_line('VERSION:2.0')
+    yield _ical_line('PRODID:-//Smart Grocery Management System//Meal Plans//VI')
+    yield _ical_line('CALSCALE:GREGORIAN')
+    yield _ical_line('X-WR-CALNAME:Meal Plans')
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        day = row['date'].strftime('%Y%m%d')
+        yield _ical_line('BEGIN:VEVENT')
+        yield _ical_line(f"UID:meal-plan-{row['id']}@{host}")
+        yield _ical_line(f'DTSTAMP:{dtstamp}')
+        yield _ical_line(f'DTSTART;VALUE=DATE:{day}')
+        if row['updated_at']:
+            yield _ical_line(f"LAST-MODIFIED:{row['updated_at'].astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+        yield _ical_line(f"SUMMARY:{_ical_escape(row['meal_type'])}: {_ical_escape(row['recipe__title'])}")
+        yield _ical_line(f"CATEGORIES:{_ical_escape(row['meal_type'])}")
+        yield _ical_line('END:VEVENT')
+    yield _ical_line('END:VCALENDAR')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from meal_plans.models import Recipes
+from meal_plans.purge import purge_recipe, PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Xóa hẳn các công thức đã xóa mềm cùng các kế hoạch bữa ăn tham chiếu tới chúng, theo từng lô."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--recipe', type=int, help="Chỉ purge một công thức theo ID.")
+
+    def handle(self, *args, **options):
+        # Đọc từ database chính: bản sao có thể chưa thấy công thức vừa xóa mềm
+        recipes = Recipes.objects.using(DEFAULT_DB_ALIAS).tombstoned().order_by('deleted_at')
+        if options['recipe']:
+            recipes = recipes.filter(pk=options['recipe'])
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        if not recipe_ids:
+            self.stdout.write("Không có công thức nào chờ purge.")
+            return
+
+        def report(recipe_id, deleted, remaining):
+            self.stdout.write(f"  công thức {recipe_id}: đã xóa {deleted}, còn {remaining}")
+
+        for recipe_id in recipe_ids:
+            self.stdout.write(f"Purge công thức {recipe_id}...")
+            total = purge_recipe(recipe_id, batch_size=options['batch_size'], progress=report)
+            self.stdout.write(self.style.SUCCESS(f"Công thức {recipe_id}: đã xóa {total} kế hoạch bữa ăn."))
@@ -1,5 +1,13 @@
 from django.db import models
 
+class RecipeQuerySet(models.QuerySet):
+    def alive(self):
+        # Bỏ qua các công thức đã bị xóa mềm (đang chờ purge)
+        return self.filter(deleted_at__isnull=True)
+
+    def tombstoned(self):
+        return self.filter(deleted_at__isnull=False)
+
 class Recipes(models.Model):
     id = models.AutoField(primary_key=True)  # THÊM DÒNG NÀY để đồng bộ với bảng thật
     title = models.CharField(max_length=255, default="")  # Đồng bộ với nvarchar(255)
@@ -8,6 +16,10 @@ class Recipes(models.Model):
     image_name = models.CharField(max_length=255, blank=True, null=True)  # Đồng bộ với nvarchar(255)
     cleaned_ingredients = models.TextField(blank=True, null=True)
     img_url = models.CharField(max_length=255, blank=True, null=True)  # CharField cho đường dẫn tĩnh
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)  # Xóa mềm: khác NULL nghĩa là đang chờ purge
+    updated_at = models.DateTimeField(auto_now=True)  # Thời điểm sửa gần nhất, tên công thức nằm trong dữ liệu xuất (Last-Modified/ETag)
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -23,6 +35,7 @@ class MealPlan(models.Model):
     day_of_week = models.CharField(max_length=10, default="Monday")
     meal_type = models.CharField(max_length=50)
     recipe = models.ForeignKey(Recipes, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)  # Thời điểm sửa gần nhất, dùng cho Last-Modified/ETag khi xuất dữ liệu
 
     def __str__(self):
         return f"{self.meal_type} on {self.date}"
@@ -32,3 +45,29 @@ class MealPlan(models.Model):
         verbose_name = "Meal Plan"
         verbose_name_plural = "Meal Plans"
         ordering = ['date']
+        indexes = [models.Index(fields=['date', 'id'])]  # Xuất theo khoảng ngày quét theo index
+
+class MealPlanDeletion(models.Model):
+    date = models.DateField(unique=True)  # Ngày có kế hoạch bị xóa hoặc dời sang ngày khác
+    deleted_at = models.DateTimeField()  # Lần gần nhất, dùng cho Last-Modified khi xuất dữ liệu
+
+    def __str__(self):
+        return f"{self.date} ({self.deleted_at})"
+
+    class Meta:
+        db_table = 'meal_plan_deletions'
+        verbose_name = "Meal Plan Deletion"
+        verbose_name_plural = "Meal Plan Deletions"
+
+class PurgedRecipe(models.Model):
+    recipe_id = models.IntegerField(unique=True)  # ID của công thức đã bị xóa hẳn (không còn dòng trong Recipes)
+    title = models.CharField(max_length=255, default="")
+    purged_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.recipe_id} ({self.title})"
+
+    class Meta:
+        db_table = 'purged_recipes'
+        verbose_name = "Purged Recipe"
+        verbose_name_plural = "Purged Recipes"
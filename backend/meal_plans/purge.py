@@ -0,0 +1,100 @@
+import logging
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from .exports import record_removals
+from .models import Recipes, MealPlan, PurgedRecipe
+
+logger = logging.getLogger(__name__)
+
+# Số kế hoạch bữa ăn bị xóa trong mỗi transaction khi purge
+PURGE_BATCH_SIZE = getattr(settings, 'RECIPE_PURGE_BATCH_SIZE', 500)
+
+
+def purge_recipe(recipe_id, batch_size=PURGE_BATCH_SIZE, progress=None):
+    """
+    Xóa dần các kế hoạch bữa ăn tham chiếu tới một công thức đã xóa mềm, mỗi lô một transaction
+    ngắn, rồi xóa hẳn công thức. Trả về tổng số kế hoạch đã xóa.
+    progress(recipe_id, deleted, remaining) được gọi sau mỗi lô.
+    Chạy trong thread nền không có request ghim về database chính, nên mọi lần đọc đều dùng
+    database chính: bản sao (xem backend.routers) có thể chưa thấy công thức vừa xóa mềm.
+    """
+    if not Recipes.objects.using(DEFAULT_DB_ALIAS).tombstoned().filter(pk=recipe_id).exists():
+        return 0
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                MealPlan.objects.using(DEFAULT_DB_ALIAS).filter(recipe_id=recipe_id)
+                .order_by('id')
+                .values_list('id', 'date')[:batch_size]
+            )
+            if not rows:
+                break
+            MealPlan.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=[plan_id for plan_id, _date in rows]).delete()
+            # Last-Modified của dữ liệu xuất không được lùi lại khi kế hoạch bị xóa hẳn
+            record_removals(date for _plan_id, date in rows)
+        deleted += len(rows)
+        remaining = MealPlan.objects.using(DEFAULT_DB_ALIAS).filter(recipe_id=recipe_id).count()
+        logger.info(f"Purge công thức {recipe_id}: đã xóa {deleted} kế hoạch, còn {remaining}")
+        if progress:
+            progress(recipe_id, deleted, remaining)
+    # Không còn kế hoạch nào tham chiếu, xóa công thức không còn cascade; ghi lại để purge_status
+    # phân biệt công thức đã purge với ID không tồn tại
+    with transaction.atomic():
+        recipe = Recipes.objects.using(DEFAULT_DB_ALIAS).tombstoned().filter(pk=recipe_id)
+        title = recipe.values_list('title', flat=True).first()
+        if title is not None:
+            PurgedRecipe.objects.using(DEFAULT_DB_ALIAS).get_or_create(recipe_id=recipe_id, defaults={'title': title})
+            recipe.delete()
+    logger.info(f"Purge công thức {recipe_id} hoàn tất, tổng cộng {deleted} kế hoạch")
+    return deleted
+
+
+def purge_status(recipe_id):
+    """
+    Tiến độ purge của một công thức, tính trực tiếp từ số kế hoạch còn lại trên database chính.
+    Trả về None nếu công thức không tồn tại và cũng chưa từng được purge.
+    """
+    recipe = Recipes.objects.using(DEFAULT_DB_ALIAS).filter(pk=recipe_id).values('deleted_at').first()
+    if recipe is None:
+        purged = PurgedRecipe.objects.using(DEFAULT_DB_ALIAS).filter(recipe_id=recipe_id).values('purged_at').first()
+        if purged is None:
+            return None
+        return {
+            'recipe_id': recipe_id,
+            'deleted_at': None,
+            'purged_at': purged['purged_at'],
+            'remaining_meal_plans': 0,
+            'purged': True,
+        }
+    return {
+        'recipe_id': recipe_id,
+        'deleted_at': recipe['deleted_at'],
+        'purged_at': None,
+        'remaining_meal_plans': MealPlan.objects.using(DEFAULT_DB_ALIAS).filter(recipe_id=recipe_id).count(),
+        'purged': False,
+    }
+
+
+def _run_purge(recipe_id):
+    close_old_connections()
+    try:
+        purge_recipe(recipe_id)
+    except Exception:
+        # Công thức vẫn ở trạng thái xóa mềm, lệnh purge_deleted_recipes sẽ xử lý lại
+        logger.exception(f"Purge công thức {recipe_id} thất bại")
+    finally:
+        close_old_connections()
+
+
+def schedule_purge(recipe_id):
+    """
+    Chạy purge trong một thread nền sau khi transaction hiện tại commit.
+    Tắt bằng RECIPE_PURGE_IN_BACKGROUND = False để chỉ purge qua lệnh quản trị.
+    """
+    if not getattr(settings, 'RECIPE_PURGE_IN_BACKGROUND', True):
+        return
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_purge, args=(recipe_id,), daemon=True).start()
+    )
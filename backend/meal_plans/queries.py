@@ -0,0 +1,37 @@
+from datetime import datetime
+from django.db.models import Q
+from .models import Recipes, MealPlan
+
+# Các cột RecipeSerializer đọc; thiếu cột nào thì mỗi dòng sẽ tốn thêm một truy vấn
+RECIPE_LIST_FIELDS = ('title', 'ingredients', 'instructions', 'img_url')
+
+
+def recipe_queryset(search_query=None):
+    """
+    Công thức chưa bị xóa, lọc theo search trên tiêu đề, nguyên liệu và cách làm.
+    Dùng chung cho view đồng bộ và view async (xem meal_plans.async_views).
+    """
+    recipes = Recipes.objects.alive().only(*RECIPE_LIST_FIELDS)
+    if search_query:
+        recipes = recipes.filter(
+            Q(title__icontains=search_query) |
+            Q(ingredients__icontains=search_query) |
+            Q(instructions__icontains=search_query)
+        )
+    return recipes
+
+
+def meal_plan_queryset(date_query=None, meal_type_query=None):
+    """
+    Kế hoạch bữa ăn (bỏ công thức đã xóa) kèm công thức, lọc theo ngày và loại bữa ăn.
+    Trả về (queryset, None), hoặc (None, thông báo lỗi) khi ngày không hợp lệ.
+    """
+    meal_plans = MealPlan.objects.filter(recipe__deleted_at__isnull=True).select_related('recipe')
+    if date_query:
+        try:
+            meal_plans = meal_plans.filter(date=datetime.strptime(date_query, '%Y-%m-%d').date())
+        except ValueError:
+            return None, "Định dạng ngày không hợp lệ. Sử dụng YYYY-MM-DD."
+    if meal_type_query:
+        meal_plans = meal_plans.filter(meal_type__icontains=meal_type_query)
+    return meal_plans, None
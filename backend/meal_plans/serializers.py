@@ -9,7 +9,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 class MealPlanSerializer(serializers.ModelSerializer):
     recipe = RecipeSerializer(read_only=True)
     recipe_id = serializers.PrimaryKeyRelatedField(
-        queryset=Recipes.objects.all(), source='recipe', write_only=True
+        queryset=Recipes.objects.alive(), source='recipe', write_only=True
     )
 
     class Meta:
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.caching import bump_namespace
+from .models import Recipes, MealPlan
+
+
+@receiver([post_save, post_delete], sender=Recipes)
+def recipe_changed(sender, instance, **kwargs):
+    bump_namespace('recipes')
+
+
+# Không nối post_delete cho MealPlan: receiver sẽ làm purge (meal_plans.purge) mất fast delete.
+# Kế hoạch bị purge thuộc công thức đã xóa mềm nên vốn đã bị ẩn; meal_plan_delete tự tăng phiên bản.
+@receiver(post_save, sender=MealPlan)
+def meal_plan_saved(sender, instance, **kwargs):
+    bump_namespace('meal_plans')
@@ -1,14 +1,184 @@
-import pyodbc
-
-conn_str = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=DESKTOP-TSILIEL;"
-    "DATABASE=FoodRecipeDB;"
-    "Trusted_Connection=yes;"
-)
-try:
-    conn = pyodbc.connect(conn_str)
-    print("Connection successful!")
-    conn.close()
-except Exception as e:
-    print(f"Error: {e}")
\ No newline at end of file
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.test import APIClient
+from backend.routers import ReplicaRouter, _routed
+from backend.testing import QueryBudgetMixin
+from users.models import User
+from .models import Recipes, MealPlan, PurgedRecipe
+from .purge import purge_recipe, purge_status
+
+
+class MealPlansQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        cls.recipe = Recipes.objects.create(title='Canh chua', ingredients='cá, me', instructions='Nấu')
+
+    def setUp(self):
+        self.client = self.query_client(self.user)
+
+    def add_recipes(self, count):
+        Recipes.objects.bulk_create([
+            Recipes(title=f'Món {i}', ingredients='rau, thịt', instructions='Nấu chín')
+            for i in range(count)
+        ])
+
+    def add_meal_plans(self, count):
+        today = timezone.localdate()
+        recipes = Recipes.objects.bulk_create([
+            Recipes(title=f'Món {i}', ingredients='rau, thịt', instructions='Nấu chín')
+            for i in range(count)
+        ])
+        MealPlan.objects.bulk_create([
+            MealPlan(date=today + timedelta(days=i % 7), meal_type='Bữa tối', recipe=recipe)
+            for i, recipe in enumerate(recipes)
+        ])
+
+    def export_range(self):
+        today = timezone.localdate()
+        return {'start': today.isoformat(), 'end': (today + timedelta(days=6)).isoformat()}
+
+    def test_recipe_list(self):
+        # Một truy vấn đếm và một truy vấn lấy trang
+        self.assertQueryBudget(self.client, reverse('recipe-list'), 2, self.add_recipes, data={'page_size': 50})
+
+    def test_recipe_list_search(self):
+        self.assertQueryBudget(self.client, reverse('recipe-list'), 2, self.add_recipes, data={'search': 'rau', 'page_size': 50})
+
+    def test_meal_plan_list(self):
+        self.assertQueryBudget(self.client, reverse('meal-plan-list'), 1, self.add_meal_plans)
+
+    def test_meal_plan_export_ndjson(self):
+        # Hai truy vấn tính ETag/Last-Modified (kế hoạch và MealPlanDeletion) và một truy vấn đọc stream
+        self.assertQueryBudget(self.client, reverse('meal-plan-export'), 3, self.add_meal_plans, data=self.export_range())
+
+    def test_meal_plan_export_ical(self):
+        self.assertQueryBudget(
+            self.client, reverse('meal-plan-export'), 3, self.add_meal_plans,
+            data={**self.export_range(), 'output': 'ical'}
+        )
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipes.objects.create(title='Canh chua', ingredients='cá, me', instructions='Nấu')
+        MealPlan.objects.bulk_create([
+            MealPlan(date=timezone.localdate(), meal_type='Bữa tối', recipe=self.recipe) for _ in range(5)
+        ])
+        Recipes.objects.filter(pk=self.recipe.pk).update(deleted_at=timezone.now())
+
+    def replica_reads(self):
+        # Đọc model được định tuyến sang bản sao mà không chỉ rõ database sẽ tới một bản sao không tồn tại và lỗi
+        return patch.object(
+            ReplicaRouter, 'db_for_read', side_effect=lambda model, **hints: 'replica' if _routed(model) else None
+        )
+
+    def test_purge_reads_from_primary(self):
+        progress = []
+        with self.replica_reads():
+            deleted = purge_recipe(self.recipe.pk, batch_size=2, progress=lambda *args: progress.append(args))
+            status_data = purge_status(self.recipe.pk)
+        self.assertEqual(deleted, 5)
+        self.assertEqual([remaining for _recipe_id, _deleted, remaining in progress], [3, 1, 0])
+        self.assertFalse(MealPlan.objects.filter(recipe_id=self.recipe.pk).exists())
+        self.assertFalse(Recipes.objects.filter(pk=self.recipe.pk).exists())
+        self.assertTrue(PurgedRecipe.objects.filter(recipe_id=self.recipe.pk, title='Canh chua').exists())
+        self.assertEqual(status_data['remaining_meal_plans'], 0)
+        self.assertTrue(status_data['purged'])
+
+    def test_purge_skips_live_recipe(self):
+        Recipes.objects.filter(pk=self.recipe.pk).update(deleted_at=None)
+        self.assertEqual(purge_recipe(self.recipe.pk), 0)
+        self.assertEqual(MealPlan.objects.filter(recipe_id=self.recipe.pk).count(), 5)
+
+    def test_status_before_purge(self):
+        with self.replica_reads():
+            status_data = purge_status(self.recipe.pk)
+        self.assertEqual(status_data['remaining_meal_plans'], 5)
+        self.assertFalse(status_data['purged'])
+        self.assertIsNotNone(status_data['deleted_at'])
+
+    def test_status_view(self):
+        url = reverse('recipe-purge-status', args=[self.recipe.pk])
+        self.assertEqual(self.client.get(url).json()['remaining_meal_plans'], 5)
+        purge_recipe(self.recipe.pk)
+        self.assertTrue(self.client.get(url).json()['purged'])
+        live = Recipes.objects.create(title='Phở', ingredients='bánh phở', instructions='Nấu')
+        self.assertEqual(self.client.get(reverse('recipe-purge-status', args=[live.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('recipe-purge-status', args=[live.pk + 1000])).status_code, 404)
+
+
+class ExportValidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        today = timezone.localdate()
+        self.recipe = Recipes.objects.create(title='Canh chua', ingredients='cá, me', instructions='Nấu')
+        self.plans = MealPlan.objects.bulk_create([
+            MealPlan(date=today + timedelta(days=i), meal_type='Bữa tối', recipe=self.recipe) for i in range(3)
+        ])
+        # Dữ liệu cũ hơn một giờ, để mọi thay đổi trong test rơi vào giây sau Last-Modified
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        MealPlan.objects.update(updated_at=an_hour_ago)
+        Recipes.objects.update(updated_at=an_hour_ago)
+        self.url = reverse('meal-plan-export')
+        self.range = {'start': today.isoformat(), 'end': (today + timedelta(days=6)).isoformat()}
+
+    def export(self, **headers):
+        response = self.client.get(self.url, self.range, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def validators(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        return response['Last-Modified'], response['ETag']
+
+    def assertChanged(self, last_modified, etag):
+        self.assertEqual(self.export(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+        self.assertEqual(self.export(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unchanged_range_returns_304(self):
+        last_modified, etag = self.validators()
+        self.assertEqual(self.export(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.export(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_deleted_plan_changes_validators(self):
+        last_modified, etag = self.validators()
+        self.assertEqual(self.client.delete(reverse('meal-plan-delete', args=[self.plans[0].pk])).status_code, 200)
+        self.assertChanged(last_modified, etag)
+
+    def test_moved_plan_changes_validators(self):
+        last_modified, etag = self.validators()
+        later = (timezone.localdate() + timedelta(days=30)).isoformat()
+        self.assertEqual(
+            self.client.patch(reverse('meal-plan-update', args=[self.plans[0].pk]), {'date': later}, format='json').status_code,
+            200
+        )
+        self.assertChanged(last_modified, etag)
+
+    def test_recipe_edit_changes_validators(self):
+        last_modified, etag = self.validators()
+        recipe = Recipes.objects.get(pk=self.recipe.pk)
+        recipe.title = 'Canh chua cá lóc'
+        recipe.save()
+        self.assertChanged(last_modified, etag)
+
+    def test_recipe_delete_and_purge_change_validators(self):
+        last_modified, etag = self.validators()
+        self.assertEqual(self.client.delete(reverse('recipe-delete', args=[self.recipe.pk])).status_code, 200)
+        self.assertChanged(last_modified, etag)
+        last_modified, etag = self.validators()
+        purge_recipe(self.recipe.pk)
+        # Kế hoạch đã bị ẩn từ lúc xóa mềm: nội dung không đổi nhưng Last-Modified không được lùi lại
+        response = self.export()
+        self.assertGreaterEqual(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
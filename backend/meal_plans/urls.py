@@ -1,23 +1,32 @@
+from django.conf import settings
 from django.urls import path
+from . import views, async_views
 from .views import (
-    recipe_list, recipe_detail, recipe_delete, recipe_create, recipe_update,
-    meal_plan_list, meal_plan_detail, meal_plan_create, meal_plan_update, meal_plan_delete
+    recipe_delete, recipe_create, recipe_update, recipe_purge_status,
+    meal_plan_detail, meal_plan_create, meal_plan_update, meal_plan_delete,
+    meal_plan_export
 )
 
+# Dưới ASGI (ASYNC_READ_VIEWS=True) các endpoint đọc nhiều dùng bản async, xem meal_plans.async_views
+read_views = async_views if getattr(settings, 'ASYNC_READ_VIEWS', False) else views
+
 urlpatterns = [
     # URLs cho Recipes
     # Ví dụ: GET /meal-plans/recipes/list/ để lấy danh sách công thức
-    path('recipes/list/', recipe_list, name='recipe-list'),
-    path('recipes/<int:pk>/', recipe_detail, name='recipe-detail'),
+    path('recipes/list/', read_views.recipe_list, name='recipe-list'),
+    path('recipes/<int:pk>/', read_views.recipe_detail, name='recipe-detail'),
     path('recipes/delete/<int:pk>/', recipe_delete, name='recipe-delete'),
+    path('recipes/delete/<int:pk>/status/', recipe_purge_status, name='recipe-purge-status'),
     path('recipes/create/', recipe_create, name='recipe-create'),
     path('recipes/update/<int:pk>/', recipe_update, name='recipe-update'),
     
     # URLs cho MealPlan
     # Ví dụ: POST /meal-plans/meal-plans/create/ để tạo kế hoạch bữa ăn
-    path('plans/list/', meal_plan_list, name='meal-plan-list'),
+    path('plans/list/', read_views.meal_plan_list, name='meal-plan-list'),
     path('plans/<int:pk>/', meal_plan_detail, name='meal-plan-detail'),
     path('plans/create/', meal_plan_create, name='meal-plan-create'),
     path('plans/update/<int:pk>/', meal_plan_update, name='meal-plan-update'),
     path('plans/delete/<int:pk>/', meal_plan_delete, name='meal-plan-delete'),
+    # Ví dụ: GET /meal_plans/plans/export/?start=2025-05-01&end=2025-05-31&output=ical
+    path('plans/export/', meal_plan_export, name='meal-plan-export'),
 ]
\ No newline at end of file
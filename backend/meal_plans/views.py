@@ -3,27 +3,28 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import Recipes, MealPlan
 from .serializers import RecipeSerializer, MealPlanSerializer
-from django.db.models import Q
+from .queries import recipe_queryset, meal_plan_queryset
+from .exports import export_state, export_queryset, record_removals, iter_ndjson, iter_ical
+from .purge import schedule_purge, purge_status
+from backend.caching import bump_namespace, cached_view
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
+from django.utils import timezone
 from datetime import datetime
 from rest_framework.pagination import PageNumberPagination
 import os
 from django.conf import settings
 
 @api_view(['GET'])
+@cached_view('recipes')
 def recipe_list(request):
     """
     Lấy danh sách tất cả công thức, hỗ trợ tìm kiếm và phân trang.
     Query: ?search=...&page=1&page_size=10
     """
     try:
-        search_query = request.query_params.get('search', None)
-        recipes = Recipes.objects.only("title", "ingredients", "instructions")
-        if search_query:
-            recipes = recipes.filter(
-                Q(title__icontains=search_query) |
-                Q(ingredients__icontains=search_query) |
-                Q(instructions__icontains=search_query)
-            )
+        recipes = recipe_queryset(request.query_params.get('search', None))
 
         paginator = PageNumberPagination()
         paginator.page_size_query_param = 'page_size'
@@ -37,12 +38,13 @@ def recipe_list(request):
         )
 
 @api_view(['GET'])
+@cached_view('recipes')
 def recipe_detail(request, pk):
     """
     Lấy chi tiết một công thức dựa trên ID.
     """
     try:
-        recipe = Recipes.objects.get(pk=pk)
+        recipe = Recipes.objects.alive().get(pk=pk)
         serializer = RecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Recipes.DoesNotExist:
@@ -59,17 +61,21 @@ def recipe_detail(request, pk):
 @api_view(['DELETE'])
 def recipe_delete(request, pk):
     """
-    Xóa hoàn toàn một công thức khỏi cơ sở dữ liệu dựa trên ID.
+    Xóa mềm một công thức dựa trên ID: công thức bị ẩn ngay lập tức, các kế hoạch bữa ăn
+    tham chiếu tới nó được purge dần ở nền (xem meal_plans.purge).
     """
     try:
-        recipe = Recipes.objects.get(pk=pk)
-        recipe_title = recipe.title
-        serializer = RecipeSerializer(recipe)
-        recipe.delete()
+        recipe = Recipes.objects.alive().only('id', 'title').get(pk=pk)
+        with transaction.atomic():
+            Recipes.objects.filter(pk=pk).update(deleted_at=timezone.now())
+            # update() không phát signal; kế hoạch của công thức bị ẩn khỏi meal_plan_list ngay
+            bump_namespace('recipes')
+            schedule_purge(pk)
         return Response(
             {
-                "message": f"Công thức '{recipe_title}' đã được xóa thành công.",
-                "deleted_recipe": serializer.data
+                "message": f"Công thức '{recipe.title}' đã được xóa thành công.",
+                "deleted_recipe": {"id": recipe.id, "title": recipe.title},
+                "purge_status_url": f"/meal_plans/recipes/delete/{pk}/status/"
             },
             status=status.HTTP_200_OK
         )
@@ -84,6 +90,24 @@ def recipe_delete(request, pk):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+def recipe_purge_status(request, pk):
+    """
+    Tiến độ purge của một công thức đã xóa: số kế hoạch bữa ăn còn lại và đã purge xong hay chưa.
+    """
+    status_data = purge_status(pk)
+    if status_data is None:
+        return Response(
+            {"error": "Công thức không tồn tại."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if status_data['deleted_at'] is None and not status_data['purged']:
+        return Response(
+            {"error": "Công thức chưa bị xóa."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(status_data, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 def recipe_create(request):
     """
@@ -132,7 +156,7 @@ def recipe_update(request, pk):
     Cập nhật một phần thông tin của một công thức dựa trên ID, hỗ trợ upload ảnh.
     """
     try:
-        recipe = Recipes.objects.get(pk=pk)
+        recipe = Recipes.objects.alive().get(pk=pk)
         data = request.data.copy()
 
         # Xử lý upload ảnh nếu có
@@ -174,28 +198,20 @@ def recipe_update(request, pk):
         )
 
 @api_view(['GET'])
+@cached_view('meal_plans', 'recipes')
 def meal_plan_list(request):
     """
     Lấy danh sách tất cả kế hoạch bữa ăn, hỗ trợ tìm kiếm theo ngày hoặc loại bữa ăn.
     Query parameter: ?date=YYYY-MM-DD hoặc ?meal_type=<type>
     """
     try:
-        date_query = request.query_params.get('date', None)
-        meal_type_query = request.query_params.get('meal_type', None)
-        
-        meal_plans = MealPlan.objects.all()
-        if date_query:
-            try:
-                date_obj = datetime.strptime(date_query, '%Y-%m-%d').date()
-                meal_plans = meal_plans.filter(date=date_obj)
-            except ValueError:
-                return Response(
-                    {"error": "Định dạng ngày không hợp lệ. Sử dụng YYYY-MM-DD."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        if meal_type_query:
-            meal_plans = meal_plans.filter(meal_type__icontains=meal_type_query)
-        
+        meal_plans, error = meal_plan_queryset(
+            request.query_params.get('date', None),
+            request.query_params.get('meal_type', None)
+        )
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = MealPlanSerializer(meal_plans, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Exception as e:
@@ -210,7 +226,8 @@ def meal_plan_detail(request, pk):
     Lấy chi tiết một kế hoạch bữa ăn dựa trên ID.
     """
     try:
-        meal_plan = MealPlan.objects.get(pk=pk)
+        # Kế hoạch của công thức đã xóa mềm (đang chờ purge) coi như không còn
+        meal_plan = MealPlan.objects.filter(recipe__deleted_at__isnull=True).get(pk=pk)
         serializer = MealPlanSerializer(meal_plan)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except MealPlan.DoesNotExist:
@@ -257,10 +274,15 @@ def meal_plan_update(request, pk):
     Cập nhật một phần thông tin của kế hoạch bữa ăn dựa trên ID.
     """
     try:
-        meal_plan = MealPlan.objects.get(pk=pk)
+        meal_plan = MealPlan.objects.filter(recipe__deleted_at__isnull=True).get(pk=pk)
+        old_date = meal_plan.date
         serializer = MealPlanSerializer(meal_plan, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                if meal_plan.date != old_date:
+                    # Kế hoạch rời khỏi ngày cũ, khoảng ngày đó cũng đã thay đổi
+                    record_removals([old_date])
             return Response(
                 {
                     "message": f"Kế hoạch bữa ăn cho {serializer.data['meal_type']} vào ngày {serializer.data['date']} đã được cập nhật.",
@@ -289,10 +311,13 @@ def meal_plan_delete(request, pk):
     Xóa một kế hoạch bữa ăn dựa trên ID.
     """
     try:
-        meal_plan = MealPlan.objects.get(pk=pk)
+        meal_plan = MealPlan.objects.filter(recipe__deleted_at__isnull=True).get(pk=pk)
         meal_plan_info = f"{meal_plan.meal_type} on {meal_plan.date}"
         serializer = MealPlanSerializer(meal_plan)
-        meal_plan.delete()
+        with transaction.atomic():
+            meal_plan.delete()
+            record_removals([meal_plan.date])
+            bump_namespace('meal_plans')
         return Response(
             {
                 "message": f"Kế hoạch bữa ăn '{meal_plan_info}' đã được xóa thành công.",
@@ -310,3 +335,75 @@ def meal_plan_delete(request, pk):
             {"error": f"Không thể xóa kế hoạch bữa ăn: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+def _export_range(request):
+    """
+    Đọc khoảng ngày ?start=YYYY-MM-DD&end=YYYY-MM-DD, trả về None nếu không hợp lệ.
+    """
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return None
+    if start > end:
+        return None
+    return start, end
+
+def _export_state(request):
+    """
+    Trạng thái của khoảng ngày (xem meal_plans.exports.export_state), tính một lần cho mỗi request.
+    """
+    if not hasattr(request, '_meal_plan_export_state'):
+        date_range = _export_range(request)
+        request._meal_plan_export_state = export_state(*date_range) if date_range else None
+    return request._meal_plan_export_state
+
+def _export_last_modified(request):
+    state = _export_state(request)
+    return state['last_modified'] if state else None
+
+def _export_etag(request):
+    # Thêm số dòng để hai thay đổi trong cùng một giây (độ phân giải của Last-Modified) vẫn đổi ETag
+    state = _export_state(request)
+    if not state:
+        return None
+    last_modified = state['last_modified'].timestamp() if state['last_modified'] else 0
+    return f"{request.GET.get('output', 'ndjson')}-{state['total']}-{last_modified}"
+
+@api_view(['GET'])
+@condition(etag_func=_export_etag, last_modified_func=_export_last_modified)
+def meal_plan_export(request):
+    """
+    Xuất kế hoạch bữa ăn trong một khoảng ngày dưới dạng stream (bộ nhớ không đổi theo số dòng).
+    Query: ?start=YYYY-MM-DD&end=YYYY-MM-DD&output=ndjson|ical
+    Hỗ trợ If-Modified-Since / If-None-Match: khoảng ngày không đổi trả về 304.
+    """
+    date_range = _export_range(request)
+    if not date_range:
+        return Response(
+            {"error": "Cần start và end hợp lệ (YYYY-MM-DD, start <= end)."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    output = request.query_params.get('output', 'ndjson')
+    queryset = export_queryset(*date_range)
+    start, end = date_range
+    if output == 'ical':
+        response = StreamingHttpResponse(
+            iter_ical(queryset, host=request.get_host().split(':')[0]),
+            content_type='text/calendar; charset=utf-8'
+        )
+        filename = f"meal-plans-{start}-{end}.ics"
+    elif output == 'ndjson':
+        response = StreamingHttpResponse(
+            iter_ndjson(queryset),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        filename = f"meal-plans-{start}-{end}.ndjson"
+    else:
+        return Response(
+            {"error": "output chỉ nhận 'ndjson' hoặc 'ical'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
\ No newline at end of file
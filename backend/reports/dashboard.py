@@ -0,0 +1,84 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from fridge.models import Food
+from fridge.serializers import FoodSerializer
+from fridge.shelf_life import expiry_status
+from meal_plans.models import MealPlan
+from meal_plans.serializers import MealPlanSerializer
+from shopping.access import accessible_item_list_ids
+from shopping.models import ShoppingList, ShoppingListItem
+from shopping.serializers import ShoppingListItemSerializer
+from users.access import accessible_family_ids
+from users.models import Family, User
+from users.serializers import CustomUserSerializer, FamilySerializer
+
+# Thời gian cache dashboard của mỗi user (giây)
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 30)
+# Thực phẩm hết hạn trong số ngày này (tính cả đã quá hạn) được đưa lên dashboard
+DASHBOARD_EXPIRY_DAYS = getattr(settings, 'DASHBOARD_EXPIRY_DAYS', 3)
+# Số dòng tối đa của mỗi danh sách trên dashboard
+DASHBOARD_LIST_LIMIT = getattr(settings, 'DASHBOARD_LIST_LIMIT', 20)
+
+
+def dashboard_cache_key(user_id):
+    return f'dashboard:{user_id}'
+
+
+def build_dashboard(user):
+    """
+    Dữ liệu màn hình chính trong một lần gọi, mỗi phần một truy vấn:
+    user, family, kế hoạch bữa ăn hôm nay, thực phẩm sắp hết hạn và item chưa mua.
+    """
+    today = timezone.localdate()
+    shopping_list_ids = accessible_item_list_ids(user)
+
+    families = Family.objects.filter(pk__in=accessible_family_ids(user)).select_related('created_by')
+    meal_plans = (
+        MealPlan.objects.filter(date=today, recipe__deleted_at__isnull=True)
+        .select_related('recipe')
+        .order_by('id')
+    )
+    foods = (
+        Food.objects.filter(expiry_date__lte=today + timedelta(days=DASHBOARD_EXPIRY_DAYS))
+        .select_related('category')
+        .order_by('expiry_date', 'id')[:DASHBOARD_LIST_LIMIT]
+    )
+    pending_items = (
+        ShoppingListItem.objects.filter(shopping_list_id__in=shopping_list_ids, status='pending')
+        .order_by('-created_at')[:DASHBOARD_LIST_LIMIT]
+    )
+    # Tổng số item chưa mua lấy từ bộ đếm của ShoppingList, không đếm lại từng item
+    pending_total = ShoppingList.objects.filter(pk__in=shopping_list_ids).aggregate(
+        total=Sum('pending_count')
+    )['total'] or 0
+
+    expiring = []
+    for food, data in zip(foods, FoodSerializer(foods, many=True).data):
+        status_label, status_color = expiry_status(food.expiry_date, today)
+        expiring.append({**data, 'expiry_status': status_label, 'status_color': status_color})
+
+    # request.user lấy từ cache xác thực chỉ có một phần các cột (xem users.authentication):
+    # đọc lại cả user bằng một truy vấn thay vì để mỗi cột còn thiếu tốn một truy vấn
+    if user.get_deferred_fields():
+        user = User.objects.only(*CustomUserSerializer.Meta.fields).get(pk=user.pk)
+    return {
+        'date': today,
+        'user': CustomUserSerializer(user).data,
+        'families': FamilySerializer(families, many=True).data,
+        'meal_plans_today': MealPlanSerializer(meal_plans, many=True).data,
+        'expiring_foods': expiring,
+        'pending_items': ShoppingListItemSerializer(pending_items, many=True).data,
+        'pending_total': pending_total,
+    }
+
+
+def cached_dashboard(user):
+    key = dashboard_cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user)
+        cache.set(key, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,235 @@
+import csv
+import logging
+import os
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models import CharField, DateField, F, IntegerField, Q, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from fridge.models import Food
+from shopping.access import accessible_item_list_ids
+from shopping.models import ShoppingListItem
+from .models import ExportJob, StockEvent
+
+logger = logging.getLogger(__name__)
+
+# Số dòng lấy mỗi lần từ cursor của database khi xuất báo cáo
+EXPORT_CHUNK_SIZE = getattr(settings, 'REPORT_EXPORT_CHUNK_SIZE', 2000)
+# Thư mục chứa file của các lần xuất chạy nền
+EXPORT_DIR = getattr(settings, 'REPORT_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'exports'))
+
+# Ô bắt đầu bằng các ký tự này bị Excel/LibreOffice hiểu là công thức (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_OUTPUTS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _inventory(user, start, end):
+    foods = Food.objects.all()
+    if start:
+        foods = foods.filter(registered_date__gte=start)
+    if end:
+        foods = foods.filter(registered_date__lte=end)
+    headers = ['ID', 'Tên', 'Danh mục', 'Ngăn', 'Vị trí', 'Số lượng', 'Ngày đăng ký', 'Hạn dùng', 'Ghi chú']
+    return headers, foods.order_by('id').values_list(
+        'id', 'name', 'category__name', 'compartment', 'location', 'quantity', 'registered_date', 'expiry_date', 'note'
+    )
+
+
+def _waste(user, start, end):
+    # Cùng định nghĩa với reports.waste: thực phẩm còn trong tủ nhưng đã qua hạn dùng, cộng phần
+    # đã bỏ đi sau hạn trong sổ StockEvent (không còn tên, ngăn, ngày đăng ký), gộp bằng UNION.
+    # Hai vế chỉ chọn các cột annotate theo cùng thứ tự để cột của UNION khớp nhau; số lượng trong sổ
+    # luôn là số nguyên (lấy từ Food.quantity)
+    foods = Food.objects.filter(expiry_date__lt=timezone.localdate())
+    events = StockEvent.objects.filter(kind=StockEvent.EXPIRED)
+    if start:
+        foods = foods.filter(expiry_date__gte=start)
+        events = events.filter(day__gte=start)
+    if end:
+        foods = foods.filter(expiry_date__lte=end)
+        events = events.filter(day__lte=end)
+    columns = ['waste_id', 'waste_name', 'waste_category', 'waste_compartment', 'waste_quantity',
+               'waste_registered', 'waste_expiry', 'waste_status']
+    foods = foods.annotate(
+        waste_id=F('id'), waste_name=F('name'), waste_category=F('category__name'),
+        waste_compartment=F('compartment'), waste_quantity=F('quantity'),
+        waste_registered=F('registered_date'), waste_expiry=F('expiry_date'),
+        waste_status=Value('Còn trong tủ', output_field=CharField()),
+    ).values_list(*columns)
+    events = events.annotate(
+        waste_id=Value(None, output_field=IntegerField()), waste_name=Value('', output_field=CharField()),
+        waste_category=F('category_name'), waste_compartment=Value('', output_field=CharField()),
+        waste_quantity=Cast('quantity', IntegerField()), waste_registered=Value(None, output_field=DateField()),
+        waste_expiry=F('day'), waste_status=Value('Đã bỏ đi', output_field=CharField()),
+    ).values_list(*columns)
+    headers = ['ID', 'Tên', 'Danh mục', 'Ngăn', 'Số lượng', 'Ngày đăng ký', 'Hạn dùng', 'Trạng thái']
+    return headers, foods.union(events, all=True).order_by('waste_expiry', 'waste_id')
+
+
+def _purchases(user, start, end):
+    # Ngày mua là bought_at; item đã mua trước khi có bought_at dùng updated_at (như reports.rollups),
+    # để sửa item sau khi mua không làm đổi ngày mua
+    items = ShoppingListItem.objects.filter(
+        shopping_list_id__in=accessible_item_list_ids(user), status='bought'
+    ).annotate(purchased_at=Coalesce('bought_at', 'updated_at'))
+    if start:
+        items = items.filter(purchased_at__date__gte=start)
+    if end:
+        items = items.filter(purchased_at__date__lte=end)
+    headers = ['ID', 'Ngày mua', 'Family', 'Danh sách', 'Item', 'Số lượng', 'Đơn vị', 'Danh mục']
+    rows = items.order_by('purchased_at', 'id').values_list(
+        'id', 'purchased_at', 'shopping_list__family__name', 'shopping_list__name', 'item', 'quantity', 'unit', 'category'
+    )
+    return headers, rows
+
+
+# Tên báo cáo -> hàm trả về (tiêu đề cột, queryset values_list)
+EXPORT_DATASETS = {
+    'inventory': _inventory,
+    'waste': _waste,
+    'purchases': _purchases,
+}
+
+
+def export_rows(dataset, user, start=None, end=None):
+    """
+    (headers, rows) của một báo cáo; rows đọc từ database theo từng chunk bằng .iterator().
+    """
+    headers, queryset = EXPORT_DATASETS[dataset](user, start, end)
+    return headers, queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _cell(value):
+    # Excel và CSV không có kiểu datetime kèm múi giờ, ghi theo giờ địa phương
+    if hasattr(value, 'tzinfo') and value.tzinfo is not None:
+        return timezone.localtime(value).replace(tzinfo=None, microsecond=0)
+    # Chuỗi do người dùng nhập có thể trông như công thức: thêm ' để bảng tính hiển thị nguyên văn
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    # csv.writer ghi vào đây và nhận lại dòng vừa ghi, không giữ gì trong bộ nhớ
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers, rows):
+    """
+    Sinh từng dòng CSV; dòng đầu có BOM để Excel đọc đúng tiếng Việt.
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def write_xlsx(headers, rows, target, title='Report'):
+    """
+    Ghi XLSX ở chế độ write-only của openpyxl: từng dòng được đẩy thẳng ra file tạm,
+    bộ nhớ không tăng theo số dòng. target là đường dẫn hoặc file object. Trả về số dòng.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(headers)
+    count = 0
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+        count += 1
+    workbook.save(target)
+    return count
+
+
+def export_file_path(job):
+    return os.path.join(EXPORT_DIR, job.file_name)
+
+
+def claim_export(job_id):
+    """
+    Nhận một ExportJob đang chờ bằng UPDATE có điều kiện (PENDING -> RUNNING): khi thread nền và
+    lệnh run_report_exports cùng thấy job, chỉ một bên nhận được. Trả về None nếu job đã bị nhận.
+    """
+    if not ExportJob.objects.filter(pk=job_id, status=ExportJob.PENDING).update(status=ExportJob.RUNNING):
+        return None
+    # Bảng của app reports được đọc từ bản sao (xem backend.routers), job vừa nhận đọc từ database chính
+    return ExportJob.objects.using(DEFAULT_DB_ALIAS).select_related('user').get(pk=job_id)
+
+
+def run_export(job_id):
+    """
+    Nhận ExportJob job_id, ghi file ra EXPORT_DIR và cập nhật trạng thái.
+    Trả về job, hoặc None nếu job không còn ở trạng thái chờ.
+    """
+    job = claim_export(job_id)
+    if job is None:
+        return None
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        job.file_name = f"{job.dataset}-{job.token}.{job.output}"
+        headers, rows = export_rows(job.dataset, job.user, job.start, job.end)
+        path = export_file_path(job)
+        if job.output == 'xlsx':
+            job.row_count = write_xlsx(headers, rows, path, title=job.dataset)
+        else:
+            count = -1  # Không tính dòng tiêu đề
+            with open(path, 'w', encoding='utf-8', newline='') as handle:
+                for line in iter_csv(headers, rows):
+                    handle.write(line)
+                    count += 1
+            job.row_count = count
+        job.status = ExportJob.DONE
+    except Exception as e:
+        logger.exception(f"Xuất báo cáo {job.token} thất bại")
+        job.status = ExportJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file_name', 'row_count', 'error', 'finished_at'])
+    return job
+
+
+def _run_export_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_export(job_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_export(job):
+    """
+    Chạy ExportJob trong một thread nền sau khi transaction hiện tại commit.
+    Tắt bằng REPORT_EXPORT_IN_BACKGROUND = False để chỉ chạy qua lệnh run_report_exports.
+    """
+    if not getattr(settings, 'REPORT_EXPORT_IN_BACKGROUND', True):
+        return
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_export_in_thread, args=(job.pk,), daemon=True).start()
+    )
+
+
+def prune_exports(older_than):
+    """
+    Xóa các ExportJob đã kết thúc trước older_than cùng file của chúng. Trả về số job đã xóa.
+    """
+    jobs = ExportJob.objects.filter(
+        Q(status=ExportJob.DONE) | Q(status=ExportJob.FAILED), finished_at__lt=older_than
+    )
+    count = 0
+    for job in jobs.iterator():
+        if job.file_name:
+            try:
+                os.remove(export_file_path(job))
+            except FileNotFoundError:
+                pass
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,28 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from reports.rollups import run_rollups
+
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Ngày không hợp lệ: {value} (cần YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Cuộn số liệu tủ lạnh và mua sắm theo ngày vào DailyRollup. Mặc định chỉ xử lý các ngày mới; --from để tính lại (backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help="Ngày bắt đầu tính lại (YYYY-MM-DD)")
+        parser.add_argument('--until', dest='end', help="Ngày cuối (YYYY-MM-DD), mặc định hôm qua")
+
+    def handle(self, *args, **options):
+        start = _parse_day(options['start']) if options['start'] else None
+        end = _parse_day(options['end']) if options['end'] else None
+
+        def progress(chunk_start, chunk_end, count):
+            self.stdout.write(f"  {chunk_start} → {chunk_end}: {count} dòng")
+
+        days = run_rollups(start, end, progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Đã cuộn {days} ngày."))
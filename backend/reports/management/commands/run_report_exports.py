@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from reports.exports import prune_exports, run_export
+from reports.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Chạy các lần xuất báo cáo đang chờ (khi tắt REPORT_EXPORT_IN_BACKGROUND) và xóa file xuất cũ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-days', type=int, default=7, help="Xóa các lần xuất đã kết thúc quá số ngày này")
+
+    def handle(self, *args, **options):
+        job_ids = ExportJob.objects.filter(status=ExportJob.PENDING).order_by('created_at').values_list('id', flat=True)
+        for job_id in list(job_ids):
+            job = run_export(job_id)
+            if job is None:
+                # Thread nền hoặc một lần chạy lệnh khác đã nhận job
+                continue
+            self.stdout.write(f"  {job.token}: {job.status} ({job.row_count} dòng)")
+        pruned = prune_exports(timezone.now() - timedelta(days=options['prune_days']))
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa {pruned} lần xuất cũ."))
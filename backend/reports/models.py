@@ -1,3 +1,284 @@
+import uuid
+from django.conf import settings
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+from fridge.models import Category
 
-# Create your models here.
+
+class WastePeriod(models.Model):
+    """
+    Một tháng đã khép lại của báo cáo thực phẩm bỏ phí; số liệu được chốt một lần
+    (WasteEntry) và không bao giờ tính lại (xem reports.waste).
+    """
+    month = models.DateField(
+        _('month'),
+        unique=True,
+        help_text=_('First day of the reported month.')
+    )
+    total_items = models.PositiveIntegerField(
+        _('total items'),
+        default=0,
+        help_text=_('Number of foods that expired in the fridge during the month.')
+    )
+    total_quantity = models.PositiveIntegerField(
+        _('total quantity'),
+        default=0,
+        help_text=_('Summed quantity of those foods.')
+    )
+    frozen_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_('Timestamp when the month was frozen.')
+    )
+
+    class Meta:
+        verbose_name = _('waste period')
+        verbose_name_plural = _('waste periods')
+        ordering = ['month']
+
+    def __str__(self):
+        return self.month.strftime('%Y-%m')
+
+
+class WasteEntry(models.Model):
+    period = models.ForeignKey(
+        WastePeriod,
+        on_delete=models.CASCADE,
+        related_name='entries',
+        help_text=_('Frozen month this row belongs to.')
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waste_entries',
+        help_text=_('Category of the wasted foods.')
+    )
+    category_name = models.CharField(
+        _('category name'),
+        max_length=50,
+        help_text=_('Category name at freeze time, kept if the category is deleted.')
+    )
+    item_count = models.PositiveIntegerField(
+        _('item count'),
+        help_text=_('Number of wasted foods in the category.')
+    )
+    total_quantity = models.PositiveIntegerField(
+        _('total quantity'),
+        help_text=_('Summed quantity of wasted foods in the category.')
+    )
+
+    class Meta:
+        verbose_name = _('waste entry')
+        verbose_name_plural = _('waste entries')
+        unique_together = ('period', 'category_name')
+
+    def __str__(self):
+        return f"{self.period} {self.category_name}: {self.item_count}"
+
+
+class StockEvent(models.Model):
+    """
+    Một lần số lượng thực phẩm trong tủ thay đổi: thêm vào (tạo mới hoặc tăng số lượng),
+    dùng (giảm số lượng, xóa khỏi tủ trước hạn) hoặc bỏ đi sau hạn. Nguồn của cột added, consumed
+    và một phần cột expired trong DailyRollup (xem reports.signals).
+    """
+    ADDED = 'added'
+    CONSUMED = 'consumed'
+    EXPIRED = 'expired'
+    KIND_CHOICES = [
+        (ADDED, 'Thêm vào tủ'),
+        (CONSUMED, 'Đã dùng'),
+        (EXPIRED, 'Bỏ đi sau hạn'),
+    ]
+
+    day = models.DateField(
+        _('day'),
+        db_index=True,
+        help_text=_('Day the stock changed; the expiry date for expired events.')
+    )
+    kind = models.CharField(
+        _('kind'),
+        max_length=10,
+        choices=KIND_CHOICES,
+        help_text=_('Whether the food was added, consumed or thrown away after expiry.')
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_events',
+        help_text=_('Category of the food.')
+    )
+    category_name = models.CharField(
+        _('category name'),
+        max_length=50,
+        help_text=_('Category name at event time.')
+    )
+    quantity = models.DecimalField(
+        _('quantity'),
+        max_digits=12,
+        decimal_places=2,
+        help_text=_('Changed quantity.')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_('Timestamp when the event was recorded.')
+    )
+
+    class Meta:
+        verbose_name = _('stock event')
+        verbose_name_plural = _('stock events')
+
+    def __str__(self):
+        return f"{self.day} {self.kind} {self.category_name}: {self.quantity}"
+
+
+class DailyRollup(models.Model):
+    """
+    Tổng hợp theo ngày, family và danh mục (xem reports.rollups). Thực phẩm trong tủ không
+    gắn family nên các cột tồn kho nằm ở dòng family = NULL; purchased lấy từ danh sách mua sắm
+    của từng family.
+    """
+    day = models.DateField(
+        _('day'),
+        help_text=_('Day being summarised.')
+    )
+    family = models.ForeignKey(
+        'users.Family',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_rollups',
+        help_text=_('Family of the purchases; empty for fridge stock.')
+    )
+    category_name = models.CharField(
+        _('category name'),
+        max_length=50,
+        help_text=_('Category of the summarised foods.')
+    )
+    added = models.DecimalField(_('added'), max_digits=12, decimal_places=2, default=0)
+    consumed = models.DecimalField(_('consumed'), max_digits=12, decimal_places=2, default=0)
+    expired = models.DecimalField(_('expired'), max_digits=12, decimal_places=2, default=0)
+    purchased = models.DecimalField(_('purchased'), max_digits=12, decimal_places=2, default=0)
+    stock_level = models.DecimalField(
+        _('stock level'),
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text=_('Running fridge stock of the category at the end of the day.')
+    )
+
+    class Meta:
+        verbose_name = _('daily rollup')
+        verbose_name_plural = _('daily rollups')
+        unique_together = ('day', 'family', 'category_name')
+        indexes = [
+            models.Index(fields=['family', 'day']),
+            # Dòng gần nhất của một danh mục (opening_stock)
+            models.Index(fields=['category_name', 'family', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.family_id} {self.category_name}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(
+        _('name'),
+        max_length=50,
+        unique=True,
+        help_text=_('Rollup this watermark belongs to.')
+    )
+    last_day = models.DateField(
+        _('last day'),
+        help_text=_('Last day that has been rolled up.')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text=_('Timestamp when the rollup last advanced.')
+    )
+
+    class Meta:
+        verbose_name = _('rollup watermark')
+        verbose_name_plural = _('rollup watermarks')
+
+    def __str__(self):
+        return f"{self.name}: {self.last_day}"
+
+
+class ExportJob(models.Model):
+    """
+    Một lần xuất báo cáo chạy nền (xem reports.exports); file được ghi ra REPORT_EXPORT_DIR
+    và tải về qua token khi status = done.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Đang chờ'),
+        (RUNNING, 'Đang xuất'),
+        (DONE, 'Hoàn tất'),
+        (FAILED, 'Thất bại'),
+    ]
+
+    token = models.UUIDField(
+        _('token'),
+        default=uuid.uuid4,
+        unique=True,
+        editable=False,
+        help_text=_('Identifier used in the status and download links.')
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='export_jobs',
+        help_text=_('User who requested the export.')
+    )
+    dataset = models.CharField(
+        _('dataset'),
+        max_length=20,
+        help_text=_('Exported report: inventory, waste or purchases.')
+    )
+    output = models.CharField(
+        _('output'),
+        max_length=10,
+        help_text=_('File format: csv or xlsx.')
+    )
+    start = models.DateField(_('start'), null=True, blank=True)
+    end = models.DateField(_('end'), null=True, blank=True)
+    status = models.CharField(
+        _('status'),
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    file_name = models.CharField(
+        _('file name'),
+        max_length=255,
+        blank=True,
+        help_text=_('Name of the generated file inside REPORT_EXPORT_DIR.')
+    )
+    row_count = models.PositiveIntegerField(_('row count'), default=0)
+    error = models.TextField(_('error'), blank=True)
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_('Timestamp when the export was requested.')
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Timestamp when the export finished or failed.')
+    )
+
+    class Meta:
+        verbose_name = _('export job')
+        verbose_name_plural = _('export jobs')
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset}.{self.output} ({self.status})"
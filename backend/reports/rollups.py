@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from fridge.models import Category, Food
+from shopping.models import ShoppingListItem
+from .models import StockEvent, DailyRollup, RollupWatermark
+
+DAILY_WATERMARK = 'daily'
+# Việc cuộn số liệu đọc rồi ghi lại bảng báo cáo, nên mọi lần đọc đi thẳng vào database chính
+# (bảng của app reports được đọc từ bản sao nếu có, xem backend.routers)
+ROLLUP_DB = DEFAULT_DB_ALIAS
+# Số ngày xử lý trong một transaction
+ROLLUP_CHUNK_DAYS = getattr(settings, 'ROLLUP_CHUNK_DAYS', 31)
+# Nhãn cho item mua sắm không có danh mục
+UNCATEGORIZED = 'Khác'
+
+ROLLUP_METRICS = ('added', 'consumed', 'expired', 'purchased')
+
+
+def _collect(buckets, rows, day_field, category_field, metric, family_field=None):
+    for row in rows:
+        day = row[day_field]
+        family_id = row[family_field] if family_field else None
+        category = row[category_field] or UNCATEGORIZED
+        buckets[(day, family_id, category)][metric] += row['total'] or 0
+
+
+def ledger_start():
+    # Ngày đầu tiên có StockEvent; trước đó added được suy ra từ Food.registered_date
+    return StockEvent.objects.using(ROLLUP_DB).aggregate(day=Min('day'))['day']
+
+
+def aggregate_days(start, end):
+    """
+    Số liệu của các ngày trong [start, end], mỗi nguồn một truy vấn GROUP BY:
+    - added, consumed: StockEvent (các ngày trước khi có StockEvent: added từ Food.registered_date),
+    - expired: Food còn trong tủ theo expiry_date cộng với StockEvent expired (phần đã bỏ đi sau hạn,
+      ghi vào đúng ngày hết hạn),
+    - purchased: ShoppingListItem đã mua theo family, theo ngày chuyển sang 'bought'.
+    Trả về {(day, family_id, category_name): {metric: Decimal}}.
+    """
+    buckets = defaultdict(lambda: dict.fromkeys(ROLLUP_METRICS, Decimal(0)))
+    first_event = ledger_start()
+    if first_event is None or start < first_event:
+        legacy_end = end if first_event is None else min(end, first_event - timedelta(days=1))
+        _collect(
+            buckets,
+            Food.objects.filter(registered_date__range=(start, legacy_end))
+            .values('registered_date', 'category__name').annotate(total=Sum('quantity')).order_by(),
+            'registered_date', 'category__name', 'added'
+        )
+    for row in (
+        StockEvent.objects.using(ROLLUP_DB).filter(day__range=(start, end))
+        .values('day', 'kind', 'category_name').annotate(total=Sum('quantity')).order_by()
+    ):
+        buckets[(row['day'], None, row['category_name'])][row['kind']] += row['total'] or 0
+    _collect(
+        buckets,
+        Food.objects.filter(expiry_date__range=(start, end))
+        .values('expiry_date', 'category__name').annotate(total=Sum('quantity')).order_by(),
+        'expiry_date', 'category__name', 'expired'
+    )
+    _collect(
+        buckets,
+        ShoppingListItem.objects.filter(status='bought')
+        # Item đã mua trước khi có bought_at: dùng updated_at
+        .annotate(day=TruncDate(Coalesce('bought_at', 'updated_at')))
+        .filter(day__range=(start, end))
+        .values('day', 'shopping_list__family_id', 'category').annotate(total=Sum('quantity')).order_by(),
+        'day', 'category', 'purchased', family_field='shopping_list__family_id'
+    )
+    return buckets
+
+
+def opening_stock(day, categories=None, using=None):
+    """
+    Tồn kho theo danh mục ngay trước ngày day: stock_level của dòng gần nhất trước đó.
+    Mỗi danh mục chỉ đọc một dòng theo index (category_name, family, day), nên số dòng đọc
+    không phụ thuộc độ dài lịch sử. Không truyền categories thì lấy các danh mục trong fridge.Category
+    (một truy vấn); truyền thì mỗi danh mục một truy vấn.
+    using: alias database, mặc định theo router.
+    """
+    latest = DailyRollup.objects.using(using).filter(family__isnull=True, day__lt=day).order_by('-day')
+    if categories is None:
+        return dict(
+            Category.objects.using(using)
+            .annotate(level=Subquery(latest.filter(category_name=OuterRef('name')).values('stock_level')[:1]))
+            .filter(level__isnull=False)
+            .values_list('name', 'level')
+        )
+    levels = {
+        category: latest.filter(category_name=category).values_list('stock_level', flat=True).first()
+        for category in categories
+    }
+    return {category: level for category, level in levels.items() if level is not None}
+
+
+def rollup_range(start, end):
+    """
+    Tính lại DailyRollup cho [start, end] (xóa rồi ghi lại trong một transaction)
+    và đẩy watermark lên end.
+    """
+    buckets = aggregate_days(start, end)
+    levels = opening_stock(
+        start, categories={category for _day, family_id, category in buckets if family_id is None}, using=ROLLUP_DB
+    )
+    rows = []
+    for (day, family_id, category), metrics in sorted(buckets.items(), key=lambda item: (item[0][0], item[0][2])):
+        row = DailyRollup(day=day, family_id=family_id, category_name=category, **metrics)
+        if family_id is None:
+            levels[category] = levels.get(category, Decimal(0)) + metrics['added'] - metrics['consumed'] - metrics['expired']
+            row.stock_level = levels[category]
+        rows.append(row)
+    with transaction.atomic():
+        DailyRollup.objects.filter(day__range=(start, end)).delete()
+        DailyRollup.objects.bulk_create(rows)
+        RollupWatermark.objects.update_or_create(name=DAILY_WATERMARK, defaults={'last_day': end})
+    return len(rows)
+
+
+def first_activity_day():
+    days = [
+        Food.objects.aggregate(day=Min('registered_date'))['day'],
+        ledger_start(),
+    ]
+    days = [day for day in days if day]
+    return min(days) if days else None
+
+
+def run_rollups(start=None, end=None, progress=None):
+    """
+    Cuộn các ngày đã qua (mặc định tới hôm qua). Không truyền start thì chỉ xử lý các ngày sau
+    watermark; truyền start (backfill) thì tính lại từ start tới end, end không nhỏ hơn
+    watermark để stock_level của các ngày sau vẫn đúng.
+    Trả về số ngày đã xử lý.
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    end = min(end or yesterday, yesterday)
+    watermark = RollupWatermark.objects.using(ROLLUP_DB).filter(name=DAILY_WATERMARK).values_list('last_day', flat=True).first()
+    if start is None:
+        start = watermark + timedelta(days=1) if watermark else first_activity_day()
+    elif watermark and end < watermark:
+        end = watermark
+    if start is None or start > end:
+        return 0
+    day = start
+    while day <= end:
+        chunk_end = min(day + timedelta(days=ROLLUP_CHUNK_DAYS - 1), end)
+        count = rollup_range(day, chunk_end)
+        if progress:
+            progress(day, chunk_end, count)
+        day = chunk_end + timedelta(days=1)
+    return (end - start).days + 1
+
+
+def rollup_series(family_ids, start, end, category=None):
+    """
+    Các dòng DailyRollup trong [start, end] của tủ lạnh (family NULL) và các family được phép,
+    đọc theo index (family, day) nên chỉ phụ thuộc độ dài khoảng, không phụ thuộc lịch sử.
+    """
+    rows = DailyRollup.objects.filter(
+        Q(family__isnull=True) | Q(family_id__in=family_ids), day__range=(start, end)
+    )
+    if category:
+        rows = rows.filter(category_name=category)
+    return rows.order_by('day', 'category_name').values(
+        'day', 'family_id', 'category_name', *ROLLUP_METRICS, 'stock_level'
+    )
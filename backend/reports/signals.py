@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from fridge.models import Food
+from .models import StockEvent
+from .stock import record_stock_changes
+
+
+def reduced_kind(food):
+    # Giảm hoặc xóa sau hạn là bỏ đi: tính vào expired của ngày hết hạn, không tính là đã dùng
+    return StockEvent.EXPIRED if food.expiry_date < timezone.localdate() else StockEvent.CONSUMED
+
+
+@receiver(post_save, sender=Food)
+def food_saved(sender, instance, created, **kwargs):
+    if created:
+        record_stock_changes([(instance, StockEvent.ADDED, instance.quantity)])
+    elif instance.saved_quantity is not None:
+        # Số lượng tăng là thêm vào tủ, giảm là đã dùng bớt (hoặc bỏ đi nếu đã quá hạn)
+        change = instance.quantity - instance.saved_quantity
+        record_stock_changes([(instance, StockEvent.ADDED if change > 0 else reduced_kind(instance), abs(change))])
+    instance.remember_saved_state()
+
+
+@receiver(post_delete, sender=Food)
+def food_deleted(sender, instance, **kwargs):
+    record_stock_changes([(instance, reduced_kind(instance), instance.saved_quantity or instance.quantity)])
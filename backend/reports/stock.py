@@ -0,0 +1,24 @@
+from django.utils import timezone
+from .models import StockEvent
+
+
+def record_stock_changes(changes):
+    """
+    Ghi StockEvent cho các thay đổi [(food, kind, quantity)] bằng một bulk_create.
+    Dùng trực tiếp ở những chỗ tạo Food bằng bulk_create (không phát post_save).
+    Phần bỏ đi sau hạn (expired) được ghi vào ngày hết hạn của thực phẩm.
+    """
+    today = timezone.localdate()
+    events = [
+        StockEvent(
+            day=food.expiry_date if kind == StockEvent.EXPIRED else today,
+            kind=kind,
+            category_id=food.category_id,
+            category_name=food.category.name,
+            quantity=quantity,
+        )
+        for food, kind, quantity in changes
+        if quantity > 0
+    ]
+    if events:
+        StockEvent.objects.bulk_create(events)
@@ -1,3 +1,252 @@
+from datetime import timedelta
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.testing import QueryBudgetMixin, SharedCacheMixin
+from fridge.models import Food, Category
+from meal_plans.models import Recipes, MealPlan
+from shopping.models import ShoppingList, ShoppingListItem
+from users.models import User, Family, FamilyMember
+from .exports import export_rows, iter_csv, run_export
+from .models import DailyRollup, ExportJob, WastePeriod
+from .rollups import aggregate_days, opening_stock
+from .waste import month_start, shift_months
 
-# Create your tests here.
+
+class ReportsQueryBudgetTests(SharedCacheMixin, QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        cls.family = Family.objects.create(name='Gia đình', created_by=cls.user)
+        cls.shopping_list = ShoppingList.objects.create(family=cls.family, created_by=cls.user, name='Đi chợ')
+        cls.categories = [Category.objects.create(name=f'Danh mục {i}') for i in range(5)]
+        cls.recipe = Recipes.objects.create(title='Canh chua', ingredients='cá, me', instructions='Nấu')
+        cls.rollup_start = timezone.localdate() - timedelta(days=2000)
+        # Một dòng trước khoảng đọc cho mỗi danh mục để opening_stock có dữ liệu
+        DailyRollup.objects.bulk_create([
+            DailyRollup(day=cls.rollup_start - timedelta(days=1), category_name=category.name, stock_level=Decimal(5))
+            for category in cls.categories
+        ])
+
+    def setUp(self):
+        self.client = self.query_client(self.user)
+
+    def add_foods(self, count):
+        today = timezone.localdate()
+        Food.objects.bulk_create([
+            Food(
+                name=f'Thực phẩm {i}',
+                category=self.categories[i % len(self.categories)],
+                compartment='cooler' if i % 2 else 'freezer',
+                location='Ngăn 1',
+                quantity=i % 7 + 1,
+                expiry_date=max(today - timedelta(days=i % 5), month_start(today)),
+            )
+            for i in range(count)
+        ])
+
+    def add_items(self, count, status='pending'):
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                shopping_list=self.shopping_list, item=f'Món {i}', normalized_item=f'món {i}',
+                quantity=1, category='Rau củ', status=status,
+            )
+            for i in range(count)
+        ])
+
+    def add_dashboard_rows(self, count):
+        self.add_foods(count)
+        self.add_items(count)
+        MealPlan.objects.bulk_create([
+            MealPlan(date=timezone.localdate(), meal_type='Bữa tối', recipe=self.recipe) for _ in range(count)
+        ])
+
+    def add_rollups(self, count):
+        offset = DailyRollup.objects.filter(day__gte=self.rollup_start).count()
+        DailyRollup.objects.bulk_create([
+            DailyRollup(
+                day=self.rollup_start + timedelta(days=(offset + i) // len(self.categories)),
+                category_name=self.categories[(offset + i) % len(self.categories)].name,
+                added=Decimal(1),
+                stock_level=Decimal(6),
+            )
+            for i in range(count)
+        ])
+
+    def test_dashboard(self):
+        # Xác thực bằng access token thật: request.user lấy từ cache xác thực chỉ có một phần các cột
+        client = self.query_client(self.user, bearer=True)
+        self.assertQueryBudget(client, reverse('dashboard'), 9, self.add_dashboard_rows)
+
+    def test_food_waste_current_month(self):
+        # Chỉ tháng hiện tại: tháng đã khép lại được chốt ở lần gọi đầu nên số truy vấn sẽ khác nhau
+        current = month_start(timezone.localdate()).strftime('%Y-%m')
+        self.assertQueryBudget(
+            self.client, reverse('food_waste_report'), 2, self.add_foods,
+            data={'start': current, 'end': current}
+        )
+
+    def test_daily_rollups(self):
+        self.assertQueryBudget(
+            self.client, reverse('daily_rollups'), 4, self.add_rollups,
+            data={'start': self.rollup_start.isoformat(), 'end': timezone.localdate().isoformat()}
+        )
+
+    def test_waste_export(self):
+        self.assertQueryBudget(self.client, reverse('report_export', args=['waste']), 1, self.add_foods)
+
+    def test_inventory_export(self):
+        self.assertQueryBudget(self.client, reverse('report_export', args=['inventory']), 1, self.add_foods)
+
+    def test_purchases_export(self):
+        self.assertQueryBudget(
+            self.client, reverse('report_export', args=['purchases']), 4,
+            lambda count: self.add_items(count, status='bought')
+        )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.category = Category.objects.create(name='Rau củ')
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.family = Family.objects.create(name='Gia đình', created_by=user)
+        self.shopping_list = ShoppingList.objects.create(family=self.family, created_by=user, name='Đi chợ')
+
+    def test_reduction_after_expiry_is_expired_not_consumed(self):
+        expiry = self.today - timedelta(days=3)
+        food = Food.objects.create(
+            name='Cải', category=self.category, compartment='cooler', location='Ngăn 1', quantity=5, expiry_date=expiry
+        )
+        food.quantity = 2
+        food.save()
+        food.delete()
+        metrics = aggregate_days(expiry, self.today)
+        self.assertEqual(metrics[(expiry, None, 'Rau củ')]['expired'], 5)
+        self.assertEqual(metrics[(self.today, None, 'Rau củ')]['consumed'], 0)
+
+    def test_purchased_on_status_change_day(self):
+        bought_day = self.today - timedelta(days=10)
+        item = ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, item='Sữa', quantity=2, category='Đồ uống', status='bought'
+        )
+        ShoppingListItem.objects.filter(pk=item.pk).update(bought_at=item.bought_at - timedelta(days=10))
+        # Sửa item sau khi mua không đổi ngày mua
+        item = ShoppingListItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        item.save()
+        metrics = aggregate_days(bought_day, self.today)
+        self.assertEqual(metrics[(bought_day, self.family.pk, 'Đồ uống')]['purchased'], 3)
+        self.assertNotIn((self.today, self.family.pk, 'Đồ uống'), metrics)
+
+    def test_opening_stock_reads_latest_row_per_category(self):
+        DailyRollup.objects.bulk_create([
+            DailyRollup(day=self.today - timedelta(days=5), category_name='Rau củ', stock_level=Decimal(4)),
+            DailyRollup(day=self.today - timedelta(days=2), category_name='Rau củ', stock_level=Decimal(7)),
+            DailyRollup(day=self.today, category_name='Rau củ', stock_level=Decimal(9)),
+            DailyRollup(day=self.today - timedelta(days=1), family=self.family, category_name='Rau củ', purchased=Decimal(1)),
+        ])
+        self.assertEqual(opening_stock(self.today), {'Rau củ': Decimal(7)})
+        self.assertEqual(opening_stock(self.today, categories=['Rau củ', 'Thịt']), {'Rau củ': Decimal(7)})
+
+
+class WasteReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_range_is_capped(self):
+        response = self.client.get(reverse('food_waste_report'), {'start': '1900-01', 'end': '2020-12'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WastePeriod.objects.exists())
+
+    def test_months_before_first_data_are_not_frozen(self):
+        current = month_start(timezone.localdate())
+        expiry = shift_months(current, -2)
+        Food.objects.create(
+            name='Cải', category=Category.objects.create(name='Rau củ'), compartment='cooler',
+            location='Ngăn 1', quantity=1, expiry_date=expiry
+        )
+        response = self.client.get(reverse('food_waste_report'), {
+            'start': shift_months(current, -5).strftime('%Y-%m'), 'end': current.strftime('%Y-%m'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([month['frozen'] for month in response.json()['months']], [False] * 3 + [True] * 2 + [False])
+        self.assertEqual(sorted(WastePeriod.objects.values_list('month', flat=True)), [expiry, shift_months(current, -1)])
+
+    def test_food_thrown_away_after_expiry_is_counted(self):
+        current = month_start(timezone.localdate())
+        expiry = shift_months(current, -1)
+        category = Category.objects.create(name='Rau củ')
+        foods = [
+            Food.objects.create(
+                name=name, category=category, compartment='cooler', location='Ngăn 1', quantity=3, expiry_date=expiry
+            )
+            for name in ('Cải', 'Cà chua')
+        ]
+        foods[0].quantity = 1
+        foods[0].save()
+        foods[1].delete()
+        month = expiry.strftime('%Y-%m')
+        response = self.client.get(reverse('food_waste_report'), {'start': month, 'end': month})
+        self.assertEqual(response.json()['months'][0]['total_quantity'], 6)
+        self.assertEqual(WastePeriod.objects.get(month=expiry).total_quantity, 6)
+
+        # Bản xuất có cả phần đã bỏ đi lẫn phần còn trong tủ
+        _headers, rows = export_rows('waste', None, start=expiry, end=expiry)
+        self.assertEqual(
+            sorted((row[0], row[4], row[6], row[7]) for row in rows if row[0]),
+            [(foods[0].pk, 1, expiry, 'Còn trong tủ')]
+        )
+        _headers, rows = export_rows('waste', None, start=expiry, end=expiry)
+        self.assertEqual(sorted(row[4] for row in rows if row[7] == 'Đã bỏ đi'), [2, 3])
+
+        # Tháng đã chốt không đổi khi phần còn lại bị bỏ đi sau đó
+        foods[0].delete()
+        cache.clear()
+        response = self.client.get(reverse('food_waste_report'), {'start': month, 'end': month})
+        self.assertEqual(response.json()['months'][0]['total_quantity'], 6)
+
+
+class ExportTests(TestCase):
+    def test_formula_cells_are_escaped(self):
+        lines = list(iter_csv(['Tên', 'Số lượng'], [('=HYPERLINK("x")', Decimal(-1)), ('@SUM(A1)', 2), ('Cà chua', 3)]))
+        self.assertEqual(lines[1], '"\'=HYPERLINK(""x"")",-1\r\n')
+        self.assertEqual(lines[2], "'@SUM(A1),2\r\n")
+        self.assertEqual(lines[3], 'Cà chua,3\r\n')
+
+    def test_job_is_claimed_once(self):
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        job = ExportJob.objects.create(user=user, dataset='inventory', output='csv')
+        with TemporaryDirectory() as directory, patch('reports.exports.EXPORT_DIR', directory):
+            self.assertEqual(run_export(job.pk).status, ExportJob.DONE)
+            self.assertIsNone(run_export(job.pk))
+
+    def test_purchase_date_is_bought_at(self):
+        cache.clear()
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        other = User.objects.create_user(username='other', email='other@example.com', password='x', full_name='Other')
+        family = Family.objects.create(name='Gia đình', created_by=user)
+        FamilyMember.objects.create(family=family, user=user, related_to=other, relationship='vợ')
+        shopping_list = ShoppingList.objects.create(family=family, created_by=user, name='Đi chợ')
+        item = ShoppingListItem.objects.create(shopping_list=shopping_list, item='Cà chua', quantity=1, status='bought')
+        bought_at = timezone.now() - timedelta(days=10)
+        ShoppingListItem.objects.filter(pk=item.pk).update(bought_at=bought_at)
+        # Sửa item sau khi mua chỉ đổi updated_at
+        item.refresh_from_db()
+        item.quantity = 2
+        item.save()
+        bought_day = timezone.localtime(bought_at).date()
+        _headers, rows = export_rows('purchases', user, start=bought_day, end=bought_day)
+        rows = list(rows)
+        self.assertEqual([row[0] for row in rows], [item.pk])
+        self.assertEqual(rows[0][1], bought_at)
+        _headers, rows = export_rows('purchases', user, start=timezone.localdate())
+        self.assertEqual(list(rows), [])
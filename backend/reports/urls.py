@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('food-waste/', views.food_waste_report, name='food_waste_report'),
+    path('rollups/daily/', views.daily_rollups, name='daily_rollups'),
+    path('exports/jobs/<uuid:token>/', views.export_job_status, name='export_job_status'),
+    path('exports/jobs/<uuid:token>/download/', views.export_job_download, name='export_job_download'),
+    path('exports/<str:dataset>/', views.report_export, name='report_export'),
+]
@@ -1,3 +1,170 @@
-from django.shortcuts import render
+import os
+import tempfile
+from datetime import date, datetime
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils import timezone
+from users.access import member_family_ids
+from .dashboard import cached_dashboard
+from .exports import (
+    CONTENT_TYPES, EXPORT_DATASETS, EXPORT_OUTPUTS, export_file_path, export_rows, iter_csv, schedule_export, write_xlsx
+)
+from .models import ExportJob
+from .rollups import rollup_series, opening_stock
+from .waste import WASTE_REPORT_MAX_MONTHS, waste_report, month_count, month_start, shift_months
 
-# Create your views here.
+# Số tháng mặc định của báo cáo khi không truyền start
+DEFAULT_REPORT_MONTHS = 6
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+
+
+@api_view(['GET'])
+def food_waste_report(request):
+    """
+    Thực phẩm bỏ phí (hết hạn khi vẫn còn trong tủ) theo tháng và danh mục.
+    Query: ?start=YYYY-MM&end=YYYY-MM (mặc định 6 tháng gần nhất, tính cả tháng này),
+    tối đa WASTE_REPORT_MAX_MONTHS tháng. Tháng đã khép lại được chốt số liệu và không tính lại.
+    """
+    current = month_start(timezone.localdate())
+    end = _parse_month(request.query_params['end']) if request.query_params.get('end') else current
+    if request.query_params.get('start'):
+        start = _parse_month(request.query_params['start'])
+    else:
+        start = shift_months(end, 1 - DEFAULT_REPORT_MONTHS) if end else None
+    if not start or not end or start > end:
+        return Response(
+            {"error": "Cần start và end hợp lệ (YYYY-MM, start <= end)."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if month_count(start, end) > WASTE_REPORT_MAX_MONTHS:
+        return Response(
+            {"error": f"Báo cáo tối đa {WASTE_REPORT_MAX_MONTHS} tháng."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(waste_report(start, end), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def daily_rollups(request):
+    """
+    Chuỗi số liệu theo ngày (added, consumed, expired, purchased, stock_level) từ DailyRollup.
+    Query: ?start=YYYY-MM-DD&end=YYYY-MM-DD[&category=...]
+    opening_stock là tồn kho của từng danh mục ngay trước start.
+    """
+    try:
+        start = date.fromisoformat(request.query_params.get('start', ''))
+        end = date.fromisoformat(request.query_params.get('end', ''))
+    except ValueError:
+        start = end = None
+    if not start or not end or start > end:
+        return Response(
+            {"error": "Cần start và end hợp lệ (YYYY-MM-DD, start <= end)."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    category = request.query_params.get('category')
+    rows = list(rollup_series(member_family_ids(request.user), start, end, category=category))
+    return Response({
+        'start': start,
+        'end': end,
+        'opening_stock': opening_stock(start, categories=[category] if category else None),
+        'days': rows,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def dashboard(request):
+    """
+    Dữ liệu màn hình chính trong một lần gọi: user, family, kế hoạch bữa ăn hôm nay,
+    thực phẩm sắp hết hạn và item chưa mua. Cache ngắn theo từng user.
+    """
+    return Response(cached_dashboard(request.user), status=status.HTTP_200_OK)
+
+
+def _export_job_payload(request, job):
+    payload = {
+        'token': job.token,
+        'dataset': job.dataset,
+        'output': job.output,
+        'status': job.status,
+        'row_count': job.row_count,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('export_job_status', args=[job.token])),
+    }
+    if job.status == ExportJob.DONE:
+        payload['download_url'] = request.build_absolute_uri(reverse('export_job_download', args=[job.token]))
+    if job.status == ExportJob.FAILED:
+        payload['error'] = job.error
+    return payload
+
+
+@api_view(['GET'])
+def report_export(request, dataset):
+    """
+    Tải báo cáo inventory | waste | purchases.
+    Query: ?output=csv|xlsx&start=YYYY-MM-DD&end=YYYY-MM-DD&background=1
+    CSV được stream từng dòng; XLSX ghi ở chế độ write-only ra file tạm rồi stream.
+    background=1: tạo ExportJob chạy nền, trả về 202 kèm status_url.
+    """
+    if dataset not in EXPORT_DATASETS:
+        return Response({"error": "Báo cáo không tồn tại."}, status=status.HTTP_404_NOT_FOUND)
+    output = request.query_params.get('output', 'csv')
+    if output not in EXPORT_OUTPUTS:
+        return Response({"error": "output chỉ nhận 'csv' hoặc 'xlsx'."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start = date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else None
+        end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else None
+    except ValueError:
+        return Response({"error": "start và end phải có dạng YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.query_params.get('background') in ('1', 'true'):
+        job = ExportJob.objects.create(user=request.user, dataset=dataset, output=output, start=start, end=end)
+        schedule_export(job)
+        return Response(_export_job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+    headers, rows = export_rows(dataset, request.user, start, end)
+    filename = f"{dataset}-{timezone.localdate()}.{output}"
+    if output == 'xlsx':
+        handle = tempfile.TemporaryFile()
+        write_xlsx(headers, rows, handle, title=dataset)
+        handle.seek(0)
+        response = FileResponse(handle, content_type=CONTENT_TYPES['xlsx'])
+    else:
+        response = StreamingHttpResponse(iter_csv(headers, rows), content_type=CONTENT_TYPES['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+def export_job_status(request, token):
+    """
+    Trạng thái một lần xuất chạy nền; khi hoàn tất có download_url.
+    """
+    job = ExportJob.objects.filter(token=token, user=request.user).first()
+    if job is None:
+        return Response({"error": "Không tìm thấy lần xuất báo cáo."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_export_job_payload(request, job), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def export_job_download(request, token):
+    """
+    Tải file của một lần xuất chạy nền đã hoàn tất.
+    """
+    job = ExportJob.objects.filter(token=token, user=request.user, status=ExportJob.DONE).first()
+    if job is None or not os.path.exists(export_file_path(job)):
+        return Response({"error": "File báo cáo chưa sẵn sàng hoặc đã bị xóa."}, status=status.HTTP_404_NOT_FOUND)
+    filename = f"{job.dataset}-{job.created_at.date()}.{job.output}"
+    return FileResponse(
+        open(export_file_path(job), 'rb'), as_attachment=True, filename=filename,
+        content_type=CONTENT_TYPES[job.output]
+    )
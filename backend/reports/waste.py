@@ -0,0 +1,216 @@
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, router, transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from fridge.models import Food
+from .models import StockEvent, WastePeriod, WasteEntry
+
+# Thời gian cache số liệu của tháng hiện tại (giây); tháng đã khép lại được chốt trong database
+WASTE_REPORT_CACHE_TIMEOUT = getattr(settings, 'WASTE_REPORT_CACHE_TIMEOUT', 300)
+# Số tháng tối đa của một báo cáo (mỗi tháng đã khép lại được chốt thành một WastePeriod)
+WASTE_REPORT_MAX_MONTHS = getattr(settings, 'WASTE_REPORT_MAX_MONTHS', 36)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def shift_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def next_month(month):
+    return shift_months(month, 1)
+
+
+def month_count(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def iter_months(start, end):
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+
+def waste_cache_key(month):
+    return f"reports:waste:{month.strftime('%Y-%m')}"
+
+
+def aggregate_waste(start, end, using=None):
+    """
+    Thực phẩm bỏ phí có hạn dùng trong [start, end), gom theo tháng và danh mục, từ hai nguồn
+    (mỗi nguồn một truy vấn GROUP BY):
+    - StockEvent expired: phần đã bỏ đi sau hạn, ghi vào ngày hết hạn (xem reports.signals),
+    - Food còn trong tủ đã qua expiry_date.
+    Bỏ thực phẩm đi chỉ chuyển số lượng từ nguồn thứ hai sang nguồn thứ nhất ở cùng ngày, nên số liệu
+    của một tháng đã khép lại không phụ thuộc lúc tính. Cả hai nguồn đọc từ cùng một database
+    (using, mặc định theo router của StockEvent) để không bỏ sót phần vừa chuyển.
+    Trả về {tháng: [{'category_id', 'category', 'item_count', 'total_quantity'}, ...]}.
+    """
+    using = using or router.db_for_read(StockEvent)
+    sources = (
+        StockEvent.objects.using(using).filter(kind=StockEvent.EXPIRED, day__gte=start, day__lt=end)
+        .annotate(month=TruncMonth('day'))
+        .values('month', 'category_id', 'category_name'),
+        Food.objects.using(using).filter(expiry_date__gte=start, expiry_date__lt=end)
+        .annotate(month=TruncMonth('expiry_date'))
+        .values('month', 'category_id', category_name=F('category__name')),
+    )
+    totals = {}
+    for rows in sources:
+        for row in rows.annotate(item_count=Count('id'), total_quantity=Sum('quantity')).order_by():
+            month = row['month']
+            if hasattr(month, 'date'):
+                month = month.date()
+            total = totals.setdefault((month, row['category_name']), {
+                'category_id': row['category_id'],
+                'category': row['category_name'],
+                'item_count': 0,
+                'total_quantity': 0,
+            })
+            if total['category_id'] is None:
+                total['category_id'] = row['category_id']
+            total['item_count'] += row['item_count']
+            total['total_quantity'] += int(row['total_quantity'] or 0)
+    result = {}
+    for (month, category), total in sorted(totals.items()):
+        result.setdefault(month, []).append(total)
+    return result
+
+
+def _month_payload(month, categories, frozen):
+    return {
+        'month': month.strftime('%Y-%m'),
+        'frozen': frozen,
+        'total_items': sum(row['item_count'] for row in categories),
+        'total_quantity': sum(row['total_quantity'] for row in categories),
+        'categories': categories,
+    }
+
+
+def freeze_months(months):
+    """
+    Chốt số liệu của các tháng đã khép lại từ sổ StockEvent và phần còn trong tủ (xem aggregate_waste),
+    đọc từ database chính; mỗi nguồn một truy vấn tổng hợp cho cả nhóm tháng.
+    Tháng đã chốt được bỏ qua nên gọi lại nhiều lần vẫn an toàn.
+    """
+    months = sorted(months)
+    if not months:
+        return {}
+    aggregated = aggregate_waste(months[0], next_month(months[-1]), using=DEFAULT_DB_ALIAS)
+    frozen = {}
+    with transaction.atomic():
+        existing = set(WastePeriod.objects.filter(month__in=months).values_list('month', flat=True))
+        for month in months:
+            if month in existing:
+                continue
+            categories = aggregated.get(month, [])
+            payload = _month_payload(month, categories, frozen=True)
+            period = WastePeriod.objects.create(
+                month=month, total_items=payload['total_items'], total_quantity=payload['total_quantity']
+            )
+            WasteEntry.objects.bulk_create([
+                WasteEntry(
+                    period=period,
+                    category_id=row['category_id'],
+                    category_name=row['category'],
+                    item_count=row['item_count'],
+                    total_quantity=row['total_quantity'],
+                )
+                for row in categories
+            ])
+            frozen[month] = payload
+    return frozen
+
+
+def _frozen_payloads(months):
+    # Đọc từ database chính: freeze_months bỏ qua tháng đã chốt ở đó, nếu đọc từ bản sao
+    # đang trễ thì tháng vừa được request khác chốt sẽ không có ở cả hai phía
+    payloads = {}
+    periods = WastePeriod.objects.using(DEFAULT_DB_ALIAS).filter(month__in=months).prefetch_related('entries')
+    for period in periods:
+        categories = [
+            {
+                'category_id': entry.category_id,
+                'category': entry.category_name,
+                'item_count': entry.item_count,
+                'total_quantity': entry.total_quantity,
+            }
+            for entry in sorted(period.entries.all(), key=lambda entry: entry.category_name)
+        ]
+        payloads[period.month] = _month_payload(period.month, categories, frozen=True)
+    return payloads
+
+
+def first_data_month():
+    """
+    Tháng có dữ liệu sớm nhất (expiry_date nhỏ nhất của Food, ngày đầu của StockEvent), đọc theo index
+    từ database chính; None nếu chưa có dữ liệu. Các tháng trước đó không được chốt.
+    """
+    days = [
+        Food.objects.using(DEFAULT_DB_ALIAS).aggregate(day=Min('expiry_date'))['day'],
+        StockEvent.objects.using(DEFAULT_DB_ALIAS).aggregate(day=Min('day'))['day'],
+    ]
+    days = [day for day in days if day]
+    return month_start(min(days)) if days else None
+
+
+def waste_report(start, end):
+    """
+    Báo cáo thực phẩm bỏ phí theo tháng và danh mục, từ tháng của start tới tháng của end.
+    - Tháng đã khép lại: đọc bản đã chốt (chốt ở lần đọc đầu tiên), cache không hết hạn.
+      Tháng trước khi có dữ liệu (first_data_month) trả về rỗng, không chốt và không cache.
+    - Tháng hiện tại: tính tới hôm qua bằng truy vấn tổng hợp, cache WASTE_REPORT_CACHE_TIMEOUT giây.
+    - Tháng tương lai: không có dữ liệu.
+    """
+    today = timezone.localdate()
+    current = month_start(today)
+    months = [month for month in iter_months(start, end) if month <= current]
+
+    cached = cache.get_many([waste_cache_key(month) for month in months])
+    payloads = {month: cached[waste_cache_key(month)] for month in months if waste_cache_key(month) in cached}
+
+    closed = [month for month in months if month < current and month not in payloads]
+    if closed:
+        first_month = first_data_month()
+        for month in closed:
+            if first_month is None or month < first_month:
+                payloads[month] = _month_payload(month, [], frozen=False)
+        closed = [month for month in closed if month not in payloads]
+    if closed:
+        stored = _frozen_payloads(closed)
+        try:
+            stored.update(freeze_months([month for month in closed if month not in stored]))
+        except IntegrityError:
+            # Request khác vừa chốt cùng tháng, đọc lại bản đã chốt
+            stored = _frozen_payloads(closed)
+        payloads.update(stored)
+        cache.set_many({waste_cache_key(month): stored[month] for month in stored}, None)
+
+    if current in months and current not in payloads:
+        # Chỉ tính thực phẩm đã hết hạn (expiry_date < hôm nay)
+        categories = aggregate_waste(current, today).get(current, [])
+        payloads[current] = _month_payload(current, categories, frozen=False)
+        cache.set(waste_cache_key(current), payloads[current], WASTE_REPORT_CACHE_TIMEOUT)
+
+    report = [payloads[month] for month in months]
+    totals = {}
+    for month in report:
+        for row in month['categories']:
+            total = totals.setdefault(row['category'], {
+                'category_id': row['category_id'], 'category': row['category'], 'item_count': 0, 'total_quantity': 0,
+            })
+            total['item_count'] += row['item_count']
+            total['total_quantity'] += row['total_quantity']
+    return {
+        'start': months[0].strftime('%Y-%m') if months else None,
+        'end': months[-1].strftime('%Y-%m') if months else None,
+        'months': report,
+        'categories': sorted(totals.values(), key=lambda row: row['category']),
+    }
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db import models
+from backend.caching import bump_namespace, shared_cache_enabled
+from users.access import ACCESS_CACHE_TIMEOUT, access_cache_key, cached_ids, family_user_ids, invalidate_user_access, member_family_ids
+from .models import ShoppingList
+
+
+def _shopping_scope(user):
+    """
+    Tính trong một lượt và cache:
+    - shopping_lists: danh sách user được truy cập, gồm danh sách của các family mà user là
+      thành viên (FamilyMember.user) cộng với danh sách được chia sẻ trực tiếp;
+    - shopping_item_lists: danh sách mà user được xem và sửa item, chỉ gồm danh sách của các
+      family mà user là thành viên (danh sách chỉ được chia sẻ không mở item);
+    - shopping_families: family của các danh sách trên.
+    """
+    family_ids = set(member_family_ids(user))
+    shared_ids = ShoppingList.shared_with.through.objects.filter(
+        user_id=user.pk
+    ).values_list('shoppinglist_id', flat=True)
+    rows = list(ShoppingList.objects.filter(
+        models.Q(family_id__in=family_ids) | models.Q(pk__in=list(shared_ids))
+    ).values_list('id', 'family_id'))
+    scope = {
+        'shopping_lists': [shopping_list_id for shopping_list_id, _family_id in rows],
+        'shopping_item_lists': [shopping_list_id for shopping_list_id, family_id in rows if family_id in family_ids],
+        'shopping_families': list({family_id for _shopping_list_id, family_id in rows}),
+    }
+    if shared_cache_enabled():
+        cache.set_many({access_cache_key(kind, user.pk): ids for kind, ids in scope.items()}, ACCESS_CACHE_TIMEOUT)
+    return scope
+
+
+def accessible_shopping_list_ids(user):
+    """
+    ID các danh sách user được truy cập. Chỉ dùng truy vấn IN theo index, có cache.
+    """
+    return cached_ids('shopping_lists', user.pk, lambda: _shopping_scope(user)['shopping_lists'])
+
+
+def accessible_item_list_ids(user):
+    """
+    ID các danh sách mà user được xem và sửa item (danh sách của family user là thành viên), có cache.
+    """
+    return cached_ids('shopping_item_lists', user.pk, lambda: _shopping_scope(user)['shopping_item_lists'])
+
+
+def accessible_shopping_family_ids(user):
+    """
+    ID family (có thể là None) của các danh sách user được truy cập, có cache.
+    Là các scope của namespace 'shopping' mà response của user phụ thuộc (xem backend.caching).
+    """
+    return cached_ids('shopping_families', user.pk, lambda: _shopping_scope(user)['shopping_families'])
+
+
+def shopping_list_user_ids(shopping_list, family_ids=()):
+    """
+    Những user có thể thấy danh sách (thành viên family và người được chia sẻ).
+    """
+    user_ids = set(shopping_list.shared_with.values_list('id', flat=True)) if shopping_list.pk else set()
+    for family_id in {shopping_list.family_id, *family_ids}:
+        if family_id:
+            user_ids |= family_user_ids(family_id)
+    return user_ids
+
+
+def invalidate_shopping_list_access(shopping_list, family_ids=()):
+    invalidate_user_access(shopping_list_user_ids(shopping_list, family_ids))
+
+
+def invalidate_shopping_cache(shopping_list_ids=(), family_ids=()):
+    """
+    Tăng phiên bản namespace 'shopping' của các family chứa các danh sách đã thay đổi.
+    Dùng ở những chỗ ghi không phát signal (bulk_create, update()).
+    """
+    family_ids = set(family_ids)
+    if shopping_list_ids:
+        family_ids |= set(
+            ShoppingList.objects.filter(pk__in=set(shopping_list_ids)).values_list('family_id', flat=True)
+        )
+    if family_ids:
+        bump_namespace('shopping', family_ids)
@@ -0,0 +1,44 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from users.realtime import user_access_group
+from .access import accessible_shopping_list_ids
+from .realtime import shopping_list_group
+
+
+class ShoppingListConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Kênh WebSocket cho một danh sách mua sắm: thành viên family và người được chia sẻ
+    nhận các thay đổi item (add, update, status, delete) ngay khi chúng được lưu.
+    Quyền được kiểm tra lại mỗi khi quyền truy cập của user thay đổi (users.access.invalidate_user_access);
+    mất quyền thì kết nối bị đóng với mã 4403.
+    """
+
+    async def connect(self):
+        self.shopping_list_id = self.scope['url_route']['kwargs']['shopping_list_id']
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated or not await self.has_access(user):
+            await self.close(code=4403)
+            return
+        self.group_names = [shopping_list_group(self.shopping_list_id), user_access_group(user.pk)]
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group_name in getattr(self, 'group_names', []):
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    @database_sync_to_async
+    def has_access(self, user):
+        return self.shopping_list_id in accessible_shopping_list_ids(user)
+
+    async def access_changed(self, event):
+        if not await self.has_access(self.scope['user']):
+            await self.close(code=4403)
+
+    async def item_diff(self, event):
+        await self.send_json({
+            'shopping_list': event['shopping_list'],
+            'action': event['action'],
+            'items': event['items'],
+        })
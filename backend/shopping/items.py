@@ -0,0 +1,237 @@
+import math
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import serializers
+from fridge.models import Category, Food
+from fridge.shelf_life import default_expiry_date
+from reports.models import StockEvent
+from reports.stock import record_stock_changes
+from backend.caching import bump_namespace
+from .access import invalidate_shopping_cache
+from .models import ShoppingList, ShoppingListItem
+from .normalization import normalize_item_name, default_unit_for
+from .purchases import record_purchases
+from .realtime import broadcast_item_diff, serialize_item, ITEM_ADDED, ITEM_UPDATED
+
+# Cột bộ đếm trên ShoppingList tương ứng với từng trạng thái item
+STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'bought': 'bought_count',
+}
+
+
+def count_item(deltas, shopping_list_id, status, sign=1):
+    """
+    Ghi nhận một item được thêm (sign=1) hoặc bớt (sign=-1) khỏi danh sách vào deltas.
+    """
+    deltas[shopping_list_id]['item_count'] += sign
+    count_status(deltas, shopping_list_id, status, sign)
+
+
+def count_status(deltas, shopping_list_id, status, sign=1):
+    if status in STATUS_COUNTERS:
+        deltas[shopping_list_id][STATUS_COUNTERS[status]] += sign
+
+
+def new_deltas():
+    return defaultdict(Counter)
+
+
+def counter_values(counts):
+    # counts: Counter {status: số item}; trả về tham số cho update()
+    return {
+        'item_count': sum(counts.values()),
+        'pending_count': counts.get('pending', 0),
+        'bought_count': counts.get('bought', 0),
+        'counters_ready': True,
+    }
+
+
+def count_items(shopping_list_id):
+    """
+    Bộ đếm của một danh sách tính trực tiếp từ bảng item.
+    """
+    return counter_values(Counter(dict(
+        ShoppingListItem.objects.filter(shopping_list_id=shopping_list_id)
+        .order_by()
+        .values_list('status')
+        .annotate(total=Count('id'))
+    )))
+
+
+def apply_counter_deltas(deltas):
+    """
+    Cộng dồn chênh lệch vào bộ đếm của từng ShoppingList bằng UPDATE ... SET x = x + n,
+    không cần quét lại item. Gọi sau khi thay đổi item đã được ghi.
+    """
+    for shopping_list_id, changes in deltas.items():
+        updates = {field: F(field) + value for field, value in changes.items() if value}
+        if not updates:
+            continue
+        if not ShoppingList.objects.filter(pk=shopping_list_id, counters_ready=True).update(**updates):
+            # Danh sách có từ trước khi có bộ đếm (bộ đếm vẫn là 0): đếm lại một lần từ item
+            # thay vì cộng chênh lệch, sau đó danh sách dùng chênh lệch như bình thường
+            ShoppingList.objects.filter(pk=shopping_list_id).update(**count_items(shopping_list_id))
+
+
+def ensure_counted(shopping_lists):
+    """
+    Đếm lại các danh sách chưa từng được đếm (xem counters_ready) bằng một truy vấn gom nhóm
+    và cập nhật các instance, để response không trả bộ đếm 0 của danh sách cũ chưa có thay đổi
+    item nào. Danh sách đã đếm không tốn thêm truy vấn.
+    """
+    pending = {shopping_list.pk: shopping_list for shopping_list in shopping_lists if not shopping_list.counters_ready}
+    if not pending:
+        return
+    counts = defaultdict(Counter)
+    rows = (
+        ShoppingListItem.objects.filter(shopping_list_id__in=list(pending))
+        .order_by()
+        .values_list('shopping_list_id', 'status')
+        .annotate(total=Count('id'))
+    )
+    for shopping_list_id, item_status, total in rows:
+        counts[shopping_list_id][item_status] = total
+    for shopping_list_id, shopping_list in pending.items():
+        values = counter_values(counts[shopping_list_id])
+        ShoppingList.objects.filter(pk=shopping_list_id).update(**values)
+        for field, value in values.items():
+            setattr(shopping_list, field, value)
+
+
+def merge_key(item):
+    return (item.normalized_item, normalize_item_name(item.category), item.unit)
+
+
+def add_items(shopping_list, entries):
+    """
+    Thêm item vào danh sách. Item chưa mua trùng tên chuẩn hóa, danh mục và đơn vị với một item
+    chưa mua đã có (hoặc với item khác trong cùng lô) được cộng dồn số lượng thay vì tạo dòng mới.
+    Trả về (created, merged).
+    """
+    prepared = []
+    for entry in entries:
+        item = ShoppingListItem(shopping_list=shopping_list, **entry)
+        item.normalized_item = normalize_item_name(item.item)
+        if not item.unit:
+            item.unit = default_unit_for(item.category)
+        prepared.append(item)
+
+    with transaction.atomic():
+        existing = {}
+        candidates = ShoppingListItem.objects.select_for_update().filter(
+            shopping_list=shopping_list,
+            status='pending',
+            normalized_item__in={item.normalized_item for item in prepared}
+        ).order_by('id')
+        for item in candidates:
+            existing.setdefault(merge_key(item), item)
+
+        now = timezone.now()
+        created, merged = [], {}
+        for item in prepared:
+            key = merge_key(item)
+            target = existing.get(key) if item.status == 'pending' else None
+            if target is None:
+                # bulk_create không gọi save(): tự ghi thời điểm mua
+                item.mark_bought_at(now)
+                created.append(item)
+                if item.status == 'pending':
+                    existing[key] = item
+                continue
+            target.quantity += item.quantity
+            if target.pk:
+                target.updated_at = now
+                merged[target.pk] = target
+
+        ShoppingListItem.objects.bulk_create(created)
+        if merged:
+            ShoppingListItem.objects.bulk_update(merged.values(), ['quantity', 'updated_at'])
+
+        deltas = new_deltas()
+        for item in created:
+            count_item(deltas, shopping_list.pk, item.status)
+        apply_counter_deltas(deltas)
+        record_purchases([item for item in created if item.status == 'bought'])
+
+        # bulk_create / bulk_update không phát signal
+        if created:
+            broadcast_item_diff(shopping_list.pk, ITEM_ADDED, [serialize_item(item) for item in created])
+        if merged:
+            broadcast_item_diff(shopping_list.pk, ITEM_UPDATED, [serialize_item(item) for item in merged.values()])
+        if created or merged:
+            invalidate_shopping_cache(family_ids=[shopping_list.family_id])
+    return created, list(merged.values())
+
+
+def recount(shopping_lists=None):
+    """
+    Tính lại bộ đếm từ bảng item (chỉ dùng để sửa dữ liệu, không gọi trong request).
+    """
+    queryset = shopping_lists if shopping_lists is not None else ShoppingList.objects.all()
+    family_ids = set()
+    for shopping_list_id, family_id in queryset.values_list('id', 'family_id').iterator():
+        family_ids.add(family_id)
+        ShoppingList.objects.filter(pk=shopping_list_id).update(**count_items(shopping_list_id))
+    invalidate_shopping_cache(family_ids=family_ids)
+
+
+def transfer_to_fridge(items, compartment='cooler', location=''):
+    """
+    Chuyển các item đã mua (chưa chuyển) trong items vào tủ lạnh trong một transaction:
+    danh mục được tra bằng một truy vấn, Food tạo bằng bulk_create, hạn dùng lấy theo
+    bảng thời gian bảo quản của danh mục, rồi item được đánh dấu transferred_at để gọi lại
+    không tạo trùng. Trả về (foods, transferred_ids, skipped).
+    """
+    with transaction.atomic():
+        pending = list(
+            items.select_for_update()
+            .filter(status='bought', transferred_at__isnull=True)
+            .select_related('shopping_list')
+            .order_by('id')
+        )
+        names = {(item.category or '').strip().lower() for item in pending if item.category}
+        categories = {
+            category.name_lower: category
+            for category in Category.objects.annotate(name_lower=Lower('name')).filter(name_lower__in=names)
+        }
+
+        today = timezone.localdate()
+        foods, transferred, skipped = [], [], []
+        for item in pending:
+            category = categories.get((item.category or '').strip().lower())
+            if category is None:
+                skipped.append({'id': item.pk, 'reason': f"Danh mục '{item.category}' không tồn tại."})
+                continue
+            foods.append(Food(
+                name=item.item,
+                category=category,
+                compartment=compartment,
+                location=location,
+                # Food.quantity là số nguyên dương
+                quantity=max(1, math.ceil(item.quantity)),
+                expiry_date=default_expiry_date(category.name, compartment, today),
+                note=f"Từ danh sách mua sắm '{item.shopping_list.name}' ({item.quantity} {item.unit})".strip(),
+            ))
+            transferred.append(item)
+
+        Food.objects.bulk_create(foods)
+        # bulk_create không phát post_save, ghi nhận phần thêm vào tủ cho báo cáo theo ngày
+        record_stock_changes([(food, StockEvent.ADDED, food.quantity) for food in foods])
+        transferred_at = timezone.now()
+        transferred_ids = [item.pk for item in transferred]
+        ShoppingListItem.objects.filter(pk__in=transferred_ids).update(transferred_at=transferred_at)
+        if transferred:
+            bump_namespace('fridge')
+            invalidate_shopping_cache(family_ids={item.shopping_list.family_id for item in transferred})
+
+        by_list = defaultdict(list)
+        stamp = serializers.DateTimeField().to_representation(transferred_at)
+        for item in transferred:
+            by_list[item.shopping_list_id].append({'id': item.pk, 'transferred_at': stamp})
+        for shopping_list_id, changed in by_list.items():
+            broadcast_item_diff(shopping_list_id, ITEM_UPDATED, changed)
+    return foods, transferred_ids, skipped
\ No newline at end of file
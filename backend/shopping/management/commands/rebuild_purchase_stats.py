@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from shopping.access import invalidate_shopping_cache
+from shopping.models import ShoppingList, ShoppingListItem, PurchaseStat
+from shopping.purchases import record_purchases
+
+
+class Command(BaseCommand):
+    help = "Dựng lại thống kê mua (PurchaseStat) từ toàn bộ lịch sử item đã mua. Chỉ cần chạy một lần hoặc khi sửa dữ liệu."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch, total = [], 0
+        items = ShoppingListItem.objects.filter(status='bought').order_by(Coalesce('bought_at', 'updated_at'), 'id')
+        # Xóa và dựng lại trong một transaction: gợi ý không bao giờ đọc thấy bảng đang dựng dở,
+        # lỗi giữa chừng thì giữ nguyên thống kê cũ
+        with transaction.atomic():
+            PurchaseStat.objects.all().delete()
+            for item in items.iterator(chunk_size=options['batch_size']):
+                batch.append(item)
+                if len(batch) >= options['batch_size']:
+                    record_purchases(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                record_purchases(batch)
+                total += len(batch)
+        # Gợi ý mua lại đọc từ PurchaseStat, bỏ response đã cache của mọi family
+        invalidate_shopping_cache(family_ids=ShoppingList.objects.values_list('family_id', flat=True).distinct())
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tổng hợp {total} lần mua thành {PurchaseStat.objects.count()} thống kê."
+        ))
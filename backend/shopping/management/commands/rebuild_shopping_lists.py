@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from shopping.items import recount
+from shopping.models import ShoppingList, ShoppingListItem
+from shopping.normalization import normalize_item_name, default_unit_for
+
+
+class Command(BaseCommand):
+    help = "Điền tên chuẩn hóa/đơn vị cho item cũ và tính lại bộ đếm item của từng danh sách mua sắm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch, filled = [], 0
+        for item in ShoppingListItem.objects.filter(normalized_item='').only('id', 'item', 'category', 'unit').iterator():
+            item.normalized_item = normalize_item_name(item.item)
+            if not item.unit:
+                item.unit = default_unit_for(item.category)
+            batch.append(item)
+            if len(batch) >= options['batch_size']:
+                ShoppingListItem.objects.bulk_update(batch, ['normalized_item', 'unit'])
+                filled += len(batch)
+                batch = []
+        if batch:
+            ShoppingListItem.objects.bulk_update(batch, ['normalized_item', 'unit'])
+            filled += len(batch)
+        self.stdout.write(f"Đã chuẩn hóa {filled} item.")
+
+        recount(ShoppingList.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Đã tính lại bộ đếm cho {ShoppingList.objects.count()} danh sách."))
@@ -1,7 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from users.models import User, Family
+from .normalization import normalize_item_name
 
 class ShoppingList(models.Model):
     family = models.ForeignKey(
@@ -41,6 +43,30 @@ class ShoppingList(models.Model):
         related_name='shared_shopping_lists',
         help_text='Các thành viên được chia sẻ danh sách này'
     )
+    item_count = models.PositiveIntegerField(
+        _('item count'),
+        default=0,
+        editable=False,
+        help_text=_('Number of items in the list, maintained incrementally.')
+    )
+    pending_count = models.PositiveIntegerField(
+        _('pending count'),
+        default=0,
+        editable=False,
+        help_text=_('Number of items still to buy, maintained incrementally.')
+    )
+    bought_count = models.PositiveIntegerField(
+        _('bought count'),
+        default=0,
+        editable=False,
+        help_text=_('Number of bought items, maintained incrementally.')
+    )
+    counters_ready = models.BooleanField(
+        _('counters ready'),
+        default=False,
+        editable=False,
+        help_text=_('Whether the counters were computed from the items. Lists created before the counters existed are recounted on first use.')
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         help_text=_('Timestamp when the shopping list was created.')
@@ -54,11 +80,29 @@ class ShoppingList(models.Model):
         verbose_name = _('shopping list')
         verbose_name_plural = _('shopping lists')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Family đã lưu, để biết cần làm mới quyền truy cập của những ai khi đổi family
+        instance._saved_family_id = instance.__dict__.get('family_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Danh sách mới chưa có item, bộ đếm bằng 0 là đúng
+            self.counters_ready = True
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} for {self.family.name}"
     
     
 class ShoppingListItem(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Chưa mua'),
+        ('bought', 'Đã mua'),
+    ]
+
     shopping_list = models.ForeignKey(
         ShoppingList,
         on_delete=models.CASCADE,
@@ -70,6 +114,20 @@ class ShoppingListItem(models.Model):
         max_length=100,
         help_text=_('Name of the item to buy.')
     )
+    normalized_item = models.CharField(
+        _('normalized item'),
+        max_length=100,
+        blank=True,
+        editable=False,
+        help_text=_('Lower-cased, accent-free item name used to merge duplicates.')
+    )
+    unit = models.CharField(
+        _('unit'),
+        max_length=20,
+        blank=True,
+        default='',
+        help_text=_('Đơn vị của số lượng, mặc định theo danh mục (kg, hộp, chai, ...)')
+    )
     quantity = models.DecimalField(
         _('quantity'),
         max_digits=10,
@@ -95,13 +153,136 @@ class ShoppingListItem(models.Model):
     status = models.CharField(
         _('status'),
         max_length=20,
-        choices=[('pending', 'Chưa mua'), ('bought', 'Đã mua')],
+        choices=STATUS_CHOICES,
         default='pending',
         help_text=_('Trạng thái mua sắm')
     )
+    bought_at = models.DateTimeField(
+        _('bought at'),
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_('Timestamp when the item was last marked as bought.')
+    )
+    transferred_at = models.DateTimeField(
+        _('transferred at'),
+        null=True,
+        blank=True,
+        help_text=_('Thời điểm item đã mua được chuyển vào tủ lạnh (fridge.Food)')
+    )
+
     class Meta:
         verbose_name = _('shopping list item')
         verbose_name_plural = _('shopping list items')
+        indexes = [
+            models.Index(fields=['shopping_list', 'normalized_item']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_saved_state()
+        return instance
+
+    def remember_saved_state(self):
+        # Ghi nhớ trạng thái và danh sách đã lưu để phân biệt "đổi trạng thái" với sửa thông thường
+        # và cập nhật bộ đếm của ShoppingList theo đúng phần chênh lệch
+        self._saved_status = self.__dict__.get('status')
+        self._saved_shopping_list_id = self.__dict__.get('shopping_list_id')
+
+    @property
+    def saved_status(self):
+        return getattr(self, '_saved_status', None)
+
+    @property
+    def saved_shopping_list_id(self):
+        return getattr(self, '_saved_shopping_list_id', None)
+
+    def status_changed(self):
+        return self.saved_status is not None and self.saved_status != self.status
+
+    def mark_bought_at(self, when=None):
+        # Thời điểm mua là lúc item chuyển sang 'bought', không đổi khi sửa item sau đó
+        if self.status != 'bought':
+            self.bought_at = None
+        elif self.saved_status != 'bought':
+            self.bought_at = when or timezone.now()
+
+    def save(self, *args, **kwargs):
+        self.normalized_item = normalize_item_name(self.item)
+        self.mark_bought_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'item' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_item'}
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'bought_at'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.item} ({self.quantity}) in {self.shopping_list.name}"
+
+
+class PurchaseStat(models.Model):
+    """
+    Thống kê mua theo family và tên item (đã chuẩn hóa), cập nhật dần mỗi khi một item
+    chuyển sang 'bought' (xem shopping.purchases). Dùng để gợi ý item sắp cần mua lại.
+    """
+    family = models.ForeignKey(
+        Family,
+        on_delete=models.CASCADE,
+        related_name='purchase_stats',
+        help_text=_('Family the purchase history belongs to.')
+    )
+    normalized_item = models.CharField(
+        _('normalized item'),
+        max_length=100,
+        help_text=_('Normalized item name (see ShoppingListItem.normalized_item).')
+    )
+    item = models.CharField(
+        _('item'),
+        max_length=100,
+        help_text=_('Item name as last bought.')
+    )
+    category = models.CharField(_('category'), max_length=50, null=True, blank=True)
+    unit = models.CharField(_('unit'), max_length=20, blank=True, default='')
+    purchase_count = models.PositiveIntegerField(
+        _('purchase count'),
+        default=0,
+        help_text=_('Number of separate purchases recorded.')
+    )
+    interval_count = models.PositiveIntegerField(
+        _('interval count'),
+        default=0,
+        help_text=_('Number of intervals between purchases folded into avg_interval_days.')
+    )
+    avg_interval_days = models.FloatField(
+        _('average interval (days)'),
+        null=True,
+        blank=True,
+        help_text=_('Exponentially weighted average of days between purchases.')
+    )
+    avg_quantity = models.DecimalField(
+        _('average quantity'),
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text=_('Running average quantity per purchase.')
+    )
+    last_purchased_at = models.DateTimeField(_('last purchased at'), null=True, blank=True)
+    next_due_at = models.DateTimeField(
+        _('next due at'),
+        null=True,
+        blank=True,
+        help_text=_('last_purchased_at + avg_interval_days, stored so suggestions are an indexed range query.')
+    )
+
+    class Meta:
+        verbose_name = _('purchase stat')
+        verbose_name_plural = _('purchase stats')
+        unique_together = ('family', 'normalized_item')
+        indexes = [
+            models.Index(fields=['family', 'next_due_at']),
+        ]
 
     def __str__(self):
-        return f"{self.item} ({self.quantity}) in {self.shopping_list.name}"
\ No newline at end of file
+        return f"{self.item} every {self.avg_interval_days} days ({self.family_id})"
@@ -0,0 +1,36 @@
+import unicodedata
+from django.conf import settings
+
+# Đơn vị mặc định theo danh mục (khóa là tên danh mục đã chuẩn hóa).
+# Item trùng tên chỉ được gộp khi cùng danh mục và cùng đơn vị.
+DEFAULT_CATEGORY_UNITS = {
+    'rau cu': 'kg',
+    'trai cay': 'kg',
+    'thit ca': 'kg',
+    'hai san': 'kg',
+    'do kho': 'gói',
+    'gia vi': 'gói',
+    'do uong': 'chai',
+    'sua': 'hộp',
+    'trung': 'quả',
+}
+
+
+def normalize_item_name(name):
+    """
+    Chuẩn hóa tên để so trùng: chữ thường, bỏ dấu, gộp khoảng trắng.
+    Ví dụ: '  Sữa   Tươi ' -> 'sua tuoi'
+    """
+    if not name:
+        return ''
+    name = name.replace('đ', 'd').replace('Đ', 'D')
+    name = ''.join(
+        char for char in unicodedata.normalize('NFKD', name)
+        if not unicodedata.combining(char)
+    )
+    return ' '.join(name.lower().split())
+
+
+def default_unit_for(category):
+    units = getattr(settings, 'SHOPPING_CATEGORY_UNITS', DEFAULT_CATEGORY_UNITS)
+    return units.get(normalize_item_name(category), '')
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ShoppingList, ShoppingListItem, PurchaseStat
+
+# Trọng số của khoảng cách mới nhất trong trung bình trượt (EWMA)
+INTERVAL_SMOOTHING = getattr(settings, 'PURCHASE_INTERVAL_SMOOTHING', 0.3)
+
+# Hai lần mua cách nhau ít hơn ngưỡng này được coi là cùng một lần đi chợ
+SAME_TRIP_HOURS = getattr(settings, 'PURCHASE_SAME_TRIP_HOURS', 12)
+
+
+def _fold(stat, item, purchased_at):
+    """
+    Cộng một lần mua vào thống kê (không đọc lại lịch sử).
+    """
+    stat.item = item.item
+    stat.category = item.category
+    stat.unit = item.unit
+    if stat.last_purchased_at and purchased_at - stat.last_purchased_at < timedelta(hours=SAME_TRIP_HOURS):
+        # Cùng lần đi chợ: không tính thêm khoảng cách
+        return
+    if stat.last_purchased_at and purchased_at > stat.last_purchased_at:
+        interval = (purchased_at - stat.last_purchased_at).total_seconds() / 86400
+        if stat.avg_interval_days is None:
+            stat.avg_interval_days = interval
+        else:
+            stat.avg_interval_days = INTERVAL_SMOOTHING * interval + (1 - INTERVAL_SMOOTHING) * stat.avg_interval_days
+        stat.interval_count += 1
+    stat.purchase_count += 1
+    stat.avg_quantity = (
+        (stat.avg_quantity * (stat.purchase_count - 1) + Decimal(item.quantity)) / stat.purchase_count
+    ).quantize(Decimal('0.01'))
+    if not stat.last_purchased_at or purchased_at > stat.last_purchased_at:
+        stat.last_purchased_at = purchased_at
+    if stat.avg_interval_days is not None:
+        stat.next_due_at = stat.last_purchased_at + timedelta(days=stat.avg_interval_days)
+
+
+def purchased_at(item):
+    return item.bought_at or item.updated_at or timezone.now()
+
+
+def record_purchases(items):
+    """
+    Cập nhật PurchaseStat cho các item vừa chuyển sang 'bought' (thời điểm mua là bought_at của item,
+    item cũ chưa có bought_at thì dùng updated_at).
+    Đọc và khóa các dòng thống kê liên quan bằng một truy vấn, ghi lại bằng bulk_update; item mua lần đầu
+    được tạo dòng trước bằng bulk_create.
+    """
+    items = sorted(
+        (item for item in items if item.normalized_item),
+        key=purchased_at
+    )
+    if not items:
+        return
+    family_by_list = dict(
+        ShoppingList.objects.filter(pk__in={item.shopping_list_id for item in items})
+        .values_list('id', 'family_id')
+    )
+    keyed = [
+        (family_by_list.get(item.shopping_list_id), item)
+        for item in items
+        if family_by_list.get(item.shopping_list_id)
+    ]
+    if not keyed:
+        return
+
+    def locked_stats():
+        return {
+            (stat.family_id, stat.normalized_item): stat
+            for stat in PurchaseStat.objects.select_for_update().filter(
+                family_id__in={family_id for family_id, _item in keyed},
+                normalized_item__in={item.normalized_item for _family_id, item in keyed},
+            )
+        }
+
+    with transaction.atomic():
+        stats = locked_stats()
+        missing = {
+            (family_id, item.normalized_item): item
+            for family_id, item in keyed
+            if (family_id, item.normalized_item) not in stats
+        }
+        if missing:
+            # Tạo trước dòng rỗng cho item mua lần đầu (bỏ qua dòng request khác vừa tạo), rồi khóa lại
+            # và cộng lần mua vào dòng đã có: hai request cùng mua lần đầu không làm mất lần mua nào
+            PurchaseStat.objects.bulk_create([
+                PurchaseStat(family_id=family_id, normalized_item=normalized_item, item=item.item)
+                for (family_id, normalized_item), item in missing.items()
+            ], ignore_conflicts=True)
+            stats = locked_stats()
+        for family_id, item in keyed:
+            _fold(stats[(family_id, item.normalized_item)], item, purchased_at(item))
+        PurchaseStat.objects.bulk_update(stats.values(), [
+            'item', 'category', 'unit', 'purchase_count', 'interval_count',
+            'avg_interval_days', 'avg_quantity', 'last_purchased_at', 'next_due_at',
+        ])
+
+
+def suggestions(family_ids, horizon_days=3, limit=50):
+    """
+    Item có next_due_at trong vòng horizon_days tới (hoặc đã quá hạn), sắp theo thời điểm đến hạn,
+    bỏ qua những item family đang có trong danh sách chưa mua.
+    """
+    until = timezone.now() + timedelta(days=horizon_days)
+    stats = list(
+        PurchaseStat.objects.filter(family_id__in=family_ids, next_due_at__lte=until)
+        .order_by('next_due_at')[:limit]
+    )
+    if not stats:
+        return stats
+    pending = set(
+        ShoppingListItem.objects.filter(
+            shopping_list__family_id__in=family_ids,
+            status='pending',
+            normalized_item__in={stat.normalized_item for stat in stats},
+        ).values_list('shopping_list__family_id', 'normalized_item')
+    )
+    return [stat for stat in stats if (stat.family_id, stat.normalized_item) not in pending]
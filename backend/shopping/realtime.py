@@ -0,0 +1,46 @@
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Các loại thay đổi được đẩy tới client
+ITEM_ADDED = 'add'
+ITEM_UPDATED = 'update'
+ITEM_STATUS_CHANGED = 'status'
+ITEM_DELETED = 'delete'
+
+
+def shopping_list_group(shopping_list_id):
+    return f'shopping_list_{shopping_list_id}'
+
+
+def _send(shopping_list_id, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(shopping_list_group(shopping_list_id), message)
+    except Exception:
+        # Client polling vẫn nhận được dữ liệu; không để lỗi channel layer làm hỏng request
+        logger.exception(f"Không gửi được thay đổi của danh sách {shopping_list_id}")
+
+
+def serialize_item(item):
+    from .serializers import ShoppingListItemSerializer
+    return dict(ShoppingListItemSerializer(item).data)
+
+
+def broadcast_item_diff(shopping_list_id, action, items):
+    """
+    Gửi thay đổi item tới mọi client đang mở danh sách, sau khi transaction hiện tại commit.
+    items là danh sách dict đã serialize (với delete chỉ cần {'id': ...}).
+    """
+    message = {
+        'type': 'item.diff',
+        'shopping_list': shopping_list_id,
+        'action': action,
+        'items': items,
+    }
+    transaction.on_commit(lambda: _send(shopping_list_id, message))
@@ -0,0 +1,7 @@
+from django.urls import path
+from .consumers import ShoppingListConsumer
+
+websocket_urlpatterns = [
+    # Ví dụ: ws://<host>/ws/shopping/shopping-lists/1/
+    path('ws/shopping/shopping-lists/<int:shopping_list_id>/', ShoppingListConsumer.as_asgi()),
+]
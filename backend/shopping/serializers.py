@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import ShoppingList, ShoppingListItem
+from .models import ShoppingList, ShoppingListItem, PurchaseStat
+from .items import add_items
 from users.serializers import FamilySerializer, CustomUserSerializer
 from users.models import Family
+from fridge.models import Food
 from django.utils.translation import gettext_lazy as _
 from users.serializers import CustomUserSerializer
 from django.contrib.auth import get_user_model
@@ -29,8 +31,10 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'family', 'family_id', 'name', 'created_by',
             'date', 'week', 'created_at', 'updated_at',
-            'shared_with', 'shared_with_ids'
+            'shared_with', 'shared_with_ids',
+            'item_count', 'pending_count', 'bought_count'
         ]
+        read_only_fields = ['item_count', 'pending_count', 'bought_count']
 
     def create(self, validated_data):
         shared_with_ids = validated_data.pop('shared_with_ids', [])
@@ -46,8 +50,17 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             instance.shared_with.set(shared_with_ids)
         return instance
 
+def get_expand(request):
+    """
+    Các quan hệ client yêu cầu lồng đầy đủ, ví dụ ?expand=shopping_list
+    """
+    if request is None:
+        return set()
+    return {name.strip() for name in request.query_params.get('expand', '').split(',') if name.strip()}
+
 class ShoppingListItemSerializer(serializers.ModelSerializer):
-    shopping_list = ShoppingListSerializer(read_only=True)
+    # Mặc định chỉ trả về ID của danh sách; dùng ?expand=shopping_list để lồng đầy đủ
+    shopping_list = serializers.PrimaryKeyRelatedField(read_only=True)
     shopping_list_id = serializers.PrimaryKeyRelatedField(
         queryset=ShoppingList.objects.all(), source='shopping_list', write_only=True
     )
@@ -55,6 +68,51 @@ class ShoppingListItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingListItem
         fields = (
-            'id', 'shopping_list', 'shopping_list_id', 'item', 'quantity',
-            'category', 'status', 'created_at', 'updated_at'
+            'id', 'shopping_list', 'shopping_list_id', 'item', 'quantity', 'unit',
+            'category', 'status', 'transferred_at', 'created_at', 'updated_at'
+        )
+        read_only_fields = ('transferred_at',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'shopping_list' in get_expand(self.context.get('request')):
+            self.fields['shopping_list'] = ShoppingListSerializer(read_only=True)
+
+    def create(self, validated_data):
+        # Gộp với item chưa mua trùng tên/danh mục/đơn vị nếu có
+        shopping_list = validated_data.pop('shopping_list')
+        created, merged = add_items(shopping_list, [validated_data])
+        return (created or merged)[0]
+
+class ShoppingListItemEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShoppingListItem
+        fields = ('item', 'quantity', 'unit', 'category', 'status')
+
+class ShoppingListItemBulkCreateSerializer(serializers.Serializer):
+    shopping_list_id = serializers.PrimaryKeyRelatedField(queryset=ShoppingList.objects.all())
+    items = ShoppingListItemEntrySerializer(many=True, allow_empty=False, max_length=500)
+
+class ShoppingListItemBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    status = serializers.ChoiceField(choices=ShoppingListItem.STATUS_CHOICES)
+
+class FridgeTransferSerializer(serializers.Serializer):
+    shopping_list_id = serializers.IntegerField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=500)
+    compartment = serializers.ChoiceField(choices=Food.COMPARTMENT_CHOICES, default='cooler')
+    location = serializers.CharField(max_length=50, default='Chưa sắp xếp')
+
+    def validate(self, attrs):
+        if not attrs.get('shopping_list_id') and not attrs.get('ids'):
+            raise serializers.ValidationError(_('Provide shopping_list_id or ids.'))
+        return attrs
+
+class PurchaseSuggestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurchaseStat
+        fields = (
+            'family', 'item', 'category', 'unit', 'avg_quantity', 'avg_interval_days',
+            'purchase_count', 'last_purchased_at', 'next_due_at'
         )
+        read_only_fields = fields
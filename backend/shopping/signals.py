@@ -0,0 +1,91 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from users.access import invalidate_user_access
+from .access import invalidate_shopping_cache, invalidate_shopping_list_access
+from .items import apply_counter_deltas, count_item, count_status, new_deltas
+from .models import ShoppingList, ShoppingListItem
+from .purchases import record_purchases
+from .realtime import (
+    broadcast_item_diff, serialize_item, ITEM_ADDED, ITEM_UPDATED, ITEM_STATUS_CHANGED, ITEM_DELETED
+)
+
+
+def invalidate_item_cache(instance, *shopping_list_ids):
+    # Danh sách thường đã được nạp cùng item (serializer kiểm tra khóa ngoại), khi đó không cần truy vấn family
+    if ShoppingListItem.shopping_list.is_cached(instance) and instance.shopping_list_id in shopping_list_ids:
+        others = [list_id for list_id in shopping_list_ids if list_id != instance.shopping_list_id]
+        invalidate_shopping_cache(others, family_ids=[instance.shopping_list.family_id])
+    else:
+        invalidate_shopping_cache(shopping_list_ids)
+
+
+@receiver(post_save, sender=ShoppingListItem)
+def item_saved(sender, instance, created, **kwargs):
+    deltas = new_deltas()
+    if created:
+        action = ITEM_ADDED
+        count_item(deltas, instance.shopping_list_id, instance.status)
+    elif instance.saved_shopping_list_id not in (None, instance.shopping_list_id):
+        # Item được chuyển sang danh sách khác
+        action = ITEM_UPDATED
+        count_item(deltas, instance.saved_shopping_list_id, instance.saved_status, -1)
+        count_item(deltas, instance.shopping_list_id, instance.status)
+        broadcast_item_diff(instance.saved_shopping_list_id, ITEM_DELETED, [{'id': instance.pk}])
+        invalidate_item_cache(instance, instance.saved_shopping_list_id)
+    elif instance.status_changed():
+        action = ITEM_STATUS_CHANGED
+        count_status(deltas, instance.shopping_list_id, instance.saved_status, -1)
+        count_status(deltas, instance.shopping_list_id, instance.status)
+    else:
+        action = ITEM_UPDATED
+    apply_counter_deltas(deltas)
+    if instance.status == 'bought' and (created or instance.saved_status != 'bought'):
+        record_purchases([instance])
+    broadcast_item_diff(instance.shopping_list_id, action, [serialize_item(instance)])
+    invalidate_item_cache(instance, instance.shopping_list_id)
+    instance.remember_saved_state()
+
+
+@receiver(post_delete, sender=ShoppingListItem)
+def item_deleted(sender, instance, **kwargs):
+    shopping_list_id = instance.saved_shopping_list_id or instance.shopping_list_id
+    deltas = new_deltas()
+    count_item(deltas, shopping_list_id, instance.saved_status or instance.status, -1)
+    apply_counter_deltas(deltas)
+    broadcast_item_diff(shopping_list_id, ITEM_DELETED, [{'id': instance.pk}])
+    invalidate_item_cache(instance, shopping_list_id)
+
+
+@receiver(post_save, sender=ShoppingList)
+def shopping_list_saved(sender, instance, created, **kwargs):
+    saved_family_id = getattr(instance, '_saved_family_id', None)
+    if created or saved_family_id != instance.family_id:
+        invalidate_shopping_list_access(instance, family_ids=[saved_family_id])
+    # Tên, family và bộ đếm của danh sách nằm trong response đã cache của family cũ và mới
+    invalidate_shopping_cache(family_ids=[instance.family_id] if created else [instance.family_id, saved_family_id])
+    instance._saved_family_id = instance.family_id
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def shopping_list_deleting(sender, instance, **kwargs):
+    invalidate_shopping_list_access(instance)
+    invalidate_shopping_cache(family_ids=[instance.family_id])
+
+
+@receiver(m2m_changed, sender=ShoppingList.shared_with.through)
+def shared_with_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Sau khi clear không còn biết ai từng được chia sẻ
+        if reverse:
+            invalidate_user_access([instance.pk])
+            invalidate_shopping_cache(ShoppingList.objects.filter(shared_with=instance).values_list('id', flat=True))
+        else:
+            invalidate_user_access(instance.shared_with.values_list('id', flat=True))
+            invalidate_shopping_cache(family_ids=[instance.family_id])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_user_access([instance.pk] if reverse else pk_set)
+        # shared_with nằm trong dữ liệu của danh sách
+        if reverse:
+            invalidate_shopping_cache(pk_set)
+        else:
+            invalidate_shopping_cache(family_ids=[instance.family_id])
\ No newline at end of file
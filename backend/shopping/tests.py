@@ -1,3 +1,176 @@
+from datetime import timedelta
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.testing import QueryBudgetMixin
+from users.models import User, Family, FamilyMember
+from .models import ShoppingList, ShoppingListItem, PurchaseStat
 
-# Create your tests here.
+
+class ShoppingQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='x', full_name='Member')
+        cls.family = Family.objects.create(name='Gia đình', created_by=cls.user)
+        FamilyMember.objects.create(family=cls.family, user=cls.user, related_to=cls.member, relationship='vợ')
+        cls.lists = [
+            ShoppingList.objects.create(family=cls.family, created_by=cls.user, name=f'Danh sách {i}')
+            for i in range(3)
+        ]
+        for shopping_list in cls.lists:
+            shopping_list.shared_with.add(cls.member)
+
+    def setUp(self):
+        self.client = self.query_client(self.user)
+
+    def add_items(self, count):
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                shopping_list=self.lists[i % len(self.lists)],
+                item=f'Món {i}',
+                normalized_item=f'món {i}',
+                quantity=1,
+                category='Rau củ',
+            )
+            for i in range(count)
+        ])
+
+    def add_lists(self, count):
+        lists = ShoppingList.objects.bulk_create([
+            ShoppingList(family=self.family, created_by=self.user, name=f'Danh sách thêm {i}', counters_ready=True)
+            for i in range(count)
+        ])
+        ShoppingList.shared_with.through.objects.bulk_create([
+            ShoppingList.shared_with.through(shoppinglist_id=shopping_list.pk, user_id=self.member.pk)
+            for shopping_list in lists
+        ])
+
+    def add_stats(self, count):
+        offset = PurchaseStat.objects.count()
+        now = timezone.now()
+        PurchaseStat.objects.bulk_create([
+            PurchaseStat(
+                family=self.family,
+                normalized_item=f'món {offset + i}',
+                item=f'Món {offset + i}',
+                purchase_count=2,
+                interval_count=1,
+                avg_interval_days=7,
+                last_purchased_at=now - timedelta(days=7),
+                next_due_at=now + timedelta(hours=i % 48),
+            )
+            for i in range(count)
+        ])
+
+    def test_shopping_list_list(self):
+        self.assertQueryBudget(self.client, reverse('shoppinglist-list'), 5, self.add_lists)
+
+    def test_shopping_list_item_list(self):
+        self.assertQueryBudget(self.client, reverse('shoppinglistitem-list'), 4, self.add_items)
+
+    def test_shopping_list_item_list_expanded(self):
+        self.assertQueryBudget(
+            self.client, reverse('shoppinglistitem-list'), 5, self.add_items,
+            data={'expand': 'shopping_list'}
+        )
+
+    def test_suggestions(self):
+        self.add_items(10)
+        self.assertQueryBudget(self.client, reverse('shoppinglist-suggestions'), 3, self.add_stats)
+
+
+class LegacyCounterTests(TestCase):
+    """
+    Danh sách có từ trước khi có bộ đếm (counters_ready=False, bộ đếm 0) không được
+    trừ bộ đếm xuống âm mà phải được đếm lại từ item.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='legacy', email='legacy@example.com', password='x', full_name='Legacy')
+        self.family = Family.objects.create(name='Gia đình cũ', created_by=self.user)
+        relative = User.objects.create_user(username='legacy2', email='legacy2@example.com', password='x', full_name='Legacy 2')
+        FamilyMember.objects.create(family=self.family, user=self.user, related_to=relative, relationship='mẹ')
+        [self.shopping_list] = ShoppingList.objects.bulk_create([
+            ShoppingList(family=self.family, created_by=self.user, name='Danh sách cũ')
+        ])
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(shopping_list=self.shopping_list, item=f'Món {i}', quantity=1, status=status)
+            for i, status in enumerate(['pending', 'pending', 'bought'])
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertCounters(self, item_count, pending_count, bought_count):
+        self.shopping_list.refresh_from_db()
+        self.assertTrue(self.shopping_list.counters_ready)
+        self.assertEqual(
+            (self.shopping_list.item_count, self.shopping_list.pending_count, self.shopping_list.bought_count),
+            (item_count, pending_count, bought_count)
+        )
+
+    def test_delete_item(self):
+        item = ShoppingListItem.objects.filter(status='pending').first()
+        response = self.client.delete(reverse('shoppinglistitem-detail', args=[item.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertCounters(2, 1, 1)
+
+    def test_status_change(self):
+        item = ShoppingListItem.objects.filter(status='bought').first()
+        response = self.client.patch(reverse('shoppinglistitem-detail', args=[item.pk]), {'status': 'pending'})
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(3, 3, 0)
+
+    def test_list_recounts(self):
+        response = self.client.get(reverse('shoppinglist-list'))
+        self.assertEqual(response.status_code, 200)
+        row = response.json()[0] if isinstance(response.json(), list) else response.json()['results'][0]
+        self.assertEqual((row['item_count'], row['pending_count'], row['bought_count']), (3, 2, 1))
+        self.assertCounters(3, 2, 1)
+
+
+class ShoppingAccessTests(TestCase):
+    """
+    Dữ liệu mua sắm của family chỉ mở cho FamilyMember.user; người tạo và related_to chỉ thấy
+    family. Danh sách được chia sẻ hiện trong danh sách nhưng không mở item.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(username='creator', email='creator@example.com', password='x', full_name='Creator')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x', full_name='Member')
+        self.relative = User.objects.create_user(username='relative', email='relative@example.com', password='x', full_name='Relative')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com', password='x', full_name='Guest')
+        self.family = Family.objects.create(name='Gia đình quyền', created_by=self.creator)
+        FamilyMember.objects.create(family=self.family, user=self.member, related_to=self.relative, relationship='bố')
+        self.shopping_list = ShoppingList.objects.create(family=self.family, created_by=self.creator, name='Chợ')
+        self.shopping_list.shared_with.add(self.guest)
+        ShoppingListItem.objects.create(shopping_list=self.shopping_list, item='Rau', quantity=1)
+
+    def visible(self, user, name):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        data = client.get(reverse(name)).json()
+        return len(data if isinstance(data, list) else data['results'])
+
+    def test_shopping_visibility(self):
+        expected = {
+            self.member: (1, 1),
+            self.guest: (1, 0),
+            self.creator: (0, 0),
+            self.relative: (0, 0),
+        }
+        for user, counts in expected.items():
+            self.assertEqual(
+                (self.visible(user, 'shoppinglist-list'), self.visible(user, 'shoppinglistitem-list')),
+                counts, user.username
+            )
+
+    def test_related_to_becomes_member(self):
+        self.assertEqual(self.visible(self.relative, 'shoppinglist-list'), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            FamilyMember.objects.create(family=self.family, user=self.relative, related_to=self.member, relationship='con')
+        self.assertEqual(self.visible(self.relative, 'shoppinglist-list'), 1)
@@ -1,7 +1,40 @@
-from rest_framework import viewsets, filters
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.translation import gettext_lazy as _
+from rest_framework import viewsets, filters, serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from .models import ShoppingList, ShoppingListItem
-from .serializers import ShoppingListSerializer, ShoppingListItemSerializer
+from backend.caching import cached_view
+from users.access import member_family_ids
+from .access import (
+    accessible_item_list_ids, accessible_shopping_list_ids, accessible_shopping_family_ids, invalidate_shopping_cache
+)
+from .purchases import record_purchases, suggestions
+from .items import add_items, apply_counter_deltas, count_status, ensure_counted, new_deltas, transfer_to_fridge
+from .realtime import broadcast_item_diff, ITEM_STATUS_CHANGED
+from .serializers import (
+    ShoppingListSerializer, ShoppingListItemSerializer, get_expand,
+    ShoppingListItemBulkCreateSerializer, ShoppingListItemBulkStatusSerializer, FridgeTransferSerializer,
+    PurchaseSuggestionSerializer
+)
+from fridge.serializers import FoodSerializer
+
+# Response danh sách/item phụ thuộc vào tập danh sách user được truy cập và phiên bản 'shopping' của các family chứa chúng
+cached_shopping_list = method_decorator(cached_view(
+    'shopping',
+    families=lambda request: accessible_shopping_family_ids(request.user),
+    vary=lambda request: sorted(accessible_shopping_list_ids(request.user)),
+))
+cached_item_list = method_decorator(cached_view(
+    'shopping',
+    families=lambda request: accessible_shopping_family_ids(request.user),
+    vary=lambda request: sorted(accessible_item_list_ids(request.user)),
+))
 
 class ShoppingListViewSet(viewsets.ModelViewSet):
     queryset = ShoppingList.objects.all()
@@ -14,14 +47,50 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
-        # Trả về danh sách của family hoặc được chia sẻ với user
+        # Trả về danh sách của family hoặc được chia sẻ với user (tập quyền đã vật chất hóa, xem shopping.access)
         return queryset.filter(
-            models.Q(family__members__user=user) | models.Q(shared_with=user)
-        ).distinct()
+            pk__in=accessible_shopping_list_ids(user)
+        ).select_related(
+            'family__created_by', 'created_by'
+        ).prefetch_related('shared_with')
+
+    @cached_shopping_list
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        if args and args[0] is not None:
+            # Danh sách có từ trước khi có bộ đếm được đếm lại một lần trước khi trả về
+            ensure_counted(args[0] if kwargs.get('many') else [args[0]])
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    @method_decorator(cached_view(
+        'shopping',
+        families=lambda request: member_family_ids(request.user),
+        vary=lambda request: sorted(member_family_ids(request.user)),
+    ))
+    def suggestions(self, request):
+        """
+        Gợi ý item sắp cần mua lại, đọc từ thống kê mua đã tổng hợp sẵn (PurchaseStat).
+        Query: ?family_id=1&days=3 (mặc định: mọi family của user, trong 3 ngày tới)
+        """
+        family_ids = member_family_ids(request.user)
+        family_id = request.query_params.get('family_id')
+        if family_id:
+            if not family_id.isdigit() or int(family_id) not in family_ids:
+                raise PermissionDenied(_('You do not have access to this family.'))
+            family_ids = [int(family_id)]
+        try:
+            horizon_days = int(request.query_params.get('days', 3))
+        except ValueError:
+            raise ValidationError({'days': _('Must be an integer.')})
+        serializer = PurchaseSuggestionSerializer(suggestions(family_ids, horizon_days), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 class ShoppingListItemViewSet(viewsets.ModelViewSet):
     queryset = ShoppingListItem.objects.all()
     serializer_class = ShoppingListItemSerializer
@@ -33,5 +102,107 @@ class ShoppingListItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
-        # Chỉ trả về item thuộc family của user
-        return queryset.filter(shopping_list__family__members__user=user).distinct()
+        # Chỉ trả về item thuộc danh sách của các family mà user là thành viên (xem shopping.access)
+        queryset = queryset.filter(shopping_list_id__in=accessible_item_list_ids(user))
+        if 'shopping_list' in get_expand(self.request):
+            # Lồng danh sách đầy đủ: lấy trước family, người tạo và shared_with trong một lượt
+            queryset = queryset.select_related(
+                'shopping_list__family__created_by', 'shopping_list__created_by'
+            ).prefetch_related('shopping_list__shared_with')
+        return queryset
+
+    @cached_item_list
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Đổi trạng thái nhiều item cùng lúc bằng một câu UPDATE.
+        Payload: {"ids": [1, 2, 3], "status": "bought"}
+        """
+        serializer = ShoppingListItemBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        new_status = serializer.validated_data['status']
+        # update() bỏ qua auto_now nên gán updated_at thủ công, mọi dòng dùng chung một giá trị
+        updated_at = timezone.now()
+        with transaction.atomic():
+            rows = list(self.get_queryset().filter(pk__in=ids).values_list('id', 'shopping_list_id', 'status'))
+            allowed_ids = [item_id for item_id, _list_id, _status in rows]
+            # bought_at chỉ đổi ở những item thật sự chuyển trạng thái (vế phải của SET đọc giá trị cũ)
+            bought_at = None
+            if new_status == 'bought':
+                bought_at = Case(When(status='bought', then=F('bought_at')), default=Value(updated_at))
+            ShoppingListItem.objects.filter(pk__in=allowed_ids).update(
+                status=new_status, updated_at=updated_at, bought_at=bought_at
+            )
+            # update() không phát signal: tự cập nhật bộ đếm và gửi thay đổi cho từng danh sách
+            deltas = new_deltas()
+            by_list = {}
+            updated_at_repr = serializers.DateTimeField().to_representation(updated_at)
+            for item_id, shopping_list_id, old_status in rows:
+                if old_status != new_status:
+                    count_status(deltas, shopping_list_id, old_status, -1)
+                    count_status(deltas, shopping_list_id, new_status)
+                by_list.setdefault(shopping_list_id, []).append(
+                    {'id': item_id, 'status': new_status, 'updated_at': updated_at_repr}
+                )
+            apply_counter_deltas(deltas)
+            invalidate_shopping_cache(by_list)
+            if new_status == 'bought':
+                record_purchases(ShoppingListItem.objects.filter(
+                    pk__in=[item_id for item_id, _list_id, old_status in rows if old_status != 'bought']
+                ))
+            for shopping_list_id, changed in by_list.items():
+                broadcast_item_diff(shopping_list_id, ITEM_STATUS_CHANGED, changed)
+        return Response({
+            'updated': [
+                {'id': item_id, 'status': new_status, 'updated_at': updated_at}
+                for item_id in allowed_ids
+            ],
+            'not_found': sorted(set(ids) - set(allowed_ids)),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-add')
+    def bulk_add(self, request):
+        """
+        Thêm nhiều item vào một danh sách bằng một lần bulk_create; item trùng với item chưa mua
+        đã có được cộng dồn số lượng (xem shopping.items.add_items).
+        Payload: {"shopping_list_id": 1, "items": [{"item": "Sữa", "quantity": 2, "category": "Đồ uống"}]}
+        """
+        serializer = ShoppingListItemBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        shopping_list = serializer.validated_data['shopping_list_id']
+        if shopping_list.pk not in accessible_shopping_list_ids(request.user):
+            raise PermissionDenied(_('You do not have access to this shopping list.'))
+        created, merged = add_items(shopping_list, serializer.validated_data['items'])
+        context = self.get_serializer_context()
+        return Response({
+            'created': ShoppingListItemSerializer(created, many=True, context=context).data,
+            'merged': ShoppingListItemSerializer(merged, many=True, context=context).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='transfer-to-fridge')
+    def transfer_to_fridge(self, request):
+        """
+        Đưa các item đã mua vào tủ lạnh (fridge.Food) trong một lần.
+        Payload: {"shopping_list_id": 1} hoặc {"ids": [1, 2]}, tùy chọn "compartment", "location".
+        Item đã chuyển trước đó được bỏ qua nên gọi lại nhiều lần vẫn an toàn.
+        """
+        serializer = FridgeTransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        items = self.get_queryset()
+        if data.get('shopping_list_id'):
+            items = items.filter(shopping_list_id=data['shopping_list_id'])
+        if data.get('ids'):
+            items = items.filter(pk__in=data['ids'])
+        foods, transferred_ids, skipped = transfer_to_fridge(
+            items, compartment=data['compartment'], location=data['location']
+        )
+        return Response({
+            'transferred': transferred_ids,
+            'skipped': skipped,
+            'foods': FoodSerializer(foods, many=True).data,
+        }, status=status.HTTP_201_CREATED if foods else status.HTTP_200_OK)
\ No newline at end of file
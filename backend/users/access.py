@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from backend.caching import shared_cache_enabled
+from .models import Family, FamilyMember, FamilyAccess
+from .realtime import notify_access_changed
+
+# Thời gian giữ tập quyền truy cập của một user trong cache (giây)
+ACCESS_CACHE_TIMEOUT = getattr(settings, 'ACCESS_CACHE_TIMEOUT', 300)
+
+# Các loại tập quyền được cache theo user (shopping_lists, shopping_item_lists, shopping_families
+# do shopping.access tính)
+ACCESS_KINDS = ['families', 'member_families', 'shopping_lists', 'shopping_item_lists', 'shopping_families']
+
+
+def access_cache_key(kind, user_id):
+    return f'access:{kind}:{user_id}'
+
+
+def invalidate_user_access(user_ids):
+    """
+    Xóa tập quyền đã cache của các user, sau khi transaction hiện tại commit, rồi báo cho
+    các kết nối WebSocket của họ kiểm tra lại quyền.
+    """
+    user_ids = set(user_ids)
+    keys = [access_cache_key(kind, user_id) for user_id in user_ids for kind in ACCESS_KINDS]
+    if keys:
+        def invalidate():
+            cache.delete_many(keys)
+            notify_access_changed(user_ids)
+        transaction.on_commit(invalidate)
+
+
+def cached_ids(kind, user_id, compute):
+    """
+    Tập quyền của user, cache khi cache mặc định dùng chung giữa các process. Với cache riêng
+    từng process, lần xóa ở invalidate_user_access không tới được worker khác, nên luôn tính lại.
+    """
+    if not shared_cache_enabled():
+        return list(compute())
+    key = access_cache_key(kind, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(compute())
+        cache.set(key, ids, ACCESS_CACHE_TIMEOUT)
+    return ids
+
+
+def accessible_family_ids(user):
+    """
+    ID các family user được truy cập, đọc từ FamilyAccess (một truy vấn theo index) và cache.
+    """
+    return cached_ids(
+        'families', user.pk,
+        lambda: FamilyAccess.objects.filter(user_id=user.pk).values_list('family_id', flat=True)
+    )
+
+
+def member_family_ids(user):
+    """
+    ID các family mà user là FamilyMember.user, có cache. Dữ liệu mua sắm của family (danh sách,
+    item, gợi ý, thống kê mua) chỉ mở cho các family này, giống điều kiện family__members__user
+    trước đây; người tạo hoặc related_to chỉ thấy bản thân family (accessible_family_ids).
+    """
+    return cached_ids(
+        'member_families', user.pk,
+        lambda: FamilyMember.objects.filter(user_id=user.pk).values_list('family_id', flat=True).distinct()
+    )
+
+
+def family_user_ids(family_id):
+    return set(FamilyAccess.objects.filter(family_id=family_id).values_list('user_id', flat=True))
+
+
+def compute_family_user_ids(family_id):
+    """
+    Tập user được truy cập family, tính từ dữ liệu gốc (người tạo + hai đầu FamilyMember).
+    """
+    user_ids = set()
+    created_by_id = Family.objects.filter(pk=family_id).values_list('created_by_id', flat=True).first()
+    if created_by_id:
+        user_ids.add(created_by_id)
+    for user_id, related_to_id in FamilyMember.objects.filter(family_id=family_id).values_list('user_id', 'related_to_id'):
+        user_ids.add(user_id)
+        if related_to_id:
+            user_ids.add(related_to_id)
+    return user_ids
+
+
+def rebuild_family_access(family_id):
+    """
+    Đồng bộ FamilyAccess của một family với dữ liệu gốc, chỉ ghi phần chênh lệch,
+    rồi xóa cache của những user bị ảnh hưởng.
+    """
+    if family_id is None:
+        return
+    with transaction.atomic():
+        current = family_user_ids(family_id)
+        wanted = compute_family_user_ids(family_id)
+        removed = current - wanted
+        added = wanted - current
+        if removed:
+            FamilyAccess.objects.filter(family_id=family_id, user_id__in=removed).delete()
+        if added:
+            FamilyAccess.objects.bulk_create(
+                [FamilyAccess(family_id=family_id, user_id=user_id) for user_id in added],
+                ignore_conflicts=True
+            )
+    # User vẫn còn trong family nhưng có thể vừa thành (hoặc thôi là) FamilyMember.user,
+    # nên xóa cache của mọi user liên quan chứ không chỉ phần chênh lệch
+    invalidate_user_access(current | wanted)
+    return added, removed
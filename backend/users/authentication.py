@@ -1,10 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework.exceptions import AuthenticationFailed
+from django.utils.translation import gettext_lazy as _
+from backend.caching import shared_cache_enabled
 
-class CookieJWTAuthentication(JWTAuthentication):
+# Thời gian giữ user đã xác thực trong cache (giây)
+AUTH_USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+TOKEN_VERSION_CLAIM = 'token_version'
+# Các cột của user được giữ trong cache (không có mật khẩu); cột khác được đọc lại khi cần
+AUTH_USER_FIELDS = (
+    'id', 'username', 'full_name', 'email', 'is_active', 'is_staff', 'is_superuser', 'is_admin', 'token_version',
+)
+
+
+def user_cache_key(user_id, token_version):
+    return f'auth:user:{user_id}:{token_version}'
+
+
+def invalidate_cached_user(user_id, token_version):
+    cache.delete(user_cache_key(user_id, token_version))
+
+
+def token_user_fields(user_id, token_version):
+    """
+    AUTH_USER_FIELDS của user nếu token mang token_version hiện tại của user và tài khoản đang
+    hoạt động, ngược lại None. Dùng chung cache với CachedJWTAuthentication: đổi mật khẩu,
+    khóa tài khoản hay đăng xuất mọi thiết bị đều tăng token_version nên key cũ không còn được đọc.
+    """
+    shared = shared_cache_enabled()
+    key = user_cache_key(user_id, token_version)
+    fields = cache.get(key) if shared else None
+    if fields is None:
+        user_model = get_user_model()
+        fields = user_model.objects.filter(pk=user_id, is_active=True).values(*AUTH_USER_FIELDS).first()
+        if fields is None or fields['token_version'] != token_version:
+            return None
+        if shared:
+            cache.set(key, fields, AUTH_USER_CACHE_TIMEOUT)
+    return fields if fields['is_active'] else None
+
+
+def add_token_version(token, user):
+    # Access token sinh từ refresh token sẽ mang theo claim này
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Giống JWTAuthentication nhưng lấy user từ cache theo (user id, token_version),
+    nên ở trạng thái ổn định việc xác thực không cần truy vấn database. Cache chỉ giữ AUTH_USER_FIELDS;
+    user lấy từ cache có các cột còn lại ở dạng deferred. Với cache riêng từng process
+    (xem backend.caching.shared_cache_enabled), user luôn được đọc từ database để lần khóa
+    tài khoản ở worker khác có hiệu lực ngay.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+        token_version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        shared = shared_cache_enabled()
+        key = user_cache_key(user_id, token_version)
+        fields = cache.get(key) if shared else None
+        if fields is not None:
+            return self.user_model.from_db(None, AUTH_USER_FIELDS, [fields[name] for name in AUTH_USER_FIELDS])
+        user = super().get_user(validated_token)
+        if user.token_version != token_version:
+            raise AuthenticationFailed(_('Token has been revoked.'), code='token_revoked')
+        if shared:
+            cache.set(key, {name: getattr(user, name) for name in AUTH_USER_FIELDS}, AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+
+class CookieJWTAuthentication(CachedJWTAuthentication):
     def authenticate(self, request):
         token = request.COOKIES.get('access_token')
-        print(f"Token from cookies: {token}")  # Debugging line to check the token value
         if not token:
             return None
         try:
@@ -16,4 +91,3 @@ class CookieJWTAuthentication(JWTAuthentication):
             return user, validated_token
         except AuthenticationFailed as e:
             raise AuthenticationFailed(f"User not found: {str(e)}")
-        
\ No newline at end of file
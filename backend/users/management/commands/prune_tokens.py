@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+
+class Command(BaseCommand):
+    help = "Xóa theo lô các token đã hết hạn khỏi bảng outstanding/blacklisted token."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            batch = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            # BlacklistedToken bị xóa theo cascade
+            OutstandingToken.objects.filter(pk__in=batch).delete()
+            total += len(batch)
+            self.stdout.write(f"  đã xóa {total} token hết hạn")
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa {total} token hết hạn."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from users.access import rebuild_family_access
+from users.models import Family
+
+
+class Command(BaseCommand):
+    help = "Dựng lại bảng quyền truy cập user -> family (FamilyAccess) từ dữ liệu thành viên."
+
+    def handle(self, *args, **options):
+        added = removed = 0
+        for family_id in Family.objects.values_list('id', flat=True).iterator():
+            family_added, family_removed = rebuild_family_access(family_id)
+            added += len(family_added)
+            removed += len(family_removed)
+        self.stdout.write(self.style.SUCCESS(f"Đã thêm {added}, xóa {removed} quyền truy cập family."))
@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from backend.caching import shared_cache_enabled
+from .access import rebuild_family_access
+from .models import User, FamilyMember, FamilyAccess
+
+# Quan hệ mặc định của chiều ngược lại (người được mời -> người mời)
+DEFAULT_REVERSE_RELATIONSHIP = "người quen"
+
+
+def invite_members(family, inviter, entries):
+    """
+    Mời nhiều người vào family trong một transaction:
+    - một truy vấn tìm tất cả user theo email,
+    - một truy vấn lấy các quan hệ đã có giữa người mời và họ,
+    - một bulk_create cho cả hai chiều của mọi quan hệ mới.
+    Email không tồn tại làm cả lô bị từ chối; quan hệ đã có được bỏ qua; quan hệ vừa được
+    một lần mời chạy đồng thời tạo làm cả lô bị từ chối (ValidationError, không phải lỗi 500).
+    Trả về (created, skipped): FamilyMember chiều người mời -> người được mời vừa tạo,
+    và danh sách email đã là thành viên.
+    """
+    emails = {}
+    relationships = {}
+    for entry in entries:
+        email = entry['email'].strip()
+        # Khóa theo chữ thường để khớp cả khi collation của database không phân biệt hoa thường
+        if email.lower() not in relationships:
+            emails[email.lower()] = email
+            relationships[email.lower()] = entry.get('relationship', '')
+
+    users = {
+        user.email.lower(): user
+        for user in User.objects.filter(email__in=list(emails.values())).only('id', 'email', 'username', 'full_name')
+    }
+    missing = sorted(emails[key] for key in set(relationships) - set(users))
+    if missing:
+        raise ValidationError({'email': [_('User with this email does not exist: %(email)s') % {'email': email} for email in missing]})
+    if inviter.email.lower() in users:
+        raise ValidationError({'email': _('You cannot invite yourself.')})
+
+    invitee_ids = [user.pk for user in users.values()]
+    try:
+        with transaction.atomic():
+            existing = set(
+                FamilyMember.objects.filter(family=family)
+                .filter(Q(user=inviter, related_to_id__in=invitee_ids) | Q(user_id__in=invitee_ids, related_to=inviter))
+                .values_list('user_id', 'related_to_id')
+            )
+            members = []
+            created = []
+            skipped = []
+            for key, user in users.items():
+                if (inviter.pk, user.pk) in existing:
+                    skipped.append(user.email)
+                    continue
+                member = FamilyMember(family=family, user=inviter, related_to=user, relationship=relationships[key])
+                members.append(member)
+                created.append(member)
+                if (user.pk, inviter.pk) not in existing:
+                    members.append(FamilyMember(
+                        family=family, user=user, related_to=inviter, relationship=DEFAULT_REVERSE_RELATIONSHIP
+                    ))
+            if members:
+                FamilyMember.objects.bulk_create(members)
+                # bulk_create không phát post_save, dựng lại FamilyAccess một lần cho cả lô
+                rebuild_family_access(family.pk)
+                invalidate_family_graph(family.pk)
+    except IntegrityError:
+        # Một lần mời khác chạy đồng thời vừa tạo cùng quan hệ sau bước kiểm tra quan hệ đã có
+        raise ValidationError({'email': _('Some of these users were just added to this family, please try again.')})
+    return created, skipped
+
+
+
+# Thời gian giữ đồ thị quan hệ của một family trong cache (giây)
+FAMILY_GRAPH_CACHE_TIMEOUT = getattr(settings, 'FAMILY_GRAPH_CACHE_TIMEOUT', 600)
+
+# Các cột của user đưa vào node của đồ thị
+GRAPH_USER_FIELDS = ('id', 'username', 'full_name', 'email')
+
+
+def family_graph_cache_key(family_id):
+    return f'family_graph:{family_id}'
+
+
+def invalidate_family_graph(family_id):
+    """
+    Xóa đồ thị đã cache của family sau khi transaction hiện tại commit.
+    """
+    if family_id is not None:
+        transaction.on_commit(lambda: cache.delete(family_graph_cache_key(family_id)))
+
+
+def invalidate_user_family_graphs(user_id):
+    """
+    Xóa đồ thị đã cache của mọi family có user (node của user chứa username, full_name, email),
+    sau khi transaction hiện tại commit. Không làm gì khi đồ thị không được cache.
+    """
+    if not shared_cache_enabled():
+        return
+    keys = [
+        family_graph_cache_key(family_id)
+        for family_id in FamilyAccess.objects.filter(user_id=user_id).values_list('family_id', flat=True)
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def build_family_graph(family):
+    """
+    Đồ thị quan hệ của family dạng danh sách kề gọn: nodes là user (người tạo và hai đầu
+    của mọi FamilyMember), edges là các quan hệ có hướng. Đọc bằng một truy vấn select_related.
+    """
+    nodes = {}
+
+    def add_node(user):
+        if user is not None and user.pk not in nodes:
+            nodes[user.pk] = {
+                'id': user.pk,
+                'username': user.username,
+                'full_name': user.full_name,
+                'email': user.email,
+            }
+
+    add_node(family.created_by)
+    edges = []
+    members = (
+        FamilyMember.objects.filter(family_id=family.pk)
+        .select_related('user', 'related_to')
+        .only(*[f'{side}__{field}' for side in ('user', 'related_to') for field in GRAPH_USER_FIELDS],
+              'relationship', 'family_id')
+        .order_by('id')
+    )
+    for member in members:
+        add_node(member.user)
+        add_node(member.related_to)
+        edges.append({
+            'id': member.pk,
+            'source': member.user_id,
+            'target': member.related_to_id,
+            'relationship': member.relationship,
+        })
+    return {
+        'family': {'id': family.pk, 'name': family.name, 'created_by': family.created_by_id},
+        'nodes': list(nodes.values()),
+        'edges': edges,
+    }
+
+
+def family_graph(family):
+    # Với cache riêng từng process, lần xóa khi thành viên thay đổi không tới được worker khác
+    if not shared_cache_enabled():
+        return build_family_graph(family)
+    key = family_graph_cache_key(family.pk)
+    graph = cache.get(key)
+    if graph is None:
+        graph = build_family_graph(family)
+        cache.set(key, graph, FAMILY_GRAPH_CACHE_TIMEOUT)
+    return graph
@@ -49,8 +49,14 @@ class User(AbstractUser):
         default=False,
         help_text=_('Designates whether the user has admin privileges.')
     )
+    token_version = models.PositiveIntegerField(
+        _('token version'),
+        default=0,
+        help_text=_('Embedded in issued JWTs; bumping it revokes every token issued before.')
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         help_text=_('Timestamp when the user was created.')
     )
     updated_at = models.DateTimeField(
@@ -62,6 +68,47 @@ class User(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    def revoke_tokens(self):
+        # Đăng xuất khỏi mọi thiết bị: mọi token đã cấp mang token_version cũ
+        self._revoking_tokens = True
+        self.save(update_fields=['token_version'])
+
+    def change_password(self, raw_password):
+        # Đổi mật khẩu theo yêu cầu của người dùng hoặc quản trị viên, thu hồi mọi token đã cấp.
+        # Không dựa vào set_password: check_password cũng gọi set_password khi nâng cấp hash
+        # lúc đăng nhập, việc đó không được đăng xuất các thiết bị khác
+        self.set_password(raw_password)
+        self._revoking_tokens = True
+        self.save(update_fields=['password'])
+
+    def revokes_tokens(self):
+        # change_password(), revoke_tokens() hoặc khóa tài khoản thu hồi mọi token đã cấp
+        if self._state.adding:
+            return False
+        return (
+            getattr(self, '_revoking_tokens', False)
+            or (getattr(self, '_saved_is_active', None) and not self.is_active)
+        )
+
+    def save(self, *args, **kwargs):
+        self._revoked_token_version = None
+        if self.revokes_tokens():
+            # Bỏ cache xác thực của phiên bản cũ sau khi lưu (xem users.signals)
+            self._revoked_token_version = self.token_version
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._revoking_tokens = False
+        self._saved_is_active = self.is_active
+
     def __str__(self):
         return self.username
 
@@ -130,4 +177,30 @@ class FamilyMember(models.Model):
         unique_together = ('family', 'user', 'related_to')  # Mỗi cặp user và related_to chỉ xuất hiện một lần trong một Family
 
     def __str__(self):
-        return f"{self.user.full_name} calls {self.related_to.full_name} ({self.relationship}) in {self.family.name}"
\ No newline at end of file
+        return f"{self.user.full_name} calls {self.related_to.full_name} ({self.relationship}) in {self.family.name}"
+
+class FamilyAccess(models.Model):
+    """
+    Bảng vật chất hóa user -> family mà user được truy cập (người tạo, user hoặc related_to
+    trong FamilyMember), được cập nhật khi thành viên thay đổi (xem users.access).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='family_access',
+        help_text=_('User who can access the family.')
+    )
+    family = models.ForeignKey(
+        Family,
+        on_delete=models.CASCADE,
+        related_name='access',
+        help_text=_('Family the user can access.')
+    )
+
+    class Meta:
+        verbose_name = _('family access')
+        verbose_name_plural = _('family access')
+        unique_together = ('user', 'family')
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.family_id}"
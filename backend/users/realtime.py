@@ -0,0 +1,26 @@
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+
+def user_access_group(user_id):
+    # Mọi kết nối WebSocket của một user, nhận thông báo khi quyền truy cập của user thay đổi
+    return f'user_access_{user_id}'
+
+
+def notify_access_changed(user_ids):
+    """
+    Báo cho các kết nối WebSocket của user rằng quyền truy cập vừa thay đổi, để chúng kiểm tra lại
+    (xem shopping.consumers). Gọi sau khi cache quyền đã bị xóa.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for user_id in user_ids:
+        try:
+            async_to_sync(channel_layer.group_send)(user_access_group(user_id), {'type': 'access.changed'})
+        except Exception:
+            # Kết nối sẽ được kiểm tra lại ở lần thay đổi sau; không để lỗi channel layer làm hỏng request
+            logger.exception(f"Không gửi được thông báo đổi quyền cho user {user_id}")
@@ -2,7 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import PrecheckedRefreshToken
 from .models import Family, FamilyMember
+from .authentication import add_token_version, invalidate_cached_user, TOKEN_VERSION_CLAIM
 
 User = get_user_model()
 
@@ -124,6 +126,14 @@ class FamilyMemberSerializer(serializers.ModelSerializer):
             relationship=relationship
         )
 
+class FamilyInviteEntrySerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    relationship = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+
+class FamilyMemberBulkInviteSerializer(serializers.Serializer):
+    familyId = serializers.PrimaryKeyRelatedField(queryset=Family.objects.all())
+    members = FamilyInviteEntrySerializer(many=True, allow_empty=False, max_length=100)
+
 # Serializer mới cho Đăng nhập
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
@@ -151,7 +161,7 @@ class LoginSerializer(serializers.Serializer):
             )
 
         # Tạo token cho người dùng
-        refresh = RefreshToken.for_user(user)
+        refresh = add_token_version(RefreshToken.for_user(user), user)
         attrs['user'] = user
         attrs['refresh'] = str(refresh)
         attrs['access'] = str(refresh.access_token)
@@ -164,11 +174,17 @@ class LogoutSerializer(serializers.Serializer):
     def validate(self, attrs):
         try:
             refresh_token = attrs['refresh']
-            token = RefreshToken(refresh_token)
+            token = PrecheckedRefreshToken(refresh_token)
             token.blacklist()  # Vô hiệu hóa refresh token
+            # Bỏ user khỏi cache xác thực
+            invalidate_cached_user(token.get('user_id'), token.get(TOKEN_VERSION_CLAIM, 0))
         except Exception as e:
             raise serializers.ValidationError(
                 _('Invalid or expired refresh token.'),
                 code='invalid_token'
             )
-        return attrs
\ No newline at end of file
+        return attrs
+
+    def create(self, validated_data):
+        # Token đã được blacklist trong validate(), không tạo đối tượng nào
+        return validated_data
\ No newline at end of file
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .access import rebuild_family_access, family_user_ids, invalidate_user_access
+from .authentication import invalidate_cached_user
+from .members import GRAPH_USER_FIELDS, invalidate_family_graph, invalidate_user_family_graphs
+from .models import User, Family, FamilyMember
+from .tokens import bump_blacklist_generation
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or set(update_fields) & set(GRAPH_USER_FIELDS)):
+        # Đồ thị family đã cache chứa tên và email của user
+        invalidate_user_family_graphs(instance.pk)
+    revoked = getattr(instance, '_revoked_token_version', None)
+    if revoked is not None:
+        # Xóa sau commit để request khác không kịp đưa bản cũ trở lại cache
+        user_pk = instance.pk
+        invalidate_cached_user(user_pk, revoked)
+        transaction.on_commit(lambda: invalidate_cached_user(user_pk, revoked))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, **kwargs):
+    # Báo cho BlacklistFilter của mọi process nạp token mới (xem users.tokens)
+    if created:
+        transaction.on_commit(bump_blacklist_generation)
+
+
+@receiver(post_save, sender=Family)
+def family_saved(sender, instance, **kwargs):
+    rebuild_family_access(instance.pk)
+    invalidate_family_graph(instance.pk)
+
+
+@receiver(pre_delete, sender=Family)
+def family_deleting(sender, instance, **kwargs):
+    # FamilyAccess bị xóa theo cascade, chỉ cần xóa cache của các user liên quan
+    invalidate_user_access(family_user_ids(instance.pk))
+    invalidate_family_graph(instance.pk)
+
+
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+def family_member_changed(sender, instance, **kwargs):
+    # Khi cả family bị xóa, FamilyAccess đã bị xóa theo cascade, không dựng lại
+    if isinstance(kwargs.get('origin'), Family) or not instance.family_id:
+        return
+    rebuild_family_access(instance.family_id)
+    invalidate_family_graph(instance.family_id)
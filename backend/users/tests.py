@@ -1,3 +1,254 @@
+from unittest.mock import patch
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.testing import QueryBudgetMixin, SharedCacheMixin
+from .access import access_cache_key, accessible_family_ids
+from .authentication import user_cache_key
+from .models import User, Family, FamilyMember, FamilyAccess
+from .tokens import blacklist_filter
 
-# Create your tests here.
+
+class UsersQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='x', full_name='Owner', is_admin=True
+        )
+        cls.family = Family.objects.create(name='Gia đình', created_by=cls.user)
+
+    def setUp(self):
+        self.client = self.query_client(self.user)
+
+    def add_users(self, count):
+        offset = User.objects.count()
+        return User.objects.bulk_create([
+            User(
+                username=f'user{offset + i}',
+                email=f'user{offset + i}@example.com',
+                full_name=f'Người dùng {offset + i}',
+                password='!',
+            )
+            for i in range(count)
+        ])
+
+    def add_families(self, count):
+        # bulk_create không phát signal nên tự ghi FamilyAccess cho người tạo
+        offset = Family.objects.count()
+        families = Family.objects.bulk_create([
+            Family(name=f'Gia đình {offset + i}', created_by=self.user) for i in range(count)
+        ])
+        FamilyAccess.objects.bulk_create([FamilyAccess(family=family, user=self.user) for family in families])
+
+    def add_members(self, count):
+        members = []
+        for related_to in self.add_users(count):
+            members.append(FamilyMember(family=self.family, user=self.user, related_to=related_to, relationship='con'))
+            members.append(FamilyMember(family=self.family, user=related_to, related_to=self.user, relationship='bố'))
+        FamilyMember.objects.bulk_create(members)
+
+    def test_family_list(self):
+        self.assertQueryBudget(self.client, reverse('family-list'), 2, self.add_families)
+
+    def test_family_member_list(self):
+        self.assertQueryBudget(self.client, reverse('familymember-list'), 1, self.add_members)
+
+    def test_family_graph(self):
+        self.assertQueryBudget(self.client, reverse('family-graph', args=[self.family.pk]), 3, self.add_members)
+
+    def test_user_management_list(self):
+        self.assertQueryBudget(self.client, reverse('user-manage'), 1, self.add_users)
+
+
+class TokenRevocationTests(SharedCacheMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pw12345!', full_name='Owner')
+        self.client = APIClient()
+        tokens = self.client.post(reverse('login'), {'username': 'owner', 'password': 'pw12345!'}, format='json').json()
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+        self.refresh = tokens['refresh']
+        # Lần gọi đầu đưa user vào cache xác thực
+        self.assertEqual(self.client.get(reverse('user-info'), **self.auth).status_code, 200)
+
+    def assertRevoked(self):
+        self.assertEqual(self.client.get(reverse('user-info'), **self.auth).status_code, 401)
+        self.client.cookies['refresh_token'] = self.refresh
+        self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 401)
+
+    def test_cache_holds_no_password(self):
+        cached = cache.get(user_cache_key(self.user.pk, self.user.token_version))
+        self.assertNotIn('password', cached)
+
+    def test_password_change_revokes_tokens(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.change_password('new-pw12345!')
+        self.assertRevoked()
+
+    def test_password_hash_upgrade_keeps_tokens(self):
+        # Đổi số vòng lặp của hasher: lần đăng nhập sau nâng cấp hash qua set_password + save(update_fields=['password'])
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True), patch.object(PBKDF2PasswordHasher, 'iterations', PBKDF2PasswordHasher.iterations + 1):
+            self.assertTrue(user.check_password('pw12345!'))
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, self.user.password)
+        self.assertEqual(user.token_version, self.user.token_version)
+        self.assertEqual(self.client.get(reverse('user-info'), **self.auth).status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+        self.assertRevoked()
+
+    def test_logout_all_revokes_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('logout-all'), **self.auth).status_code, 205)
+        self.assertRevoked()
+
+
+class ProcessLocalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pw12345!', full_name='Owner')
+        self.family = Family.objects.create(name='Gia đình', created_by=self.user)
+
+    def test_access_not_cached_in_process_local_cache(self):
+        # LocMemCache không dùng chung giữa các worker: tập quyền luôn đọc từ FamilyAccess
+        self.assertEqual(list(accessible_family_ids(self.user)), [self.family.pk])
+        self.assertIsNone(cache.get(access_cache_key('families', self.user.pk)))
+        with self.assertNumQueries(1):
+            accessible_family_ids(self.user)
+
+    def test_auth_user_not_cached_in_process_local_cache(self):
+        client = APIClient()
+        tokens = client.post(reverse('login'), {'username': 'owner', 'password': 'pw12345!'}, format='json').json()
+        self.assertEqual(client.get(reverse('user-info'), HTTP_AUTHORIZATION=f"Bearer {tokens['access']}").status_code, 200)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk, self.user.token_version)))
+
+
+class RefreshTokenTests(SharedCacheMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pw12345!', full_name='Owner')
+        self.client = APIClient()
+        tokens = self.client.post(reverse('login'), {'username': 'owner', 'password': 'pw12345!'}, format='json').json()
+        self.refresh = tokens['refresh']
+        self.client.cookies['refresh_token'] = self.refresh
+
+    def test_valid_refresh_uses_no_queries(self):
+        # Lần đầu nạp tập blacklist và user vào cache, các lần sau không cần database
+        self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 200)
+
+    def test_blacklist_from_other_process_is_seen(self):
+        self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 200)
+        # Process khác blacklist token: chỉ có dòng trong database và thế hệ mới trong cache
+        with self.captureOnCommitCallbacks(execute=True):
+            RefreshToken(self.refresh).blacklist()
+        self.assertFalse(blacklist_filter._jtis)
+        self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 401)
+
+    def test_refresh_checks_database_without_shared_cache(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.client.post(reverse('token_refresh'))
+            with self.assertNumQueries(2):
+                self.assertEqual(self.client.post(reverse('token_refresh')).status_code, 200)
+
+
+class FamilyGraphCacheTests(SharedCacheMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='x', full_name='Other')
+        self.family = Family.objects.create(name='Gia đình', created_by=self.user)
+        FamilyMember.objects.create(family=self.family, user=self.user, related_to=self.other, relationship='vợ')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('family-graph', args=[self.family.pk])
+
+    def names(self):
+        return {node['id']: node['full_name'] for node in self.client.get(self.url).json()['nodes']}
+
+    def test_profile_update_refreshes_graph(self):
+        self.assertEqual(self.names()[self.other.pk], 'Other')
+        other = User.objects.get(pk=self.other.pk)
+        other.full_name = 'Người khác'
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(self.names()[self.other.pk], 'Người khác')
+
+
+class BulkInviteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x', full_name='Owner')
+        self.family = Family.objects.create(name='Gia đình', created_by=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('familymember-bulk-invite')
+
+    def add_users(self, count):
+        offset = User.objects.count()
+        return User.objects.bulk_create([
+            User(username=f'user{offset + i}', email=f'user{offset + i}@example.com', full_name=f'Người dùng {offset + i}', password='!')
+            for i in range(count)
+        ])
+
+    def invite(self, users, client=None):
+        members = [{'email': user.email, 'relationship': 'con'} for user in users]
+        return (client or self.client).post(self.url, {'familyId': self.family.pk, 'members': members}, format='json')
+
+    def test_query_count_does_not_grow(self):
+        counts = []
+        for size in (5, 50):
+            users = self.add_users(size)
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.invite(users).status_code, 201)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(FamilyMember.objects.filter(family=self.family).count(), 2 * 55)
+
+    def test_existing_and_repeated_members_are_skipped(self):
+        first, second = self.add_users(2)
+        self.assertEqual(self.invite([first]).status_code, 201)
+        response = self.invite([first, second, second])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([member['related_to'] for member in response.json()['created']], [second.pk])
+        self.assertEqual(response.json()['skipped'], [first.email])
+        self.assertEqual(FamilyMember.objects.filter(family=self.family).count(), 4)
+        self.assertEqual(self.invite([first, second]).status_code, 200)
+
+    def test_concurrent_invite_returns_400(self):
+        invitee, = self.add_users(1)
+        bulk_create = FamilyMember.objects.bulk_create
+
+        def racing_bulk_create(members, **kwargs):
+            # Lần mời khác commit cùng quan hệ ngay sau bước kiểm tra quan hệ đã có
+            FamilyMember.objects.create(family=self.family, user=self.user, related_to=invitee, relationship='con')
+            return bulk_create(members, **kwargs)
+
+        with patch.object(FamilyMember.objects, 'bulk_create', side_effect=racing_bulk_create):
+            self.assertEqual(self.invite([invitee]).status_code, 400)
+
+    def test_only_members_and_creator_can_invite(self):
+        outsider, invitee = self.add_users(2)
+        # outsider chỉ là related_to: thấy family (accessible_family_ids) nhưng không phải thành viên
+        FamilyMember.objects.create(family=self.family, user=self.user, related_to=outsider, relationship='bạn')
+        client = APIClient()
+        client.force_authenticate(user=outsider)
+        self.assertEqual(client.get(reverse('family-detail', args=[self.family.pk])).status_code, 200)
+        self.assertEqual(self.invite([invitee], client=client).status_code, 403)
+        member = self.add_users(1)[0]
+        FamilyMember.objects.create(family=self.family, user=member, related_to=self.user, relationship='con')
+        client.force_authenticate(user=member)
+        self.assertEqual(self.invite([invitee], client=client).status_code, 201)
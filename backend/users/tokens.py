@@ -0,0 +1,114 @@
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.caching import shared_cache_enabled
+
+# Số jti tối đa giữ trong bộ nhớ mỗi process; vượt quá thì nạp lại từ đầu (chỉ token còn hạn)
+BLACKLIST_FILTER_MAX_SIZE = getattr(settings, 'TOKEN_BLACKLIST_FILTER_MAX_SIZE', 100000)
+# Khi nạp phần mới, đọc lùi lại thêm khoảng này (giây) tính từ lần nạp trước, để không bỏ sót
+# token được ghi trước lần nạp nhưng commit sau đó, hoặc ghi bởi server có đồng hồ lệch
+BLACKLIST_SYNC_OVERLAP = getattr(settings, 'TOKEN_BLACKLIST_SYNC_OVERLAP', 60)
+# Key trong cache dùng chung, tăng mỗi khi có token bị blacklist
+BLACKLIST_GENERATION_KEY = 'token_blacklist:generation'
+
+
+def bump_blacklist_generation():
+    try:
+        cache.incr(BLACKLIST_GENERATION_KEY)
+    except ValueError:
+        cache.set(BLACKLIST_GENERATION_KEY, int(time.time() * 1000), None)
+
+
+class BlacklistFilter:
+    """
+    Tập jti đã bị blacklist, giữ trong bộ nhớ process và đồng bộ giữa các process qua một
+    số thế hệ trong cache dùng chung (tăng sau mỗi lần blacklist, xem users.signals).
+    Thế hệ không đổi thì tập đang có là đủ, việc kiểm tra không cần truy vấn database;
+    thế hệ đổi (hoặc key bị đẩy khỏi cache) thì nạp các BlacklistedToken mới bằng một truy vấn.
+    Với cache riêng từng process không có cách biết process khác vừa blacklist,
+    contains() trả về None và token được kiểm tra với database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = set()
+        self._generation = None
+        self._synced_at = None
+
+    def _load(self, since):
+        tokens = BlacklistedToken.objects.using(DEFAULT_DB_ALIAS)
+        if since is None:
+            tokens = tokens.filter(token__expires_at__gt=timezone.now())
+        else:
+            tokens = tokens.filter(blacklisted_at__gte=since)
+        return tokens.values_list('token__jti', flat=True)
+
+    def _sync(self, generation):
+        with self._lock:
+            if generation == self._generation:
+                return
+            started = timezone.now()
+            full = self._synced_at is None or len(self._jtis) >= BLACKLIST_FILTER_MAX_SIZE
+            since = None if full else self._synced_at - timedelta(seconds=BLACKLIST_SYNC_OVERLAP)
+            jtis = set(self._load(since))
+            self._jtis = jtis if full else self._jtis | jtis
+            self._generation = generation
+            self._synced_at = started
+
+    def contains(self, jti):
+        """
+        True/False khi tập đã đồng bộ với cache dùng chung, None khi không thể biết.
+        """
+        if not shared_cache_enabled():
+            return None
+        generation = cache.get(BLACKLIST_GENERATION_KEY)
+        if generation is None:
+            # Key bị đẩy khỏi cache: tạo giá trị mới, khác mọi thế hệ đã thấy, nên mọi process nạp lại
+            cache.add(BLACKLIST_GENERATION_KEY, int(time.time() * 1000), None)
+            generation = cache.get(BLACKLIST_GENERATION_KEY)
+        if generation != self._generation:
+            self._sync(generation)
+        return jti in self._jtis
+
+    def add(self, jti):
+        with self._lock:
+            self._jtis.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._jtis = set()
+            self._generation = None
+            self._synced_at = None
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class PrecheckedRefreshToken(RefreshToken):
+    """
+    RefreshToken kiểm tra blacklist bằng BlacklistFilter: khi tập jti đã đồng bộ với cache
+    dùng chung thì không cần truy vấn BlacklistedToken; ngược lại kiểm tra với database
+    như RefreshToken gốc.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        blacklisted = blacklist_filter.contains(jti)
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+        if blacklisted is None:
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserInfoView, UserRegistrationView, LoginView, UserUpdateView,
-    CookieTokenRefreshView, LogoutAPIView, FamilyMemberViewSet, FamilyViewSet, UserManagementView
+    CookieTokenRefreshView, LogoutAPIView, LogoutAllAPIView, FamilyMemberViewSet, FamilyViewSet, UserManagementView
 )
 
 router = DefaultRouter()
@@ -17,5 +17,6 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('refresh/', CookieTokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', LogoutAPIView.as_view(), name='logout'),
+    path('logout-all/', LogoutAllAPIView.as_view(), name='logout-all'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
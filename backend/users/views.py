@@ -1,22 +1,33 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.pagination import CursorPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError
-from .serializers import CustomUserSerializer, UserRegistrationSerializer, LoginSerializer, LogoutSerializer, FamilySerializer, FamilyMemberSerializer, UserUpdateSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .serializers import CustomUserSerializer, UserRegistrationSerializer, LoginSerializer, LogoutSerializer, FamilySerializer, FamilyMemberSerializer, FamilyMemberBulkInviteSerializer, UserUpdateSerializer
 from .models import User, Family, FamilyMember
+from .access import accessible_family_ids, member_family_ids
+from .members import invite_members, family_graph
+from .authentication import invalidate_cached_user, token_user_fields, TOKEN_VERSION_CLAIM
+from .tokens import PrecheckedRefreshToken
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.translation import gettext_lazy as _
+from datetime import datetime, time
 from rest_framework.exceptions import ValidationError
-from django.db import models
 
 class UserInfoView(APIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CustomUserSerializer
 
     def get(self, request):
-        user = request.user
+        # request.user lấy từ cache xác thực chỉ có một phần các cột, đọc đầy đủ từ database
+        user = User.objects.get(pk=request.user.pk)
         serializer = self.serializer_class(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -25,12 +36,14 @@ class UserUpdateView(generics.UpdateAPIView):
     serializer_class = UserUpdateSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user có thể lấy từ cache xác thực, đọc lại bản mới nhất trước khi ghi
+        return User.objects.get(pk=self.request.user.pk)
     
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(self.get_object(), data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            invalidate_cached_user(user.pk, user.token_version)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -90,7 +103,12 @@ class CookieTokenRefreshView(TokenRefreshView):
         if not refresh_token:
             return Response({"detail": _("No refresh token provided")}, status=status.HTTP_401_UNAUTHORIZED)
         try:
-            refresh = RefreshToken(refresh_token)
+            # Kiểm tra blacklist bằng tập jti trong bộ nhớ (xem users.tokens)
+            refresh = PrecheckedRefreshToken(refresh_token)
+            # Token cấp trước lần đổi mật khẩu, khóa tài khoản hoặc đăng xuất mọi thiết bị đã bị thu hồi;
+            # đọc qua cache xác thực nên ở trạng thái ổn định refresh không cần truy vấn database
+            if token_user_fields(refresh.get(api_settings.USER_ID_CLAIM), refresh.get(TOKEN_VERSION_CLAIM, 0)) is None:
+                raise TokenError(_("Token has been revoked."))
             access_token = str(refresh.access_token)
             response = Response({"access": access_token}, status=status.HTTP_200_OK)
             response.set_cookie(
@@ -104,6 +122,18 @@ class CookieTokenRefreshView(TokenRefreshView):
         except TokenError:
             return Response({"detail": _("Invalid refresh token")}, status=status.HTTP_401_UNAUTHORIZED)
 
+def clear_auth_cookies(response):
+    for key in ('access_token', 'refresh_token'):
+        response.set_cookie(
+            key=key,
+            value='',
+            path='/',
+            secure=True,
+            httponly=True,
+            samesite='None',
+        )
+    return response
+
 class LogoutAPIView(generics.GenericAPIView):
     serializer_class = LogoutSerializer
     permission_classes = (AllowAny,)
@@ -113,50 +143,47 @@ class LogoutAPIView(generics.GenericAPIView):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
-            response = Response({"message": _("Logout successful")}, status=status.HTTP_205_RESET_CONTENT)
-            response.set_cookie(
-                key='access_token',
-                value='',
-                path='/',
-                secure=True,
-                httponly=True,
-                samesite='None',
-            )
-            response.set_cookie(
-                key='refresh_token',
-                value='',
-                path='/',
-                secure=True,
-                httponly=True,
-                samesite='None',
-            )
-            return response
+            return clear_auth_cookies(Response({"message": _("Logout successful")}, status=status.HTTP_205_RESET_CONTENT))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LogoutAllAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        """Đăng xuất khỏi mọi thiết bị: thu hồi mọi token đã cấp cho user."""
+        User.objects.get(pk=request.user.pk).revoke_tokens()
+        return clear_auth_cookies(Response({"message": _("Logged out from all devices")}, status=status.HTTP_205_RESET_CONTENT))
+
 class FamilyViewSet(viewsets.ModelViewSet):
     serializer_class = FamilySerializer
     permission_classes = (IsAuthenticated,)
     queryset = Family.objects.all()
 
     def get_queryset(self):
-        # Trả về Family mà user hiện tại là người tạo hoặc là thành viên (user hoặc related_to)
-        return self.queryset.filter(
-            models.Q(members__user=self.request.user) |
-            models.Q(members__related_to=self.request.user) |
-            models.Q(created_by=self.request.user)
-        ).distinct()
+        # Trả về Family mà user hiện tại là người tạo hoặc là thành viên (user hoặc related_to),
+        # đọc từ tập quyền đã vật chất hóa (xem users.access)
+        return self.queryset.filter(pk__in=accessible_family_ids(self.request.user)).select_related('created_by')
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def graph(self, request, pk=None):
+        """
+        Toàn bộ đồ thị quan hệ của family: {"family": {...}, "nodes": [...], "edges": [...]}.
+        Được cache và xóa khi thành viên thay đổi (xem users.members.family_graph).
+        """
+        return Response(family_graph(self.get_object()), status=status.HTTP_200_OK)
+
 class FamilyMemberViewSet(viewsets.ModelViewSet):
     serializer_class = FamilyMemberSerializer
     permission_classes = (IsAuthenticated,)
     queryset = FamilyMember.objects.all()
 
     def get_queryset(self):
-        # Chỉ trả về FamilyMember mà user hiện tại là chủ thể (người khai báo)
-        return self.queryset.filter(user=self.request.user)
+        # Chỉ trả về FamilyMember mà user hiện tại là chủ thể (người khai báo);
+        # related_to được nạp cùng truy vấn cho related_to_name/related_to_email
+        return self.queryset.filter(user=self.request.user).select_related('related_to')
 
     def perform_create(self, serializer):
         family_id = serializer.validated_data.get('familyId') or self.request.data.get('familyId')
@@ -196,6 +223,25 @@ class FamilyMemberViewSet(viewsets.ModelViewSet):
                 relationship="người quen"
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk-invite')
+    def bulk_invite(self, request):
+        """
+        Mời nhiều người vào một family trong một transaction, tạo cả hai chiều quan hệ
+        bằng một lần bulk_create (xem users.members.invite_members).
+        Payload: {"familyId": 1, "members": [{"email": "a@b.com", "relationship": "mẹ"}]}
+        """
+        serializer = FamilyMemberBulkInviteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        family = serializer.validated_data['familyId']
+        # Cùng điều kiện với perform_create: thành viên (FamilyMember.user) hoặc người tạo family
+        if family.pk not in member_family_ids(request.user) and family.created_by_id != request.user.pk:
+            raise PermissionDenied(_('You are not a member or creator of this family.'))
+        created, skipped = invite_members(family, request.user, serializer.validated_data['members'])
+        return Response({
+            'created': self.get_serializer(created, many=True).data,
+            'skipped': skipped,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
     def perform_destroy(self, instance):
         # Xóa cả hai chiều quan hệ trong cùng một family
         FamilyMember.objects.filter(
@@ -204,15 +250,73 @@ class FamilyMemberViewSet(viewsets.ModelViewSet):
             related_to__in=[instance.user, instance.related_to]
         ).delete()
         
+# Các cột trả về trong danh sách người dùng của trang quản trị
+USER_LIST_FIELDS = ('id', 'username', 'full_name', 'email', 'phone_number', 'age', 'is_admin', 'created_at')
+
+
+class UserCursorPagination(CursorPagination):
+    # Sắp xếp theo khóa chính (duy nhất, có index), id tăng theo thời gian tạo
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+def _parse_moment(value, end_of_day=False):
+    """
+    Đọc ngày hoặc ngày giờ ISO; một ngày đơn lẻ được hiểu là đầu (hoặc cuối) ngày đó.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        try:
+            day = parse_date(value)
+        except ValueError:
+            return None
+        if day is None:
+            return None
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
 class UserManagementView(APIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CustomUserSerializer
 
     def get(self, request):
-        """Retrieve all users in the database."""
-        users = User.objects.all()
-        serializer = self.serializer_class(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """
+        Retrieve users, newest first, one cursor page at a time.
+
+        Filters: ?username=, ?email= (contains), ?is_admin=true|false,
+        ?created_after= / ?created_before= (ISO date or datetime).
+        """
+        users = User.objects.order_by(*UserCursorPagination.ordering)
+        username = request.query_params.get('username')
+        if username:
+            users = users.filter(username__icontains=username)
+        email = request.query_params.get('email')
+        if email:
+            users = users.filter(email__icontains=email)
+        is_admin = request.query_params.get('is_admin')
+        if is_admin:
+            if is_admin.lower() not in ('true', 'false', '1', '0'):
+                return Response({"detail": _("is_admin must be true or false")}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(is_admin=is_admin.lower() in ('true', '1'))
+        for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lte')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            moment = _parse_moment(value, end_of_day=(param == 'created_before'))
+            if moment is None:
+                return Response({"detail": _("Invalid %(param)s, expected an ISO date or datetime") % {'param': param}},
+                                status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(**{lookup: moment})
+
+        # Chỉ đọc các cột của bảng quản trị, không dựng instance User
+        paginator = UserCursorPagination()
+        page = paginator.paginate_queryset(users.values(*USER_LIST_FIELDS), request, view=self)
+        return paginator.get_paginated_response(page)
 
     def put(self, request):
         """Update a specific user's information by ID."""
@@ -226,6 +330,7 @@ class UserManagementView(APIView):
             serializer = UserUpdateSerializer(user, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                invalidate_cached_user(user.pk, user.token_version)
                 response_serializer = self.serializer_class(user)
                 return Response(response_serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -253,7 +358,9 @@ class UserManagementView(APIView):
             user = User.objects.get(id=user_id)
             if user == request.user:
                 return Response({"detail": _("Cannot delete your own account")}, status=status.HTTP_400_BAD_REQUEST)
+            user_pk = user.pk
             user.delete()
+            invalidate_cached_user(user_pk, user.token_version)
             return Response({"message": _("User deleted successfully")}, status=status.HTTP_204_NO_CONTENT)
         except User.DoesNotExist:
             return Response({"detail": _("User not found")}, status=status.HTTP_404_NOT_FOUND)
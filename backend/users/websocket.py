@@ -0,0 +1,36 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.sessions import CookieMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    # Cùng cách xác thực với API, kể cả kiểm tra token_version của token đã bị thu hồi
+    authenticator = CachedJWTAuthentication()
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return authenticator.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Xác thực WebSocket bằng cùng access token với API, chỉ qua cookie access_token
+    (như CookieJWTAuthentication). Không nhận token trong query string: URL bị ghi vào log
+    của proxy và lịch sử trình duyệt.
+    """
+
+    async def __call__(self, scope, receive, send):
+        raw_token = scope.get('cookies', {}).get('access_token')
+        scope['user'] = await get_user_from_token(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    # CookieMiddleware điền scope['cookies'] để đọc access_token
+    return CookieMiddleware(JWTAuthMiddleware(inner))
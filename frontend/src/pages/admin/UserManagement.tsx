@@ -24,6 +24,16 @@ import {
   Delete as DeleteIcon,
 } from '@mui/icons-material';
 
+// Số người dùng mỗi trang; API phân trang theo cursor nên chỉ đi tới trang kề bên qua link next/previous
+const USERS_PAGE_SIZE = 10;
+const USERS_URL = `http://localhost:8000/users/user-manage/?page_size=${USERS_PAGE_SIZE}`;
+
+interface UserPage {
+  next: string | null;
+  previous: string | null;
+  results: User[];
+}
+
 interface User {
   id: number;
   username: string;
@@ -49,7 +59,8 @@ export default function UserManagement() {
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
   const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [previousUrl, setPreviousUrl] = useState<string | null>(null);
 
   // Memoize getToken and refreshToken
   const refreshToken = useCallback(async () => {
@@ -85,34 +96,40 @@ export default function UserManagement() {
     return token;
   }, [refreshToken]);
 
-  // Fetch users on component mount
-  useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        const token = await getToken();
-        const response = await fetch('http://localhost:8000/users/user-manage/', {
-          method: 'GET',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json',
-          },
-        });
-        if (!response.ok) {
-          const text = await response.text();
-          throw new Error(text.startsWith('<!DOCTYPE') ? 'Received HTML instead of JSON, likely authentication error' : `HTTP ${response.status}: ${text}`);
-        }
-        const data: User[] = await response.json();
-        setUsers(data);
-      } catch (error: any) {
-        console.error('Error fetching users:', error);
-        alert(`Không thể tải danh sách người dùng: ${error.message}`);
-      } finally {
-        setLoading(false);
+  // Tải một trang người dùng theo URL (trang đầu hoặc link next/previous của API)
+  const loadPage = useCallback(async (url: string, pageIndex: number) => {
+    setLoading(true);
+    try {
+      const token = await getToken();
+      const response = await fetch(url, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+      });
+      if (!response.ok) {
+        const text = await response.text();
+        throw new Error(text.startsWith('<!DOCTYPE') ? 'Received HTML instead of JSON, likely authentication error' : `HTTP ${response.status}: ${text}`);
       }
-    };
-    fetchUsers();
+      const data: UserPage = await response.json();
+      setUsers(data.results);
+      setNextUrl(data.next);
+      setPreviousUrl(data.previous);
+      setPage(pageIndex);
+    } catch (error: any) {
+      console.error('Error fetching users:', error);
+      alert(`Không thể tải danh sách người dùng: ${error.message}`);
+    } finally {
+      setLoading(false);
+    }
   }, [getToken]);
 
+  // Fetch first page on component mount
+  useEffect(() => {
+    loadPage(USERS_URL, 0);
+  }, [loadPage]);
+
   const handleOpenDialog = (user?: User) => {
     if (user) {
       setSelectedUser(user);
@@ -187,7 +204,8 @@ export default function UserManagement() {
       if (selectedUser) {
         setUsers(users.map(user => (user.id === selectedUser.id ? updatedUser : user)));
       } else {
-        setUsers([...users, updatedUser]);
+        // Người dùng mới nằm ở đầu danh sách (sắp xếp mới nhất trước)
+        await loadPage(USERS_URL, 0);
       }
       handleCloseDialog();
       if(selectedUser) {
@@ -235,21 +253,16 @@ export default function UserManagement() {
   };
 
   const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
+    const url = newPage > page ? nextUrl : previousUrl;
+    if (url) {
+      loadPage(url, newPage);
+    }
   };
 
-  if (loading) {
+  if (loading && users.length === 0) {
     return <Typography>Đang tải...</Typography>;
   }
 
-  // Calculate paginated users
-  const paginatedUsers = users.slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage);
-
   return (
     <Container maxWidth="lg" sx={{ mt: 4, mb: 4 }}>
       <Box sx={{ display: 'flex', justifyContent: 'space-between', mb: 3 }}>
@@ -280,7 +293,7 @@ export default function UserManagement() {
             </TableRow>
           </TableHead>
           <TableBody>
-            {paginatedUsers.map((user) => (
+            {users.map((user) => (
               <TableRow key={user.id}>
                 <TableCell>{user.id}</TableCell>
                 <TableCell>{user.username}</TableCell>
@@ -301,15 +314,17 @@ export default function UserManagement() {
             ))}
           </TableBody>
         </Table>
+        {/* Không biết tổng số người dùng: còn trang sau thì count = -1, hết thì đếm được */}
         <TablePagination
-          rowsPerPageOptions={[10]}
+          rowsPerPageOptions={[USERS_PAGE_SIZE]}
           component="div"
-          count={users.length}
-          rowsPerPage={rowsPerPage}
+          count={nextUrl ? -1 : page * USERS_PAGE_SIZE + users.length}
+          rowsPerPage={USERS_PAGE_SIZE}
           page={page}
           onPageChange={handleChangePage}
-          onRowsPerPageChange={handleChangeRowsPerPage}
-          labelDisplayedRows={({ from, to, count }) => `${from}-${to} của ${count}`}
+          labelDisplayedRows={({ from, to, count }) => `${from}-${to} của ${count !== -1 ? count : `hơn ${to}`}`}
+          backIconButtonProps={{ disabled: loading || !previousUrl }}
+          nextIconButtonProps={{ disabled: loading || !nextUrl }}
         />
       </TableContainer>
 
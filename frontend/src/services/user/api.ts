@@ -110,6 +110,7 @@ export const familyApi = {
   createFamily: (data: { name: string }) => api.post('/users/families/', data),
   updateFamily: (id: string, data: { name: string }) => api.patch(`/users/families/${id}/`, data),
   deleteFamily: (id: string) => api.delete(`/users/families/${id}/`),
+  getFamilyGraph: (id: string) => api.get(`/users/families/${id}/graph/`),
 
   getAllMembers: () => api.get('/users/family-members/'),
   createMember: (data: {